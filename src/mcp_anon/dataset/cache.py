@@ -0,0 +1,124 @@
+import logging
+_logger = logging.getLogger(__name__)
+from pathlib import Path
+from collections.abc import Iterator
+from contextlib import contextmanager
+import hashlib
+import json
+
+import pandas as pd
+import pyarrow as pa
+
+from mcp_anon.pipeline import Load
+from mcp_anon.pipeline.pandas.export import TableWriter
+from mcp_anon.pipeline.pandas.load import rebatch
+
+
+def digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+class DiskCache:
+    """Cache of loaded datasets as Arrow IPC files in a directory.
+
+    A cached dataset is identified by configuration of its loader and the
+    fingerprint of source data at the time it was loaded. Datasets from
+    loaders without fingerprint are never cached.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def path(self, load: Load, sample: bool = False) -> Path | None:
+        fingerprint = load.fingerprint()
+        if fingerprint is None:
+            return None
+        config = load.model_dump(
+            mode = 'json',
+            exclude = None if sample else {'sample'},
+        )
+        config_key = digest(json.dumps(config, sort_keys = True))
+        return self.directory / f'{config_key}-{digest(fingerprint)}.arrow'
+
+    def get(self, load: Load[pd.DataFrame], sample: bool = False) -> pd.DataFrame:
+        """Load dataset, reading from cache if source has not changed"""
+        path = self.path(load, sample)
+        if path is None:
+            return load.load_sample() if sample else load()
+        if path.is_file():
+            _logger.info(f'Reading cached dataset from: {path}')
+            with pa.memory_map(str(path)) as source:
+                table = pa.ipc.open_file(source).read_all()
+            return table.to_pandas(types_mapper = pd.ArrowDtype)
+        ds = load.load_sample() if sample else load()
+        with self.writing(path) as write:
+            write(ds)
+        return ds
+
+    def stream(self, load: Load[pd.DataFrame], chunksize: int) -> Iterator[pd.DataFrame]:
+        """Stream dataset, caching it on the first complete pass over source"""
+        path = self.path(load)
+        if path is None:
+            yield from load.stream(chunksize)
+            return
+        if path.is_file():
+            _logger.info(f'Streaming cached dataset from: {path}')
+            with pa.memory_map(str(path)) as source:
+                reader = pa.ipc.open_file(source)
+                batches = map(reader.get_batch, range(reader.num_record_batches))
+                for batch in rebatch(batches, chunksize):
+                    yield batch.to_pandas(types_mapper = pd.ArrowDtype)
+            return
+        with self.writing(path) as write:
+            for ds in load.stream(chunksize):
+                write(ds)
+                yield ds
+
+    @contextmanager
+    def writing(self, path: Path):
+        """Write datasets into cache file.
+
+        File only appears in cache once writing completes. Failure to write
+        is logged but never interrupts loading.
+        """
+        self.directory.mkdir(parents = True, exist_ok = True)
+        partial = path.with_suffix('.partial')
+        options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas = True)
+        writer = TableWriter(lambda schema: pa.ipc.new_file(str(partial), schema, options = options))
+        failed = False
+
+        def write(ds: pd.DataFrame) -> None:
+            nonlocal failed
+            if failed:
+                return
+            try:
+                writer.write(ds)
+            except (pa.ArrowException, ValueError) as e:
+                _logger.warning(f'Can not cache dataset. {e}')
+                failed = True
+
+        completed = False
+        try:
+            yield write
+            completed = True
+        finally:
+            try:
+                # Writes chunks still held back for their schema
+                writer.close()
+            except (pa.ArrowException, ValueError) as e:
+                if not failed:
+                    _logger.warning(f'Can not cache dataset. {e}')
+                failed = True
+            if completed and not failed and partial.is_file():
+                # Replace atomically, so readers never see a partial file
+                partial.replace(path)
+                self.evict_stale(path)
+            else:
+                partial.unlink(missing_ok = True)
+
+    def evict_stale(self, path: Path) -> None:
+        """Remove datasets cached from the same loader before source changed"""
+        config_key = path.name.split('-')[0]
+        for stale in self.directory.glob(f'{config_key}-*.arrow'):
+            if stale != path:
+                stale.unlink(missing_ok = True)
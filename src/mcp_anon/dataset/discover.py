@@ -0,0 +1,186 @@
+"""Discover combinations of fields which single out records.
+
+A combination is risky if too many records are in classes smaller than k
+under it, where records share values of all its fields. Adding a field only
+splits classes further, so every superset of a risky combination is risky
+too. Combinations are searched by size, as by apriori algorithm: candidates
+of each size are only built from safe combinations one field smaller, so
+only minimal risky combinations are evaluated and reported.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import multiprocessing
+import os
+
+from pydantic import BaseModel, Field
+import numpy as np
+import pandas as pd
+
+from mcp_anon.dataset.evaluate import class_sizes
+from mcp_anon.dataset.generalize import MIN_PARALLEL
+from mcp_anon.worker import checkpoint
+
+
+class RiskyCombination(BaseModel):
+    fields: list[str] = Field(description = 'Fields which together single out records.')
+    records: int = Field(description = 'Number of records in classes smaller than k.')
+    uniqueness: float = Field(description = 'Ratio of records in classes smaller than k to all records.')
+
+
+class QuasiIdentifierDiscovery(BaseModel):
+    """Minimal risky combinations of fields, with how many records each singles out"""
+    records: int = Field(description = 'Number of records in dataset.')
+    combinations: list[RiskyCombination] = Field(
+        description = (
+            'Minimal risky combinations, smaller first, then more risky first.'
+            ' Any combination containing one of them is risky too.'
+        ),
+    )
+    evaluated: int = Field(description = 'Number of combinations evaluated against dataset.')
+    complete: bool = Field(
+        description = (
+            'Whether every combination up to largest size was considered.'
+            ' If not, search stopped after reaching most combinations to evaluate.'
+        ),
+    )
+
+
+def records_below(
+    codes: list[np.ndarray],
+    sizes: list[int],
+    combination: tuple[int, ...],
+    k: int,
+) -> int:
+    """Number of records in classes smaller than k under combination of fields"""
+    counts = class_sizes(
+        [codes[x] for x in combination],
+        [sizes[x] for x in combination],
+    )
+    return int(counts[counts < k].sum())
+
+
+# Codes of candidate fields in spawned worker process, set once by initializer.
+# Never set in server process, where searches of sessions run concurrently.
+_codes: list[np.ndarray] = []
+_sizes: list[int] = []
+
+
+def _initialize(codes: list[np.ndarray], sizes: list[int]) -> None:
+    global _codes, _sizes
+    _codes, _sizes = codes, sizes
+
+
+def _records_below(combination: tuple[int, ...], k: int) -> int:
+    return records_below(_codes, _sizes, combination, k)
+
+
+def candidates(safe: list[tuple[int, ...]]) -> list[tuple[int, ...]]:
+    """Combinations one field larger whose every subset is safe.
+
+    Combinations are sorted tuples of field positions, so each candidate is
+    built once, from two safe combinations sharing all but the last field.
+    """
+    known = set(safe)
+    found = []
+    for i, a in enumerate(safe):
+        for b in safe[i + 1:]:
+            if a[:-1] != b[:-1]:
+                # Safe combinations are sorted, so no later one shares prefix
+                break
+            candidate = (*a, b[-1])
+            if all(
+                candidate[:j] + candidate[j + 1:] in known
+                for j in range(len(candidate) - 2)
+            ):
+                found.append(candidate)
+    return found
+
+
+def discover_quasi_identifiers(
+    ds: pd.DataFrame,
+    fields: list[str] | None = None,
+    k: int = 2,
+    threshold: float = 0.01,
+    max_size: int = 3,
+    max_evaluated: int = 10_000,
+    workers: int | None = None,
+) -> QuasiIdentifierDiscovery:
+    """Find minimal combinations of fields with more than `threshold` of records in classes smaller than k.
+
+    Each field is factorized once, and combinations of the same size are
+    evaluated in parallel on the codes by a pool of `workers` processes.
+    If not given, small datasets are evaluated in this process, others by
+    one process per CPU.
+    """
+    fields = list(ds.columns) if fields is None else fields
+    missing = [x for x in fields if x not in ds]
+    if missing:
+        raise KeyError(f'Fields not in dataset: {', '.join(missing)}')
+    codes = []
+    sizes = []
+    for i, field in enumerate(fields):
+        checkpoint(i, len(fields), f'Factorizing field {field}')
+        field_codes, uniques = pd.factorize(ds[field], use_na_sentinel = False)
+        codes.append(field_codes.astype(np.int32 if len(uniques) < 2 ** 31 else np.int64))
+        sizes.append(len(uniques))
+
+    records = len(ds)
+    # Records tolerated in small classes before combination is risky
+    limit = threshold * records
+    if workers is None:
+        workers = 1 if records < MIN_PARALLEL else os.process_cpu_count()
+    risky: list[RiskyCombination] = []
+    evaluated = 0
+    complete = True
+
+    def search(executor) -> None:
+        nonlocal evaluated, complete
+        level = [(i,) for i in range(len(fields))]
+        for size in range(1, max_size + 1):
+            if not level:
+                return
+            if evaluated + len(level) > max_evaluated:
+                complete = False
+                return
+            checkpoint(size - 1, max_size, f'Evaluating {len(level)} combinations of {size} fields')
+            if executor is None:
+                found = [records_below(codes, sizes, x, k) for x in level]
+            else:
+                found = list(executor.map(
+                    _records_below,
+                    level,
+                    [k] * len(level),
+                    chunksize = max(1, len(level) // (4 * workers)),
+                ))
+            evaluated += len(level)
+            safe = []
+            for combination, below in zip(level, found):
+                if below > limit:
+                    risky.append(RiskyCombination(
+                        fields = [fields[x] for x in combination],
+                        records = below,
+                        uniqueness = below / records,
+                    ))
+                else:
+                    safe.append(combination)
+            level = candidates(safe)
+
+    if workers == 1:
+        search(None)
+    else:
+        # Do not fork a server which may be running other threads
+        with ProcessPoolExecutor(
+            max_workers = workers,
+            mp_context = multiprocessing.get_context('spawn'),
+            initializer = _initialize,
+            initargs = (codes, sizes),
+        ) as executor:
+            search(executor)
+
+    return QuasiIdentifierDiscovery(
+        records = records,
+        combinations = sorted(risky, key = lambda x: (len(x.fields), -x.records)),
+        evaluated = evaluated,
+        complete = complete,
+    )
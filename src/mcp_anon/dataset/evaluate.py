@@ -0,0 +1,414 @@
+"""Evaluate how well dataset resists re-identification.
+
+Records sharing the same values of quasi-identifiers, fields which an
+adversary may know from elsewhere, form an equivalence class. Reports only
+describe sizes and distributions of classes, never values of any record.
+"""
+
+from typing import Self
+from collections.abc import Iterable
+
+from pydantic import BaseModel, Field
+import numpy as np
+import pandas as pd
+
+from mcp_anon.worker import checkpoint
+
+
+# Number of smallest classes to report
+SMALLEST = 10
+# Largest mixed-radix group key before it is compacted into codes
+MAX_KEY = 1 << 62
+# Most combinations of codes counted by key directly, without hashing
+MAX_DIRECT = 1 << 20
+
+
+def group_codes(codes: list[np.ndarray], sizes: list[int]) -> tuple[np.ndarray, int]:
+    """Code each record by its combination of codes of fields.
+
+    Return codes numbered by first appearance, and number of combinations.
+    Codes of fields are combined into a single integer key, so records are
+    only hashed once, as integers.
+    """
+    key = np.zeros(len(codes[0]) if codes else 0, dtype = np.int64)
+    size = 1
+    for field_codes, field_size in zip(codes, sizes):
+        field_size = max(field_size, 1)
+        if size * field_size >= MAX_KEY:
+            key, uniques = pd.factorize(key)
+            size = len(uniques)
+        key = key * field_size + field_codes
+        size *= field_size
+    key, uniques = pd.factorize(key)
+    return key, len(uniques)
+
+
+def class_sizes(codes: list[np.ndarray], sizes: list[int]) -> np.ndarray:
+    """Number of records in each combination of codes of fields which occurs"""
+    records = len(codes[0]) if codes else 0
+    if np.prod([max(x, 1) for x in sizes], dtype = float) > max(records, MAX_DIRECT):
+        groups, size = group_codes(codes, sizes)
+        return np.bincount(groups, minlength = size)
+    # Few enough combinations to count by key directly
+    key = np.zeros(records, dtype = np.int64)
+    for field_codes, field_size in zip(codes, sizes):
+        key = key * max(field_size, 1) + field_codes
+    counts = np.bincount(key)
+    return counts[counts > 0]
+
+
+def first_positions(codes: np.ndarray) -> np.ndarray:
+    """Position of first record of each code, for codes numbered by first appearance"""
+    if len(codes) == 0:
+        return np.empty(0, dtype = np.intp)
+    running_max = np.maximum.accumulate(codes)
+    is_first = np.empty(len(codes), dtype = bool)
+    is_first[0] = True
+    is_first[1:] = running_max[1:] > running_max[:-1]
+    return np.flatnonzero(is_first)
+
+
+class Dictionary:
+    """Integer code of each distinct value of a field, consistent across chunks"""
+
+    def __init__(self):
+        self.values: pd.Index | None = None
+
+    def __len__(self) -> int:
+        return 0 if self.values is None else len(self.values)
+
+    def encode(self, series: pd.Series) -> np.ndarray:
+        # Missing value is a value of its own, as adversary may know it is missing
+        codes, uniques = pd.factorize(series, use_na_sentinel = False)
+        return self.lookup(uniques)[codes]
+
+    def lookup(self, values) -> np.ndarray:
+        """Code of each distinct value, adding those not seen yet"""
+        values = pd.Index(values)
+        if self.values is None:
+            self.values = values
+            return np.arange(len(values))
+        codes = self.values.get_indexer(values)
+        new = codes < 0
+        if new.any():
+            codes[new] = len(self.values) + np.arange(new.sum())
+            self.values = self.values.append(values[new])
+        return codes
+
+
+class GroupCounts:
+    """Number of records per combination of quasi-identifier values.
+
+    If sensitive field is given, records are further counted per its value
+    within each combination. Counts of separate chunks can be merged.
+    Values are only kept once per field in dictionaries, and groups refer
+    to them by integer codes.
+    """
+
+    def __init__(self, quasi_identifiers: list[str], sensitive: str | None = None):
+        if sensitive in quasi_identifiers:
+            raise ValueError(f'Sensitive field can not also be a quasi-identifier: {sensitive}')
+        self.quasi_identifiers = quasi_identifiers
+        self.sensitive = sensitive
+        self.dictionaries = {field: Dictionary() for field in self.fields}
+        # Codes of fields of each group, with number of records per group.
+        # Groups of separate chunks are only combined once needed.
+        self.pending: list[tuple[list[np.ndarray], np.ndarray]] = []
+        self.pending_groups = 0
+        self.combined_groups = 0
+
+    @property
+    def fields(self) -> list[str]:
+        if self.sensitive is None:
+            return self.quasi_identifiers
+        return [*self.quasi_identifiers, self.sensitive]
+
+    def update(self, ds: pd.DataFrame) -> None:
+        missing = [x for x in self.fields if x not in ds]
+        if missing:
+            raise KeyError(f'Fields not in dataset: {', '.join(missing)}')
+        codes = [self.dictionaries[x].encode(ds[x]) for x in self.fields]
+        self.add(*self.group(codes, np.ones(len(ds), dtype = np.int64)))
+
+    def group(
+        self,
+        codes: list[np.ndarray],
+        weights: np.ndarray,
+    ) -> tuple[list[np.ndarray], np.ndarray]:
+        groups, size = group_codes(codes, [len(self.dictionaries[x]) for x in self.fields])
+        counts = np.bincount(groups, weights = weights, minlength = size).astype(np.int64)
+        # Label each group by codes of its first record
+        first = first_positions(groups)
+        return [x[first] for x in codes], counts
+
+    def add(self, codes: list[np.ndarray], counts: np.ndarray) -> None:
+        self.pending.append((codes, counts))
+        self.pending_groups += len(counts)
+        # Bound memory of groups repeated across chunks
+        if self.pending_groups > 4 * max(self.combined_groups, 1_000_000):
+            self.combine()
+
+    def merge(self, other: Self) -> None:
+        # Translate codes of other dictionaries into codes of these
+        translate = [
+            self.dictionaries[x].lookup(other.dictionaries[x].values)
+            if len(other.dictionaries[x]) else np.empty(0, dtype = np.intp)
+            for x in self.fields
+        ]
+        for codes, counts in other.pending:
+            self.add([t[c] for t, c in zip(translate, codes)], counts)
+
+    def combine(self) -> tuple[list[np.ndarray], np.ndarray]:
+        """Groups of all chunks seen so far"""
+        if not self.pending:
+            return [np.empty(0, dtype = np.intp) for _ in self.fields], np.empty(0, dtype = np.int64)
+        if len(self.pending) > 1:
+            codes = [
+                np.concatenate([x[i] for x, _ in self.pending])
+                for i in range(len(self.fields))
+            ]
+            counts = np.concatenate([x for _, x in self.pending])
+            self.pending = [self.group(codes, counts)]
+        codes, counts = self.pending[0]
+        self.pending_groups = self.combined_groups = len(counts)
+        return codes, counts
+
+    def class_codes(self) -> tuple[np.ndarray, np.ndarray]:
+        """Class of each group, along with size of each class"""
+        codes, counts = self.combine()
+        n = len(self.quasi_identifiers)
+        classes, size = group_codes(
+            codes[:n],
+            [len(self.dictionaries[x]) for x in self.quasi_identifiers],
+        )
+        sizes = np.bincount(classes, weights = counts, minlength = size)
+        return classes, sizes.astype(np.int64)
+
+
+def count_groups(
+    batches: Iterable[pd.DataFrame],
+    quasi_identifiers: list[str],
+    sensitive: str | None = None,
+) -> GroupCounts:
+    counts = GroupCounts(quasi_identifiers, sensitive)
+    for ds in batches:
+        counts.update(ds)
+    return counts
+
+
+def chunks(df: pd.DataFrame, chunksize: int = 1_000_000) -> Iterable[pd.DataFrame]:
+    for start in range(0, max(len(df), 1), chunksize):
+        checkpoint(start, len(df), 'Counting equivalence classes')
+        yield df.iloc[start:start + chunksize]
+
+
+class KAnonymityReport(BaseModel):
+    """Sizes of equivalence classes"""
+    records: int
+    classes: int = Field(description = 'Number of distinct combinations of quasi-identifier values.')
+    k: int = Field(description = 'Size of the smallest class. Every record shares its quasi-identifiers with at least k - 1 others.')
+    smallest_classes: list[int] = Field(
+        description = 'Sizes of the smallest classes, smallest first.',
+    )
+    classes_below_target: int | None = Field(
+        None,
+        description = 'Number of classes smaller than target k.',
+    )
+    records_below_target: int | None = Field(
+        None,
+        description = 'Number of records in classes smaller than target k, which need further generalization or suppression.',
+    )
+
+
+def evaluate_k_anonymity(counts: GroupCounts, target: int | None = None) -> KAnonymityReport:
+    sizes = np.sort(counts.class_codes()[1])
+    report = KAnonymityReport(
+        records = int(sizes.sum()),
+        classes = len(sizes),
+        k = int(sizes[0]) if len(sizes) else 0,
+        smallest_classes = sizes[:SMALLEST].tolist(),
+    )
+    if target is not None:
+        below = sizes[sizes < target]
+        report.classes_below_target = len(below)
+        report.records_below_target = int(below.sum())
+    return report
+
+
+class LDiversityReport(BaseModel):
+    """Diversity of sensitive values within equivalence classes"""
+    classes: int = Field(description = 'Number of distinct combinations of quasi-identifier values.')
+    l: int = Field(description = 'Least number of distinct sensitive values within a class.')
+    entropy_l: float = Field(
+        description = (
+            'Least exponential of entropy of sensitive values within a class.'
+            ' Unlike `l`, it is low when a single value dominates a class.'
+        ),
+    )
+    least_diverse_classes: list[int] = Field(
+        description = 'Number of distinct sensitive values of the least diverse classes, least first.',
+    )
+    classes_below_target: int | None = Field(
+        None,
+        description = 'Number of classes with fewer distinct sensitive values than target l.',
+    )
+
+
+def evaluate_l_diversity(counts: GroupCounts, target: int | None = None) -> LDiversityReport:
+    codes, sizes = counts.class_codes()
+    values = counts.combine()[1]
+    distinct = np.bincount(codes, minlength = len(sizes))
+    share = values / sizes[codes]
+    entropy = -np.bincount(codes, weights = share * np.log(share), minlength = len(sizes))
+    report = LDiversityReport(
+        classes = len(sizes),
+        l = int(distinct.min()) if len(sizes) else 0,
+        entropy_l = float(np.exp(entropy.min())) if len(sizes) else 0.0,
+        least_diverse_classes = np.sort(distinct)[:SMALLEST].tolist(),
+    )
+    if target is not None:
+        report.classes_below_target = int((distinct < target).sum())
+    return report
+
+
+class TClosenessReport(BaseModel):
+    """Distance between distribution of sensitive values within each class and in whole dataset"""
+    classes: int = Field(description = 'Number of distinct combinations of quasi-identifier values.')
+    t: float = Field(description = 'Largest distance of a class, between 0 and 1.')
+    ordered: bool = Field(
+        description = (
+            'Whether sensitive values are ordered, so distance accounts for how far apart values are.'
+            ' Otherwise every pair of distinct values is equally far apart.'
+        ),
+    )
+    farthest_classes: list[float] = Field(
+        description = "Distances of the classes farthest from whole dataset, farthest first.",
+    )
+    classes_above_target: int | None = Field(
+        None,
+        description = 'Number of classes farther than target t.',
+    )
+
+
+def ordered_distances(
+    codes: np.ndarray,
+    value_codes: np.ndarray,
+    share: np.ndarray,
+    overall: np.ndarray,
+    classes: int,
+) -> np.ndarray:
+    """Earth mover's distance between ordered distributions of classes and whole dataset.
+
+    Distance sums absolute difference of cumulative shares over values.
+    Cumulative share of a class only changes at values occurring in it, so
+    the sum splits into runs of values where it is constant. Cumulative
+    share of whole dataset only grows, so over each run, sum of absolute
+    differences from a constant is found by binary search and prefix sums.
+    """
+    m = len(overall)
+    if len(codes) == 0:
+        return np.zeros(classes)
+    # Last cumulative difference is always zero
+    cumulative = np.cumsum(overall)[:-1]
+    prefix = np.concatenate([[0.0], np.cumsum(cumulative)])
+    if classes * m < MAX_KEY:
+        # Sorting single integer key is much faster than sorting by two
+        order = np.argsort(codes.astype(np.int64) * m + value_codes)
+    else:
+        order = np.lexsort((value_codes, codes))
+    codes, value_codes, share = codes[order], value_codes[order], share[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    lasts = np.r_[starts[1:], len(codes)] - 1
+    # Share of class up to and including each of its values
+    running = np.cumsum(share)
+    running -= np.repeat(running[starts] - share[starts], lasts - starts + 1)
+    # Run from each value to the next value of the same class, or to the end
+    ends = np.r_[value_codes[1:], m - 1]
+    ends[lasts] = m - 1
+    begins = np.minimum(value_codes, ends)
+    split = np.clip(np.searchsorted(cumulative, running), begins, ends)
+    runs = (
+        running * (split - begins) - (prefix[split] - prefix[begins])
+        + (prefix[ends] - prefix[split]) - running * (ends - split)
+    )
+    distances = np.bincount(codes, weights = runs, minlength = classes)
+    # Before first value of class, its cumulative share is zero
+    distances += np.bincount(codes[starts], weights = prefix[value_codes[starts]], minlength = classes)
+    return distances / (m - 1)
+
+
+def evaluate_t_closeness(
+    counts: GroupCounts,
+    ordered: bool,
+    target: float | None = None,
+) -> TClosenessReport:
+    """Earth mover's distance of each class, as defined for t-closeness"""
+    codes, sizes = counts.class_codes()
+    labels, values = counts.combine()
+    value_codes = labels[-1]
+    m = len(counts.dictionaries[counts.sensitive])
+    if ordered:
+        # Number values by their order rather than first appearance
+        order = counts.dictionaries[counts.sensitive].values.argsort()
+        rank = np.empty(m, dtype = np.intp)
+        rank[order] = np.arange(m)
+        value_codes = rank[value_codes]
+    share = values / sizes[codes]
+    overall = np.bincount(value_codes, weights = values, minlength = m)
+    overall /= overall.sum()
+    # Only values occurring in class are visited, so cost grows with groups
+    # rather than with classes times distinct values
+    if ordered and m > 1:
+        distances = ordered_distances(codes, value_codes, share, overall, len(sizes))
+    else:
+        # Values missing from class differ by their whole share overall
+        near = np.abs(share - overall[value_codes]) - overall[value_codes]
+        distances = (1 + np.bincount(codes, weights = near, minlength = len(sizes))) / 2
+    report = TClosenessReport(
+        classes = len(sizes),
+        t = float(distances.max()) if len(sizes) else 0.0,
+        ordered = ordered,
+        farthest_classes = np.sort(distances)[::-1][:SMALLEST].tolist(),
+    )
+    if target is not None:
+        report.classes_above_target = int((distances > target).sum())
+    return report
+
+
+def is_ordered(series: pd.Series) -> bool:
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return bool(dtype.ordered)
+    return (
+        pd.api.types.is_numeric_dtype(dtype)
+        and not pd.api.types.is_bool_dtype(dtype)
+    )
+
+
+def get_k_anonymity(
+    df: pd.DataFrame,
+    quasi_identifiers: list[str],
+    k: int | None = None,
+) -> KAnonymityReport:
+    return evaluate_k_anonymity(count_groups(chunks(df), quasi_identifiers), k)
+
+
+def get_l_diversity(
+    df: pd.DataFrame,
+    quasi_identifiers: list[str],
+    sensitive: str,
+    l: int | None = None,
+) -> LDiversityReport:
+    return evaluate_l_diversity(count_groups(chunks(df), quasi_identifiers, sensitive), l)
+
+
+def get_t_closeness(
+    df: pd.DataFrame,
+    quasi_identifiers: list[str],
+    sensitive: str,
+    t: float | None = None,
+) -> TClosenessReport:
+    if sensitive not in df:
+        raise KeyError(f'Fields not in dataset: {sensitive}')
+    counts = count_groups(chunks(df), quasi_identifiers, sensitive)
+    return evaluate_t_closeness(counts, is_ordered(df[sensitive]), t)
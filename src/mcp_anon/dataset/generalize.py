@@ -0,0 +1,353 @@
+"""Search generalization of quasi-identifiers reaching k-anonymity.
+
+Each quasi-identifier has a hierarchy of generalization levels, from its
+original values up to a single value. A combination of levels, one per
+field, is a node of generalization lattice. Generalizing any field further
+never makes a class smaller, so if a node is k-anonymous, so is every node
+above it. Search finds the lowest height of lattice with k-anonymous nodes
+by binary search, and picks the one losing the least information there.
+
+Only full-domain generalization is searched, where each field is
+generalized alike in every record, so that result can be written as
+ordinary transformation steps.
+"""
+
+from typing import Annotated, Literal, Union
+from concurrent.futures import ProcessPoolExecutor
+import math
+import multiprocessing
+import os
+
+from pydantic import BaseModel, Field
+import numpy as np
+import pandas as pd
+
+from mcp_anon.pipeline.pandas import BinTransform, DropTransform, MaskTransform
+from mcp_anon.dataset.evaluate import class_sizes
+from mcp_anon.worker import checkpoint
+
+
+class NumericHierarchy(BaseModel):
+    """Equal-width bins, each level twice as wide as the one below"""
+    type: Literal['numeric'] = 'numeric'
+    field: str
+    low: float
+    high: float
+    width: float
+
+    def edges(self, level: int) -> list[int | float]:
+        width = self.width * 2 ** (level - 1)
+        count = max(1, math.ceil((self.high - self.low) / width))
+        edges = [self.low + i * width for i in range(count + 1)]
+        # Rounding must not leave the highest value out of the last bin
+        edges[-1] = max(edges[-1], self.high)
+        if self.width.is_integer() and self.low.is_integer() and self.high.is_integer():
+            return [int(x) for x in edges]
+        return edges
+
+    def generalize(self, values: pd.Index, level: int) -> np.ndarray:
+        # Cut exactly as the emitted step will, so search sees the same classes
+        return pd.cut(
+            values,
+            bins = self.edges(level),
+            right = True,
+            include_lowest = True,
+        ).codes
+
+
+class PrefixHierarchy(BaseModel):
+    """Masking characters from the end, one more at each level"""
+    type: Literal['prefix'] = 'prefix'
+    field: str
+    length: int
+
+    def keep(self, level: int, levels: int) -> int:
+        # Spread levels evenly over length, ending with every character masked
+        return self.length - math.ceil(self.length * level / levels)
+
+    def generalize(self, values: pd.Index, level: int, levels: int) -> np.ndarray:
+        keep = self.keep(level, levels)
+        masked = [x[:keep] + '*' * (len(x) - keep) for x in values.astype(str)]
+        return pd.factorize(np.array(masked, dtype = object))[0]
+
+
+class SuppressHierarchy(BaseModel):
+    """Either keeping field or removing it altogether"""
+    type: Literal['suppress'] = 'suppress'
+    field: str
+
+
+Hierarchy = Annotated[
+    Union[NumericHierarchy, PrefixHierarchy, SuppressHierarchy],
+    Field(discriminator = 'type'),
+]
+
+
+class Generalization(BaseModel):
+    """Result of generalization search"""
+    steps: list[BinTransform | MaskTransform | DropTransform] = Field(
+        description = 'Transformation steps generalizing quasi-identifiers, in order.',
+    )
+    levels: dict[str, int] = Field(
+        description = 'Chosen level of each quasi-identifier, 0 being original values.',
+    )
+    heights: dict[str, int] = Field(
+        description = 'Highest level of each quasi-identifier, where it has a single value.',
+    )
+    information_loss: float = Field(
+        description = 'Average of level relative to highest level over quasi-identifiers, between 0 and 1.',
+    )
+    k: int = Field(description = 'Size of the smallest equivalence class after generalization.')
+    evaluated: int = Field(description = 'Number of lattice nodes evaluated against dataset.')
+
+
+def build_hierarchy(series: pd.Series, levels: int) -> tuple[Hierarchy, int]:
+    """Hierarchy of field along with its number of levels above original values"""
+    values = series.dropna()
+    dtype = series.dtype
+    if (
+        pd.api.types.is_numeric_dtype(dtype)
+        and not pd.api.types.is_bool_dtype(dtype)
+        and len(values)
+    ):
+        low, high = float(values.min()), float(values.max())
+        distinct = values.nunique()
+        height = max(1, min(levels, math.ceil(math.log2(max(distinct, 2)))))
+        width = (high - low) / 2 ** (height - 1) or 1.0
+        if pd.api.types.is_integer_dtype(dtype):
+            low, width = math.floor(low), float(max(1, math.ceil(width)))
+        hierarchy = NumericHierarchy(field = series.name, low = low, high = high, width = width)
+        return hierarchy, height
+    if pd.api.types.is_string_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype):
+        length = int(values.astype(str).str.len().max()) if len(values) else 0
+        if length > 0:
+            return PrefixHierarchy(field = series.name, length = length), min(levels, length)
+    return SuppressHierarchy(field = series.name), 1
+
+
+def level_codes(
+    series: pd.Series,
+    hierarchy: Hierarchy,
+    height: int,
+) -> tuple[np.ndarray, list[np.ndarray]]:
+    """Code of original value of each record, and code of generalized value at each level.
+
+    Generalized codes are indexed by original code, so generalizing field
+    to any level only takes looking up the codes of records.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel = False)
+    uniques = pd.Index(uniques)
+    present = ~uniques.isna()
+    levels = [np.arange(len(uniques))]
+    for level in range(1, height + 1):
+        if isinstance(hierarchy, SuppressHierarchy):
+            generalized = np.zeros(len(uniques), dtype = np.int64)
+        else:
+            generalized = np.full(len(uniques), -1, dtype = np.int64)
+            if isinstance(hierarchy, NumericHierarchy):
+                values = hierarchy.generalize(uniques[present], level)
+            else:
+                values = hierarchy.generalize(uniques[present], level, height)
+            generalized[present] = pd.factorize(values)[0]
+            # Missing value stays a value of its own
+            generalized[~present] = generalized.max() + 1
+        levels.append(generalized)
+    return codes, levels
+
+
+# Fewest records worth evaluating by pool of processes by default
+MIN_PARALLEL = 100_000
+
+# Levels of lattice grow exponentially with number of quasi-identifiers
+MAX_QUASI_IDENTIFIERS = 12
+
+def smallest_class(
+    fields: list[tuple[np.ndarray, list[np.ndarray]]],
+    node: tuple[int, ...],
+) -> tuple[int, int]:
+    """Size of the smallest class and discernibility of records generalized to node"""
+    generalized = []
+    sizes = []
+    for (codes, levels), level in zip(fields, node):
+        table = levels[level]
+        generalized.append(table[codes])
+        sizes.append(int(table.max()) + 1 if len(table) else 0)
+    counts = class_sizes(generalized, sizes)
+    if len(counts) == 0:
+        return 0, 0
+    return int(counts.min()), int((counts.astype(np.int64) ** 2).sum())
+
+
+# Codes of quasi-identifiers in spawned worker process, set once by initializer.
+# Never set in server process, where searches of sessions run concurrently.
+_codes: list[tuple[np.ndarray, list[np.ndarray]]] = []
+
+
+def _initialize(codes: list[tuple[np.ndarray, list[np.ndarray]]]) -> None:
+    global _codes
+    _codes = codes
+
+
+def _smallest_class(node: tuple[int, ...]) -> tuple[int, int]:
+    return smallest_class(_codes, node)
+
+
+def lattice_height(heights: list[int], height: int) -> list[tuple[int, ...]]:
+    """Nodes of lattice whose levels sum to height"""
+    if not heights:
+        return [()] if height == 0 else []
+    first, rest = heights[0], heights[1:]
+    # Bounds leave rest of levels able to reach remaining height
+    low, high = max(height - sum(rest), 0), min(first, height)
+    return [
+        (level, *node)
+        for level in range(low, high + 1)
+        for node in lattice_height(rest, height - level)
+    ]
+
+
+def information_loss(node: tuple[int, ...], heights: list[int]) -> float:
+    """Precision metric, average of level relative to height over fields"""
+    return sum(level / height for level, height in zip(node, heights)) / len(node)
+
+
+def to_steps(
+    hierarchies: list[Hierarchy],
+    heights: list[int],
+    node: tuple[int, ...],
+) -> list[BinTransform | MaskTransform | DropTransform]:
+    steps = []
+    for hierarchy, height, level in zip(hierarchies, heights, node):
+        if level == 0:
+            continue
+        match hierarchy:
+            case NumericHierarchy():
+                steps.append(BinTransform(
+                    input_field = hierarchy.field,
+                    bins = hierarchy.edges(level),
+                    include_lowest = True,
+                ))
+            case PrefixHierarchy():
+                keep = hierarchy.keep(level, height)
+                steps.append(MaskTransform(
+                    field = hierarchy.field,
+                    # Every character preceded by at least `keep` others
+                    regex = f'(?<=.{{{keep}}}).' if keep else '.',
+                ))
+            case SuppressHierarchy():
+                steps.append(DropTransform(fields = hierarchy.field))
+    return steps
+
+
+class NoGeneralizationException(Exception):
+    def __init__(self, message = 'No generalization of quasi-identifiers reaches target k.'):
+        super().__init__(message)
+
+
+def generalize(
+    ds: pd.DataFrame,
+    quasi_identifiers: list[str],
+    k: int,
+    levels: int = 8,
+    workers: int | None = None,
+) -> Generalization:
+    """Find generalization of quasi-identifiers making dataset k-anonymous.
+
+    Nodes of lattice at the same height are evaluated in parallel by a pool
+    of `workers` processes. If not given, datasets too small to make up
+    for starting processes are evaluated in this process, others by one
+    process per CPU.
+    """
+    missing = [x for x in quasi_identifiers if x not in ds]
+    if missing:
+        raise KeyError(f'Fields not in dataset: {', '.join(missing)}')
+    hierarchies = []
+    heights = []
+    codes = []
+    for field in quasi_identifiers:
+        hierarchy, height = build_hierarchy(ds[field], levels)
+        hierarchies.append(hierarchy)
+        heights.append(height)
+        codes.append(level_codes(ds[field], hierarchy, height))
+
+    if workers is None:
+        workers = 1 if len(ds) < MIN_PARALLEL else os.process_cpu_count()
+    results: dict[tuple[int, ...], tuple[int, int]] = {}
+    inferred: dict[tuple[int, ...], bool] = {}
+
+    # Nodes known k-anonymous, and nodes known not to be
+    passed: list[tuple[int, ...]] = []
+    failed: list[tuple[int, ...]] = []
+
+    def evaluate(nodes: list[tuple[int, ...]], executor) -> None:
+        pending = []
+        for node in nodes:
+            if node in results or node in inferred:
+                continue
+            # Generalization of k-anonymous node is k-anonymous,
+            # specialization of node which is not is not either
+            if any(all(a >= b for a, b in zip(node, x)) for x in passed):
+                inferred[node] = True
+            elif any(all(a <= b for a, b in zip(node, x)) for x in failed):
+                inferred[node] = False
+            else:
+                pending.append(node)
+        if executor is None:
+            found = [smallest_class(codes, x) for x in pending]
+        else:
+            found = executor.map(
+                _smallest_class,
+                pending,
+                chunksize = max(1, len(pending) // (4 * workers)),
+            )
+        for node, result in zip(pending, found):
+            results[node] = result
+            (passed if result[0] >= k else failed).append(node)
+
+    def is_anonymous(node: tuple[int, ...]) -> bool:
+        if node in results:
+            return results[node][0] >= k
+        return inferred[node]
+
+    def anonymous(height: int, executor) -> list[tuple[int, ...]]:
+        checkpoint(height, sum(heights), f'Evaluating generalizations of height {height}')
+        nodes = lattice_height(heights, height)
+        evaluate(nodes, executor)
+        return [x for x in nodes if is_anonymous(x)]
+
+    def search(executor) -> tuple[int, ...]:
+        # Lowest height with k-anonymous node, which exists at every height above
+        low, high = 0, sum(heights)
+        if not anonymous(high, executor):
+            raise NoGeneralizationException()
+        while low < high:
+            middle = (low + high) // 2
+            if anonymous(middle, executor):
+                high = middle
+            else:
+                low = middle + 1
+        return min(
+            anonymous(low, executor),
+            key = lambda x: (information_loss(x, heights), results[x][1]),
+        )
+
+    if workers == 1:
+        node = search(None)
+    else:
+        # Do not fork a server which may be running other threads
+        with ProcessPoolExecutor(
+            max_workers = workers,
+            mp_context = multiprocessing.get_context('spawn'),
+            initializer = _initialize,
+            initargs = (codes,),
+        ) as executor:
+            node = search(executor)
+
+    return Generalization(
+        steps = to_steps(hierarchies, heights, node),
+        levels = dict(zip(quasi_identifiers, node)),
+        heights = dict(zip(quasi_identifiers, heights)),
+        information_loss = information_loss(node, heights),
+        k = results[node][0],
+        evaluated = len(results),
+    )
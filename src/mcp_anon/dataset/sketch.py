@@ -0,0 +1,198 @@
+"""Mergeable summaries of data seen one batch at a time.
+
+Summaries of separate batches, possibly computed in separate processes,
+can be merged into the summary of all those batches together.
+"""
+
+from typing import Self
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class Moments:
+    """Count, mean and variance updated in a numerically stable way"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        # Sum of squared differences from mean
+        self.m2 = 0.0
+
+    def update(self, values: np.ndarray) -> None:
+        if len(values) == 0:
+            return
+        other = Moments()
+        other.count = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        self.merge(other)
+
+    def merge(self, other: Self) -> None:
+        count = self.count + other.count
+        if other.count == 0:
+            return
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+
+    @property
+    def variance(self) -> float:
+        """Sample variance, as by `pandas.Series.var()`"""
+        if self.count < 2:
+            return math.nan
+        return self.m2 / (self.count - 1)
+
+
+class QuantileSketch:
+    """Approximate distribution for quantiles, in the manner of KLL sketch.
+
+    Items are kept in levels, where each item at level `h` stands for `2**h`
+    original items. Once a level grows beyond its capacity, it is sorted and
+    every other item is promoted to the next level. Lower levels have smaller
+    capacity, so memory stays around `3 * k` items however much data is seen.
+
+    Quantiles are exact while no more than `k` items have been seen.
+    """
+
+    def __init__(self, k: int = 200, seed: int | None = None):
+        self.k = k
+        self.levels: list[np.ndarray] = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    @property
+    def count(self) -> int:
+        return sum(len(items) << h for h, items in enumerate(self.levels))
+
+    def capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def update(self, values: np.ndarray) -> None:
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.compact()
+
+    def merge(self, other: Self) -> None:
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.compact()
+
+    def compact(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) <= self.capacity(h):
+                h += 1
+                continue
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            # Odd item out stays, so no weight is lost
+            odd = len(items) % 2
+            promoted = items[odd:][self.rng.integers(2)::2]
+            self.levels[h] = items[:odd]
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            # New level shrinks capacity of levels below
+            h = 0
+
+    def quantiles(self, qs: list[float]) -> list[float]:
+        """Quantiles interpolated linearly, as by `pandas.Series.quantile()`"""
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return [math.nan] * len(qs)
+        weights = np.concatenate([
+            np.full(len(items), 1 << h)
+            for h, items in enumerate(self.levels)
+        ])
+        order = np.argsort(items, kind = 'stable')
+        items, weights = items[order], weights[order]
+        # Item of weight `w` spans `w` positions in sorted data
+        centers = np.cumsum(weights) - (weights + 1) / 2
+        positions = np.asarray(qs) * (weights.sum() - 1)
+        return np.interp(positions, centers, items).tolist()
+
+
+def bit_length(values: np.ndarray) -> np.ndarray:
+    """Number of bits needed to write each unsigned 64-bit integer"""
+    # Halves are exactly representable as float, unlike whole 64-bit integer
+    high = np.frexp((values >> np.uint64(32)).astype(float))[1]
+    low = np.frexp((values & np.uint64(0xFFFFFFFF)).astype(float))[1]
+    return np.where(high > 0, high + 32, low)
+
+
+class HyperLogLog:
+    """Approximate number of distinct 64-bit hashes.
+
+    Memory is `2 ** precision` bytes however many hashes are seen.
+    """
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype = np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        """Relative standard error of estimate"""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update(self, hashes: np.ndarray) -> None:
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        # Position of first set bit among the remaining bits
+        rank = 64 - bit_length(hashes << p) + 1
+        rank = np.minimum(rank, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: Self) -> None:
+        np.maximum(self.registers, other.registers, out = self.registers)
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.ldexp(1.0, -self.registers.astype(int)).sum()
+        zeros = int((self.registers == 0).sum())
+        if estimate <= 2.5 * m and zeros > 0:
+            # Linear counting is more accurate for few distinct values
+            return m * math.log(m / zeros)
+        return float(estimate)
+
+
+class MisraGries:
+    """Approximate counts of the most frequent hashes.
+
+    Keeps at most `k` counters. Each count may be lower than true count by
+    at most `error`, and hashes with true count above `error` are kept.
+    """
+
+    def __init__(self, k: int = 1000):
+        self.k = k
+        self.counters = pd.Series(dtype = np.int64)
+        self.count = 0
+
+    @property
+    def error(self) -> int:
+        return (self.count - int(self.counters.sum())) // (self.k + 1)
+
+    def update(self, hashes: np.ndarray) -> None:
+        other = MisraGries(self.k)
+        other.counters = pd.Series(hashes).value_counts()
+        other.count = len(hashes)
+        self.merge(other)
+
+    def merge(self, other: Self) -> None:
+        counters = self.counters.add(other.counters, fill_value = 0).astype(np.int64)
+        if len(counters) > self.k:
+            # Decrement every counter by the (k + 1)-th largest count,
+            # which keeps at most k counters
+            threshold = counters.nlargest(self.k + 1).iloc[-1]
+            counters = counters[counters > threshold] - threshold
+        self.counters = counters
+        self.count += other.count
+
+    def top(self, n: int) -> list[int]:
+        """Counts of the `n` most frequent hashes, highest first"""
+        return self.counters.nlargest(n).tolist()
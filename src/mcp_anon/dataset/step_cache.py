@@ -0,0 +1,230 @@
+import logging
+_logger = logging.getLogger(__name__)
+from pathlib import Path
+from collections import OrderedDict
+from collections.abc import Iterator, Sequence
+from functools import cache
+import hashlib
+import shutil
+import tempfile
+import threading
+import weakref
+
+import pandas as pd
+import pyarrow as pa
+
+from mcp_anon.pipeline import Transform
+from mcp_anon.settings import get_settings
+
+
+def prefix_keys(origin: str, transforms: Sequence[Transform]) -> Iterator[str]:
+    """Identify dataset after each prefix of transform sequence.
+
+    Yield one key for the original dataset identified by `origin`, and one
+    more after each transform. Each key depends on the original dataset and
+    every step up to that point, so editing a step only changes keys from
+    that step onward.
+    """
+    key = hashlib.sha256(origin.encode())
+    yield key.hexdigest()
+    for transform in transforms:
+        key.update(transform.model_dump_json().encode())
+        yield key.hexdigest()
+
+
+def dataset_size(ds: pd.DataFrame) -> int:
+    return int(ds.memory_usage(deep = True).sum())
+
+
+class SpilledDataset:
+    """Dataset written to Arrow IPC file.
+
+    What Arrow can not restore exactly is kept in memory: field names,
+    datatypes, index, and categories of categorical fields, which are
+    written as their codes. Size is that of dataset in memory before it
+    was spilled, since mapped data would count as resident.
+    """
+
+    def __init__(self, path: Path, ds: pd.DataFrame):
+        arrays = {}
+        for i, (_, series) in enumerate(ds.items()):
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                arrays[str(i)] = pa.array(series.cat.codes.to_numpy())
+            else:
+                arrays[str(i)] = pa.array(series, from_pandas = True)
+        table = pa.table(arrays)
+        with pa.ipc.new_file(str(path), table.schema) as writer:
+            writer.write_table(table)
+        self.path = path
+        self.size = dataset_size(ds)
+        self.columns = ds.columns
+        self.dtypes = ds.dtypes.tolist()
+        self.index = ds.index
+
+    def load(self) -> pd.DataFrame:
+        """Read dataset back, mapping Arrow-backed fields from file without copying"""
+        with pa.memory_map(str(self.path)) as source:
+            table = pa.ipc.open_file(source).read_all()
+        arrays = {}
+        for i, dtype in enumerate(self.dtypes):
+            column = table.column(i)
+            if isinstance(dtype, pd.CategoricalDtype):
+                arrays[i] = pd.Categorical.from_codes(column.to_numpy(), dtype = dtype)
+            elif isinstance(dtype, pd.ArrowDtype):
+                arrays[i] = pd.arrays.ArrowExtensionArray(column)
+            else:
+                arrays[i] = column.to_pandas().astype(dtype)
+        ds = pd.DataFrame(arrays, index = self.index, copy = False)
+        ds.columns = self.columns
+        return ds
+
+    def delete(self) -> None:
+        self.path.unlink(missing_ok = True)
+
+
+class StepCache:
+    """Cache of intermediate datasets under a memory budget.
+
+    Least recently used datasets are evicted first once their total size
+    exceeds the budget. Evicted datasets are spilled to files in
+    `spill_directory` if given, and transparently read back when used
+    again. Cached datasets must never be modified in place.
+
+    Datasets held outside cache, such as loaded datasets and results of
+    sessions, are charged to the budget too. They can not be evicted, but
+    leave less of the budget for cached datasets.
+
+    Cache may be used from multiple threads at once.
+    """
+
+    def __init__(self, budget: int, spill_directory: Path | None = None):
+        self.budget = budget
+        self.spill_directory = spill_directory
+        self.entries: OrderedDict[str, tuple[pd.DataFrame, int]] = OrderedDict()
+        self.spilled: dict[str, SpilledDataset] = {}
+        self.size = 0
+        # Number of holders and size of each dataset held outside cache
+        self.held: dict[str, tuple[int, int]] = {}
+        self._lock = threading.RLock()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self.entries or key in self.spilled
+
+    @property
+    def charged(self) -> int:
+        """Size of cached datasets in memory along with datasets held outside cache"""
+        with self._lock:
+            # Held dataset which is also cached is only counted once
+            return self.size + sum(
+                size
+                for key, (_, size) in self.held.items()
+                if key not in self.entries
+            )
+
+    @property
+    def spill_files(self) -> Path:
+        """Directory of files spilled by this cache alone"""
+        if '_spill_files' not in self.__dict__:
+            self.spill_directory.mkdir(parents = True, exist_ok = True)
+            self._spill_files = Path(tempfile.mkdtemp(dir = self.spill_directory))
+            # Do not leave spilled datasets behind once server stops
+            weakref.finalize(self, shutil.rmtree, self._spill_files, ignore_errors = True)
+        return self._spill_files
+
+    def get(self, key: str) -> pd.DataFrame | None:
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key][0]
+            if key not in self.spilled:
+                return None
+            spilled = self.spilled[key]
+            _logger.info(f'Reading spilled dataset: {spilled.path}')
+            ds = spilled.load()
+            # Spilled file is kept, so evicting dataset again does not
+            # rewrite it. Dataset over budget is only ever read from file.
+            if spilled.size <= self.budget:
+                self.insert(key, ds, spilled.size)
+            return ds
+
+    def put(self, key: str, ds: pd.DataFrame) -> None:
+        with self._lock:
+            self.discard(key)
+            size = dataset_size(ds)
+            if size > self.budget:
+                _logger.info(f'Dataset of {size} bytes exceeds memory budget')
+                self.spill(key, ds)
+                return
+            self.insert(key, ds, size)
+
+    def insert(self, key: str, ds: pd.DataFrame, size: int) -> None:
+        self.entries[key] = (ds, size)
+        self.size += size
+        self.evict()
+
+    def evict(self) -> None:
+        while self.entries and self.charged > self.budget:
+            evicted, (evicted_ds, evicted_size) = self.entries.popitem(last = False)
+            self.size -= evicted_size
+            self.spill(evicted, evicted_ds)
+
+    def spill(self, key: str, ds: pd.DataFrame) -> None:
+        if key in self.spilled:
+            # Dataset read back from file is still there
+            return
+        if self.spill_directory is None:
+            _logger.debug(f'Evicted dataset from step cache: {key}')
+            return
+        path = self.spill_files / f'{key}.arrow'
+        try:
+            self.spilled[key] = SpilledDataset(path, ds)
+        except (pa.ArrowException, OSError) as e:
+            _logger.warning(f'Can not spill dataset to disk. {e}')
+            path.unlink(missing_ok = True)
+        else:
+            _logger.info(f'Spilled dataset to: {path}')
+
+    def hold(self, key: str, ds: pd.DataFrame) -> None:
+        """Charge dataset held outside cache to memory budget until it is released"""
+        with self._lock:
+            refs, size = self.held.get(key, (0, None))
+            if size is None:
+                size = self.entries[key][1] if key in self.entries else dataset_size(ds)
+            self.held[key] = (refs + 1, size)
+            self.evict()
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            refs, size = self.held.pop(key)
+            if refs > 1:
+                self.held[key] = (refs - 1, size)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            if key in self.entries:
+                _, size = self.entries.pop(key)
+                self.size -= size
+            if key in self.spilled:
+                self.spilled.pop(key).delete()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+            self.size = 0
+            for spilled in self.spilled.values():
+                spilled.delete()
+            self.spilled.clear()
+
+
+@cache
+def get_step_cache() -> StepCache:
+    """Step cache shared by all sessions, so they also share its memory budget.
+
+    Datasets loaded by sessions are charged to it through dataset store.
+    """
+    settings = get_settings()
+    return StepCache(
+        settings.memory_limit,
+        spill_directory = Path(settings.pipeline_file).parent / '.spill',
+    )
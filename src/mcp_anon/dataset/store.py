@@ -0,0 +1,83 @@
+import logging
+_logger = logging.getLogger(__name__)
+from collections.abc import Callable
+from functools import cache
+import threading
+import uuid
+
+import pandas as pd
+
+from mcp_anon.pipeline import Load
+from mcp_anon.dataset.step_cache import StepCache, get_step_cache
+
+
+class StoredDataset:
+    """Loaded dataset shared by sessions with identical loader"""
+
+    def __init__(self, key: str):
+        self.key = key
+        # Identify this particular load of source data.
+        # Reloading after source changed must not reuse results derived from it.
+        self.token = f'{key}-{uuid.uuid4().hex}'
+        self.refs = 0
+        self.ds: pd.DataFrame | None = None
+        self.loading = threading.Lock()
+
+
+class DatasetStore:
+    """Loaded datasets shared between sessions.
+
+    Sessions with identical loader configuration share a single read-only
+    dataset, which is only loaded once. Dataset is dropped once no session
+    holds it anymore.
+
+    Loaded datasets are charged to memory budget of `step_cache` if given.
+    """
+
+    def __init__(self, step_cache: StepCache | None = None):
+        self.entries: dict[str, StoredDataset] = {}
+        self.step_cache = step_cache
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(load: Load) -> str:
+        return load.model_dump_json()
+
+    def acquire(self, load: Load, read: Callable[[], pd.DataFrame]) -> StoredDataset:
+        """Get dataset of loader, calling `read` only if no session holds it yet.
+
+        Every acquired dataset must later be released.
+        """
+        key = self.key(load)
+        with self._lock:
+            entry = self.entries.setdefault(key, StoredDataset(key))
+            entry.refs += 1
+        # Concurrent sessions wait for the first one to finish loading
+        with entry.loading:
+            if entry.ds is None:
+                try:
+                    ds = read()
+                except BaseException:
+                    self.release(entry)
+                    raise
+                if self.step_cache is not None:
+                    self.step_cache.hold(entry.token, ds)
+                entry.ds = ds
+            else:
+                _logger.info('Sharing dataset loaded by another session')
+        return entry
+
+    def release(self, entry: StoredDataset) -> None:
+        with self._lock:
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            if self.entries.get(entry.key) is entry:
+                del self.entries[entry.key]
+            if entry.ds is not None and self.step_cache is not None:
+                self.step_cache.release(entry.token)
+
+
+@cache
+def get_dataset_store() -> DatasetStore:
+    return DatasetStore(get_step_cache())
@@ -0,0 +1,108 @@
+from typing import Self
+from collections.abc import Iterable
+
+from pydantic import BaseModel, Field, RootModel
+import pandas as pd
+
+from mcp_anon.dataset.sketch import HyperLogLog, MisraGries
+from mcp_anon.dataset.view.stats import dataset_chunks
+
+
+class FieldProfile(BaseModel):
+    """Estimates of how well a field tells records apart.
+
+    Values of field are never reported, only how often they occur.
+    """
+    count: int = Field(description = 'Number of non-missing values.')
+    distinct: float = Field(description = 'Estimated number of distinct non-missing values.')
+    distinct_error: float = Field(
+        description = 'Relative standard error of `distinct`, e.g. 0.01 for 1%.',
+    )
+    uniqueness: float = Field(
+        description = (
+            'Estimated ratio of distinct values to non-missing values.'
+            ' Close to 1 suggests field alone identifies records.'
+        ),
+    )
+    top_frequencies: list[int] = Field(
+        description = (
+            'Number of occurrences of the most frequent values, highest first.'
+            ' Each may be lower than true number by at most `frequency_error`.'
+        ),
+    )
+    frequency_error: int = Field(
+        description = 'Upper bound of undercount in `top_frequencies`.',
+    )
+
+
+class DatasetProfile(RootModel[dict[str, FieldProfile]]):
+    """Maps from field name to its profile."""
+    pass
+
+
+class FieldProfileAccumulator:
+
+    def __init__(self):
+        self.distinct = HyperLogLog()
+        self.frequent = MisraGries()
+
+    def update(self, series: pd.Series) -> None:
+        hashes = pd.util.hash_pandas_object(series.dropna(), index = False).to_numpy()
+        self.distinct.update(hashes)
+        self.frequent.update(hashes)
+
+    def merge(self, other: Self) -> None:
+        self.distinct.merge(other.distinct)
+        self.frequent.merge(other.frequent)
+
+    def result(self, top: int = 10) -> FieldProfile:
+        count = self.frequent.count
+        # Estimate may slightly exceed count of values it is counting
+        distinct = min(self.distinct.estimate(), float(count))
+        return FieldProfile(
+            count = count,
+            distinct = distinct,
+            distinct_error = self.distinct.relative_error,
+            uniqueness = distinct / count if count else 0.0,
+            top_frequencies = self.frequent.top(top),
+            frequency_error = self.frequent.error,
+        )
+
+
+class DatasetProfileAccumulator:
+    """Profile of dataset computed in one pass over its batches.
+
+    Memory used per field is fixed however large dataset is. Accumulators
+    of separate batches can be merged.
+    """
+
+    def __init__(self):
+        self.fields: dict[str, FieldProfileAccumulator] = {}
+
+    def update(self, ds: pd.DataFrame) -> None:
+        for name, series in ds.items():
+            self.fields.setdefault(name, FieldProfileAccumulator()).update(series)
+
+    def merge(self, other: Self) -> None:
+        for name, field in other.fields.items():
+            if name in self.fields:
+                self.fields[name].merge(field)
+            else:
+                self.fields[name] = field
+
+    def result(self) -> DatasetProfile:
+        return DatasetProfile({
+            name: field.result()
+            for name, field in self.fields.items()
+        })
+
+
+def stream_dataset_profile(batches: Iterable[pd.DataFrame]) -> DatasetProfile:
+    accumulator = DatasetProfileAccumulator()
+    for ds in batches:
+        accumulator.update(ds)
+    return accumulator.result()
+
+
+def get_dataset_profile(df: pd.DataFrame, chunksize: int = 100_000) -> DatasetProfile:
+    return stream_dataset_profile(dataset_chunks(df, chunksize, 'Profiling dataset'))
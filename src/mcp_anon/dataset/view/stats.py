@@ -1,12 +1,27 @@
-from pydantic import RootModel
+from typing import Self
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from functools import cache
+import copy
+import threading
+
+from pydantic import BaseModel, RootModel
+import numpy as np
 import pandas as pd
 
+from mcp_anon.dataset.sketch import HyperLogLog, MisraGries, Moments, QuantileSketch
+from mcp_anon.worker import checkpoint
+
 
 class FieldStats(RootModel[dict[str, float]]):
     """List statistics for a particular field.
 
     Maps from statistics name to its value.
     Stats name corresponds those produced by `pandas.DataFrame.describe()`.
+    Numeric fields have `count`, `mean`, `std`, `min`, percentiles and `max`.
+    Other fields have `count`, `unique` and `freq`, but not the most
+    frequent value itself. For fields with more than 100,000 distinct
+    values, `unique` and `freq` are estimated.
     """
     pass
 
@@ -16,8 +31,189 @@ class DatasetStats(RootModel[dict[str, FieldStats]]):
     pass
 
 
-def get_dataset_stats(df: pd.DataFrame) -> DatasetStats:
-    return DatasetStats(
-        df.describe().to_dict()
+def is_numeric(series: pd.Series) -> bool:
+    # Like `describe()`, booleans are summarized by counting
+    return (
+        pd.api.types.is_numeric_dtype(series.dtype)
+        and not pd.api.types.is_bool_dtype(series.dtype)
     )
 
+
+class NumericAccumulator:
+    percentiles = [0.25, 0.5, 0.75]
+
+    def __init__(self):
+        self.moments = Moments()
+        self.sketch = QuantileSketch(seed = 0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, series: pd.Series) -> None:
+        values = series.dropna().to_numpy(dtype = float)
+        if len(values) == 0:
+            return
+        self.moments.update(values)
+        self.sketch.update(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    def merge(self, other: Self) -> None:
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def result(self) -> dict[str, float]:
+        if self.moments.count == 0:
+            return {'count': 0.0}
+        quantiles = self.sketch.quantiles(self.percentiles)
+        return {
+            'count': float(self.moments.count),
+            'mean': self.moments.mean,
+            'std': float(np.sqrt(self.moments.variance)),
+            'min': float(self.min),
+            **{f'{p:.0%}': q for p, q in zip(self.percentiles, quantiles)},
+            'max': float(self.max),
+        }
+
+
+class FrequencyAccumulator:
+    """Counts of values by their hashes.
+
+    Counted exactly until more than `max_exact` distinct values are seen,
+    then by sketches of fixed size, as profile does, so memory stays
+    bounded however many distinct values field has.
+    """
+    max_exact = 100_000
+
+    def __init__(self):
+        self.counts: pd.Series | None = pd.Series(dtype = np.int64)
+        self.distinct: HyperLogLog | None = None
+        self.frequent: MisraGries | None = None
+
+    def update(self, series: pd.Series) -> None:
+        # Unobserved categories of categorical fields are not counted
+        hashes = pd.util.hash_pandas_object(series.dropna(), index = False).to_numpy()
+        other = FrequencyAccumulator()
+        other.counts = pd.Series(hashes).value_counts()
+        self.merge(other)
+
+    def estimate(self) -> None:
+        """Switch from exact counts to sketches"""
+        if self.counts is None:
+            return
+        hashes = self.counts.index.to_numpy(dtype = np.uint64)
+        self.distinct = HyperLogLog()
+        self.distinct.update(hashes)
+        exact = MisraGries()
+        exact.counters = self.counts
+        exact.count = int(self.counts.sum())
+        self.frequent = MisraGries()
+        self.frequent.merge(exact)
+        self.counts = None
+
+    def merge(self, other: Self) -> None:
+        if self.counts is not None and other.counts is not None:
+            self.counts = self.counts.add(other.counts, fill_value = 0).astype(np.int64)
+            if len(self.counts) > self.max_exact:
+                self.estimate()
+            return
+        self.estimate()
+        if other.counts is not None:
+            # Do not change accumulator being merged
+            other = copy.deepcopy(other)
+            other.estimate()
+        self.distinct.merge(other.distinct)
+        self.frequent.merge(other.frequent)
+
+    def result(self) -> dict[str, float]:
+        if self.counts is not None:
+            return {
+                'count': float(self.counts.sum()),
+                'unique': float(len(self.counts)),
+                'freq': float(self.counts.max()) if len(self.counts) else 0.0,
+            }
+        count = self.frequent.count
+        return {
+            'count': float(count),
+            'unique': float(min(round(self.distinct.estimate()), count)),
+            'freq': float(max(self.frequent.top(1), default = 0)),
+        }
+
+
+class DatasetStatsAccumulator:
+    """Statistics of dataset computed in one pass over its batches.
+
+    Accumulators of separate batches can be merged, even after being sent
+    between processes.
+    """
+
+    def __init__(self):
+        self.fields: dict[str, NumericAccumulator | FrequencyAccumulator] = {}
+
+    def update(self, ds: pd.DataFrame) -> None:
+        for name, series in ds.items():
+            if name not in self.fields:
+                if is_numeric(series):
+                    self.fields[name] = NumericAccumulator()
+                else:
+                    self.fields[name] = FrequencyAccumulator()
+            self.fields[name].update(series)
+
+    def merge(self, other: Self) -> None:
+        for name, field in other.fields.items():
+            if name in self.fields:
+                self.fields[name].merge(field)
+            else:
+                self.fields[name] = field
+
+    def result(self) -> DatasetStats:
+        return DatasetStats({
+            name: field.result()
+            for name, field in self.fields.items()
+        })
+
+
+def stream_dataset_stats(batches: Iterable[pd.DataFrame]) -> DatasetStats:
+    accumulator = DatasetStatsAccumulator()
+    for ds in batches:
+        accumulator.update(ds)
+    return accumulator.result()
+
+
+def dataset_chunks(df: pd.DataFrame, chunksize: int, message: str) -> Iterator[pd.DataFrame]:
+    """Split dataset to be summarized chunk by chunk, reporting progress"""
+    # Empty dataset still has fields to report
+    for start in range(0, max(len(df), 1), chunksize):
+        checkpoint(start, len(df), message)
+        yield df.iloc[start:start + chunksize]
+
+
+def get_dataset_stats(df: pd.DataFrame, chunksize: int = 100_000) -> DatasetStats:
+    return stream_dataset_stats(dataset_chunks(df, chunksize, 'Computing statistics'))
+
+
+class StatsCache:
+    """Statistics and profiles of recently viewed datasets, keyed like step cache"""
+
+    def __init__(self, size: int = 64):
+        self.size = size
+        self.entries: OrderedDict[str, BaseModel] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get[T: BaseModel](self, key: str, compute: Callable[[], T]) -> T:
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        stats = compute()
+        with self._lock:
+            self.entries[key] = stats
+            while len(self.entries) > self.size:
+                self.entries.popitem(last = False)
+        return stats
+
+
+@cache
+def get_stats_cache() -> StatsCache:
+    return StatsCache()
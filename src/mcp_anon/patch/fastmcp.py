@@ -1,11 +1,33 @@
-from typing import override
+import logging
+_logger = logging.getLogger(__name__)
+from typing import Any, override
+from pathlib import Path
+from functools import cache
+import hashlib
+import inspect
+import json
+import os
+import tempfile
 
+import fastmcp
 import jsonref
+import pydantic
 from fastmcp import FastMCP
+from fastmcp.tools import FunctionTool
 from fastmcp.utilities.json_schema import compress_schema
 
+import mcp_anon
+from mcp_anon.settings import get_settings
 
-def patch_schema(schema):
+
+# Bump whenever `patch_schema` changes, so schemas cached by older one are not used
+PATCH_VERSION = 2
+
+
+def patch_schema(schema, refs: bool = False):
+    if refs:
+        # Definitions shared within schema are sent once
+        return compress_schema(schema)
     return compress_schema(
         jsonref.replace_refs(
             schema,
@@ -14,15 +36,121 @@ def patch_schema(schema):
     )
 
 
+def schema_size(schema: dict | None) -> int:
+    """Bytes of schema as sent to clients"""
+    return 0 if schema is None else len(json.dumps(schema, separators = (',', ':')))
+
+
+@cache
+def source_hash() -> str:
+    """Hash of source of this package, along with libraries generating schemas.
+
+    Models in tool signatures are defined in this package, so any edit which
+    may change schemas changes the hash. Reading sources is much cheaper
+    than generating schemas from models.
+    """
+    digest = hashlib.sha256(json.dumps([
+        PATCH_VERSION,
+        fastmcp.__version__,
+        pydantic.__version__,
+    ]).encode())
+    root = Path(mcp_anon.__file__).parent
+    for path in sorted(root.rglob('*.py')):
+        digest.update(str(path.relative_to(root)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class SchemaCache:
+    """Patched schemas of tools as JSON files in a directory.
+
+    Schemas of tool are identified by the tool and hash of source defining
+    it, so a cached schema is found without generating schema at all.
+    """
+
+    def __init__(self, directory: Path | None, refs: bool = False):
+        self.directory = directory and Path(directory)
+        self.refs = refs
+
+    def key(self, fn) -> str:
+        text = json.dumps([source_hash(), self.refs, fn.__module__, fn.__qualname__])
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def path(self, fn) -> Path | None:
+        if self.directory is None:
+            return None
+        return self.directory / f'{self.key(fn)}.json'
+
+    def get(self, fn) -> dict[str, Any] | None:
+        """Cached schemas of tool, or None if not cached"""
+        path = self.path(fn)
+        if path is None:
+            return None
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def put(self, fn, schemas: dict[str, Any]) -> None:
+        """Write schemas file atomically. Failure to write is only logged."""
+        path = self.path(fn)
+        if path is None:
+            return
+        try:
+            self.directory.mkdir(parents = True, exist_ok = True)
+            with tempfile.NamedTemporaryFile(
+                'w',
+                dir = self.directory,
+                prefix = f'.{path.name}.',
+                delete = False,
+            ) as f:
+                json.dump(schemas, f)
+            os.replace(f.name, path)
+        except OSError as e:
+            _logger.warning(f'Can not cache tool schema. {e}')
+
+
 class PatchedFastMCP(FastMCP):
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        settings = get_settings()
+        self.schema_cache = SchemaCache(settings.schema_cache, refs = settings.schema_refs)
+
     # Workaround issue where some MCP-client refuses to accept `$ref` in json schema.
     # - [Claude-code used to have the problem.](https://github.com/jlowin/fastmcp/pull/1427)
     # - Gemini-cli have the problem due to [`hasValidTypes` check](https://github.com/google-gemini/gemini-cli/blob/a31830a3cb16584ec0448d6a23da27947ac9e72c/packages/core/src/tools/mcp-client.ts#L576)
     @override
     def tool(self, *args, **kwargs):
+        # Only tools registered as plain `@app.tool` are cached
+        fn = args[0] if len(args) == 1 and inspect.isfunction(args[0]) and not kwargs else None
+        cached = fn and self.schema_cache.get(fn)
+        if cached is not None:
+            # Same as `FunctionTool.from_function`, without generating schemas
+            _tool = FunctionTool(
+                fn = fn,
+                name = fn.__name__,
+                description = inspect.getdoc(fn),
+                parameters = cached['parameters'],
+                output_schema = cached['output_schema'],
+            )
+            self.add_tool(_tool)
+            return _tool
         _tool = super().tool(*args, **kwargs)
-        _tool.parameters = patch_schema(_tool.parameters)
-        _tool.output_schema = patch_schema(_tool.output_schema)
+        _tool.parameters = patch_schema(_tool.parameters, self.schema_cache.refs)
+        if _tool.output_schema is not None:
+            _tool.output_schema = patch_schema(_tool.output_schema, self.schema_cache.refs)
+        if fn is not None:
+            self.schema_cache.put(fn, {
+                'parameters': _tool.parameters,
+                'output_schema': _tool.output_schema,
+            })
         return _tool
 
+    async def schema_size(self) -> int:
+        """Bytes of tool schemas sent to clients listing tools"""
+        tools = await self.get_tools()
+        return sum(
+            schema_size(tool.parameters) + schema_size(tool.output_schema)
+            for tool in tools.values()
+        )
@@ -1,15 +1,42 @@
-from .pipeline import Pipeline
-from .step import (
-    Step,
-    Load,
-    Transform,
-    Export,
-)
-from .step_union import (
-    AnyLoad,
-    AnyTransform,
-    AnyExport,
-)
-from .custom_transform import CustomTransform
-from .transform_sequence import TransformSequence
+from typing import TYPE_CHECKING
+from importlib import import_module
 
+if TYPE_CHECKING:
+    from .pipeline import Pipeline
+    from .step import (
+        Step,
+        Load,
+        Transform,
+        Export,
+    )
+    from .step_union import (
+        AnyLoad,
+        AnyTransform,
+        AnyExport,
+    )
+    from .custom_transform import CustomTransform
+    from .transform_sequence import TransformSequence
+
+
+# Registry of step types imports every backend library.
+# Only import it once something from it is actually used.
+_exports = {
+    'Pipeline': '.pipeline',
+    'Step': '.step',
+    'Load': '.step',
+    'Transform': '.step',
+    'Export': '.step',
+    'AnyLoad': '.step_union',
+    'AnyTransform': '.step_union',
+    'AnyExport': '.step_union',
+    'CustomTransform': '.custom_transform',
+    'TransformSequence': '.transform_sequence',
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name: str):
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    return getattr(import_module(_exports[name], __name__), name)
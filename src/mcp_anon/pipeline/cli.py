@@ -1,19 +1,30 @@
 import logging
 _logger = logging.getLogger(__name__)
 import pprint
+from pathlib import Path
 
 import click
-import devtools
 
-from mcp_anon.dataset.view.schema import get_dataset_schema
-from .pipeline import Pipeline
+# Heavy dependencies are imported by commands which need them,
+# so the command line starts fast, e.g. for `--help`.
+
+
+def load_pipeline(ctx, param, value):
+    from .pipeline import Pipeline
+    return Pipeline.from_file(value)
+
+
+def load_document(ctx, param, value):
+    """Pipeline file as plain data, without building steps which import pandas"""
+    import yaml
+    return yaml.safe_load(value) or {}
 
 
 pipeline_file_argument = click.argument(
     'pipeline',
     metavar = 'PIPELINE_FILE',
     type = click.File(),
-    callback = lambda ctx, param, value: Pipeline.from_file(value),
+    callback = load_pipeline,
 )
 
 
@@ -24,8 +35,26 @@ def cli():
 
 
 @cli.command()
+@click.option(
+    '--chunksize', '-c',
+    type = click.IntRange(min = 1),
+    default = None,
+    help = (
+        'Stream dataset through pipeline in chunks of this many records,'
+        ' instead of loading the whole dataset into memory.'
+    ),
+)
+@click.option(
+    '--cache-dir',
+    type = click.Path(file_okay = False, path_type = Path),
+    default = None,
+    help = (
+        'Cache loaded dataset as Arrow files in this directory,'
+        ' so later runs need not read source again until it changes.'
+    ),
+)
 @pipeline_file_argument
-def run(pipeline):
+def run(pipeline, chunksize, cache_dir):
     """Run anonymization pipeline."""
     if pipeline.load is None:
         _logger.error('Pipeline has no loader.')
@@ -35,8 +64,33 @@ def run(pipeline):
         _logger.error('Pipeline has no exporter.')
         return
 
+    from mcp_anon.dataset.cache import DiskCache
+    from .pandas import enable_copy_on_write
+
+    enable_copy_on_write()
+    pipeline = pipeline.optimize()
+    cache = cache_dir and DiskCache(cache_dir)
+    if pipeline.backend == 'polars':
+        if chunksize is not None or cache is not None:
+            _logger.warning(
+                'Options --chunksize and --cache-dir are ignored by polars backend,'
+                ' which always streams from source.'
+            )
+        run_lazy(pipeline)
+    elif chunksize is None:
+        run_whole(pipeline, cache)
+    else:
+        run_streaming(pipeline, chunksize, cache)
+    _logger.info('Pipeline ran successfully')
+
+
+def run_whole(pipeline, cache = None):
+    """Run pipeline on the whole dataset loaded into memory at once"""
+    import devtools
+    from mcp_anon.dataset.view.schema import get_dataset_schema
+
     _logger.info(f'Loading dataset from: {pipeline.load.model_dump_json()}')
-    ds = pipeline.load()
+    ds = pipeline.load() if cache is None else cache.get(pipeline.load)
     print('Loaded dataset schema:')
     devtools.pprint(get_dataset_schema(ds).model_dump(mode = 'json'))
     print('Loaded dataset:')
@@ -51,7 +105,75 @@ def run(pipeline):
 
     _logger.info(f'Exporting dataset to: {pipeline.load.model_dump_json()}')
     pipeline.export(ds)
-    _logger.info('Pipeline ran successfully')
+
+
+def stream_transformed(pipeline, chunksize, cache = None):
+    """Stream chunks of dataset transformed by pipeline"""
+    def load():
+        if cache is None:
+            return pipeline.load.stream(chunksize)
+        return cache.stream(pipeline.load, chunksize)
+
+    transform = pipeline.transform
+    if transform.needs_fit:
+        _logger.info('Fitting transforms to dataset')
+        transform = transform.fit(load)
+    return transform.stream(load())
+
+
+def run_streaming(pipeline, chunksize, cache = None):
+    """Run pipeline without holding more than a chunk of dataset in memory"""
+    _logger.info(
+        f'Streaming dataset in chunks of {chunksize} records'
+        f' from: {pipeline.load.model_dump_json()}'
+        f' to: {pipeline.export.model_dump_json()}'
+    )
+    pipeline.export.stream(stream_transformed(pipeline, chunksize, cache))
+
+
+def run_lazy(pipeline):
+    """Run pipeline as a single lazy query on polars streaming engine"""
+    # Polars is an optional dependency
+    from .polars import lazy
+
+    load = lazy(pipeline.load)
+    transforms = list(map(lazy, pipeline.transform.sequence))
+    export = lazy(pipeline.export)
+
+    _logger.info(f'Planning lazy query from: {load.model_dump_json()}')
+    lf = load()
+    for transform in transforms:
+        lf = transform(lf)
+    print('Query plan:')
+    print(lf.explain(engine = 'streaming'))
+
+    _logger.info(f'Streaming query to: {export.model_dump_json()}')
+    export(lf)
+
+
+@cli.command()
+@click.option(
+    '--chunksize', '-c',
+    type = click.IntRange(min = 1),
+    default = 100_000,
+    show_default = True,
+    help = 'Stream dataset through pipeline in chunks of this many records.',
+)
+@pipeline_file_argument
+def stats(pipeline, chunksize):
+    """Summarize dataset transformed by pipeline, in one pass over its chunks."""
+    if pipeline.load is None:
+        _logger.error('Pipeline has no loader.')
+        return
+
+    import devtools
+    from mcp_anon.dataset.view.stats import stream_dataset_stats
+    from .pandas import enable_copy_on_write
+
+    enable_copy_on_write()
+    pipeline = pipeline.optimize()
+    result = stream_dataset_stats(stream_transformed(pipeline, chunksize))
+    devtools.pprint(result.model_dump(mode = 'json'))
 
 
 @cli.command()
@@ -66,16 +188,29 @@ def run(pipeline):
     show_default = True,
     help = 'Select output format. `py*` format are pretty-printed.',
 )
-@pipeline_file_argument
+@click.argument(
+    'pipeline',
+    metavar = 'PIPELINE_FILE',
+    type = click.File(),
+    callback = load_document,
+)
 def inspect(pipeline, _format):
-    """Inspect anonymization pipeline."""
+    """Inspect anonymization pipeline.
+
+    Formats other than `python-object` print the pipeline file as written,
+    without building its steps.
+    """
+    import json
+    import devtools
+
     match _format:
         case 'json':
-            print(pipeline.model_dump_json())
+            print(json.dumps(pipeline))
         case 'python-dict' | 'pydict':
-            devtools.pprint(pipeline.model_dump(mode = 'json'))
-        case 'python-object' | 'pyobj':
             devtools.pprint(pipeline)
+        case 'python-object' | 'pyobj':
+            from .pipeline import Pipeline
+            devtools.pprint(Pipeline.model_validate(pipeline))
 
 # TODO: add option to change input and output
 
@@ -54,5 +54,10 @@ class CustomTransform[Dataset](Transform[Dataset]):
         return self
 
     def __call__(self, ds: Dataset) -> Dataset:
+        # Custom code may modify its argument in place. Give it a shallow copy,
+        # which only copies data it modifies when Copy-on-Write is enabled.
+        if hasattr(ds, 'copy'):
+            import pandas as pd
+            ds = ds.copy(deep = not pd.options.mode.copy_on_write)
         return self._function(ds)
 
@@ -0,0 +1,20 @@
+from types import ModuleType
+import importlib.util
+import sys
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Import module, deferring its execution until an attribute is used.
+
+    Annotations using the module must not be evaluated at import time,
+    for example by `from __future__ import annotations`.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -1,6 +1,18 @@
-from .load import LoadCsv, LoadSql
-from .export import ExportCsv
+import pandas as pd
+
+from .load import LoadCsv, LoadCsvFiles, LoadSql, LoadParquet, LoadArrow
+from .export import ExportCsv, ExportParquet, ExportArrow
 from .bin_transform import BinTransform
 from .drop_transform import DropTransform
 from .mask_transform import MaskTransform
 
+
+
+def enable_copy_on_write() -> None:
+    """Let transforms return new datasets sharing unchanged columns with their input,
+    instead of copying or modifying it. This is default from pandas 3.
+
+    Option applies to the whole process, so it is only set by entry points
+    rather than on import.
+    """
+    pd.set_option('mode.copy_on_write', True)
@@ -1,4 +1,5 @@
-from typing import Any, Literal
+from typing import Any, Literal, Self
+from collections.abc import Callable, Iterable
 import inspect
 
 import pandas as pd
@@ -7,6 +8,10 @@ from pydantic import (
 )
 
 from ..step import Transform
+from ..lazy_import import lazy_import
+
+
+sa = lazy_import('sqlalchemy')
 
 
 class BinTransform(Transform[pd.DataFrame]):
@@ -45,11 +50,71 @@ class BinTransform(Transform[pd.DataFrame]):
     )
 
     def __call__(self, ds: pd.DataFrame) -> pd.DataFrame:
-        ds[self.output_field or self.input_field] = pd.cut(
-            ds[self.input_field],
+        return ds.assign(**{
+            self.output_field or self.input_field: pd.cut(
+                ds[self.input_field],
+                bins = self.bins,
+                right = self.include_highest,
+                include_lowest = self.include_lowest,
+            ),
+        })
+
+
+    @property
+    def needs_fit(self) -> bool:
+        # Equal-width bins depend on range of the whole field
+        return isinstance(self.bins, int)
+
+    def fit(self, batches: Callable[[], Iterable[pd.DataFrame]]) -> Self:
+        """Replace number of bins with edges computed from the whole dataset"""
+        if not self.needs_fit:
+            return self
+        extremes = []
+        for ds in batches():
+            field = ds[self.input_field]
+            extremes.extend([field.min(), field.max()])
+        # Let pandas compute the edges, so they match exactly what
+        # `pd.cut` would have produced from the whole field at once.
+        _, edges = pd.cut(
+            pd.Series(extremes).dropna(),
             bins = self.bins,
             right = self.include_highest,
-            include_lowest = self.include_lowest,
+            retbins = True,
         )
-        return ds
+        return self.model_copy(update = {'bins': edges.tolist()})
+
+    def output_fields(self, fields: list[str]) -> list[str]:
+        output_field = self.output_field or self.input_field
+        if output_field in fields:
+            return fields
+        return [*fields, output_field]
+
+    def input_fields(self, fields: set[str]) -> set[str]:
+        # Existing output field is overwritten in place, so it is still
+        # loaded to keep its position among fields
+        return fields | {self.input_field}
 
+    def compile_sql(self, columns: dict[str, Any]) -> dict[str, Any] | None:
+        # Only compile when SQL can label bins exactly as pandas would.
+        # Labels of non-integer edges depend on pandas number formatting.
+        if (
+            self.input_field not in columns
+            or isinstance(self.bins, int)
+            or not all(isinstance(x, int) for x in self.bins)
+            or self.include_lowest
+        ):
+            return None
+        field = columns[self.input_field]
+        cases = []
+        for left, right in zip(self.bins, self.bins[1:]):
+            if self.include_highest:
+                condition = sa.and_(field > left, field <= right)
+                label = f'({left}, {right}]'
+            else:
+                condition = sa.and_(field >= left, field < right)
+                label = f'[{left}, {right})'
+            cases.append((condition, sa.literal(label)))
+        return {
+            **columns,
+            self.output_field or self.input_field: sa.case(*cases, else_ = sa.null()),
+        }
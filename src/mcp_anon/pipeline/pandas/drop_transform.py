@@ -1,4 +1,4 @@
-from typing import Literal
+from typing import Any, Literal, Self
 
 import pandas as pd
 from pydantic import (
@@ -21,3 +21,26 @@ class DropTransform(Transform[pd.DataFrame]):
     def __call__(self, ds: pd.DataFrame) -> pd.DataFrame:
         return ds.drop(columns = self.fields)
 
+
+    @property
+    def field_list(self) -> list[str]:
+        return [self.fields] if isinstance(self.fields, str) else self.fields
+
+    def output_fields(self, fields: list[str]) -> list[str]:
+        return [x for x in fields if x not in self.field_list]
+
+    def input_fields(self, fields: set[str]) -> set[str]:
+        # Dropped fields are needed only to be dropped
+        return fields
+
+    def compile_sql(self, columns: dict[str, Any]) -> dict[str, Any] | None:
+        if not set(self.field_list) <= columns.keys():
+            # Let pandas report missing fields
+            return None
+        return {k: v for k, v in columns.items() if k not in self.field_list}
+
+    def prune_fields(self, fields: set[str]) -> Self | None:
+        remaining = [x for x in self.field_list if x not in fields]
+        if not remaining:
+            return None
+        return self.model_copy(update = {'fields': remaining})
@@ -1,10 +1,14 @@
-from typing import Literal
+from typing import Any, Literal
 from pathlib import Path
+from collections.abc import Callable, Iterable
 
 from pydantic import (
     BaseModel,
+    Field,
 )
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 from ..step import Export
 
@@ -17,3 +21,174 @@ class ExportCsv(Export[pd.DataFrame]):
         self.path.parent.mkdir(parents = True, exist_ok = True)
         ds.to_csv(self.path, index = False)
 
+    def stream(self, batches: Iterable[pd.DataFrame]) -> None:
+        self.path.parent.mkdir(parents = True, exist_ok = True)
+        with open(self.path, 'w', newline = '') as f:
+            for i, ds in enumerate(batches):
+                ds.to_csv(f, index = False, header = (i == 0))
+
+
+def to_arrow(ds: pd.DataFrame) -> pa.Table:
+    """Convert dataset to arrow table suitable for writing to file"""
+    for field, series in ds.items():
+        # Arrow can not read back intervals categories it has written.
+        # Write their text representation instead, just as CSV does.
+        if (
+            isinstance(series.dtype, pd.CategoricalDtype)
+            and isinstance(series.cat.categories, pd.IntervalIndex)
+        ):
+            ds = ds.assign(**{field: series.cat.rename_categories(str)})
+    return pa.Table.from_pandas(ds, preserve_index = False)
+
+
+# Most records held back while waiting for chunks to type fields with only missing values
+MAX_PENDING = 1_000_000
+
+
+def unify_schemas(schemas: list[pa.Schema]) -> pa.Schema:
+    """Schema which tables of every chunk can be cast to"""
+    schema = pa.unify_schemas(schemas, promote_options = 'permissive')
+    # Indices wide enough for categories of every chunk
+    return pa.schema(
+        [
+            field.with_type(pa.dictionary(pa.int32(), field.type.value_type, field.type.ordered))
+            if pa.types.is_dictionary(field.type) else field
+            for field in schema
+        ],
+        metadata = schema.metadata,
+    )
+
+
+class TableWriter:
+    """Write chunks of dataset into a file of a single arrow schema.
+
+    Schema of file is fixed once it is opened, while chunks may differ in
+    datatypes. Fields with only missing values have null type, so first
+    chunks are held back until every field has values, up to `MAX_PENDING`
+    records. Every chunk is cast to the schema unified from held ones.
+    Categories of dictionary fields grow as chunks bring new ones, so file
+    has one dictionary for each field.
+    """
+
+    def __init__(self, open_file: Callable[[pa.Schema], Any], **options):
+        self.open_file = open_file
+        self.options = options
+        self.writer = None
+        self.schema: pa.Schema | None = None
+        self.pending: list[pa.Table] = []
+        self.dictionaries: dict[str, pa.Array] = {}
+
+    def write(self, ds: pd.DataFrame) -> None:
+        table = to_arrow(ds)
+        if self.writer is not None:
+            self.writer.write_table(self.conform(table), **self.options)
+            return
+        self.pending.append(table)
+        schema = unify_schemas([x.schema for x in self.pending])
+        if (
+            any(pa.types.is_null(x.type) for x in schema)
+            and sum(map(len, self.pending)) < MAX_PENDING
+        ):
+            return
+        self.flush(schema)
+
+    def flush(self, schema: pa.Schema) -> None:
+        self.schema = schema
+        self.writer = self.open_file(schema)
+        pending, self.pending = self.pending, []
+        for table in pending:
+            self.writer.write_table(self.conform(table), **self.options)
+
+    def close(self) -> None:
+        if self.writer is None and self.pending:
+            self.flush(unify_schemas([x.schema for x in self.pending]))
+        if self.writer is not None:
+            self.writer.close()
+
+    def conform(self, table: pa.Table) -> pa.Table:
+        columns = []
+        for field in self.schema:
+            column = table.column(field.name)
+            if pa.types.is_dictionary(field.type):
+                columns.append(self.encode(field, column))
+            else:
+                columns.append(column.cast(field.type))
+        return pa.Table.from_arrays(columns, schema = self.schema)
+
+    def encode(self, field: pa.Field, column: pa.ChunkedArray) -> pa.Array:
+        """Encode values by dictionary of field, extended by values not seen before"""
+        column = column.combine_chunks()
+        value_type = field.type.value_type
+        values = column.cast(value_type)
+        if pa.types.is_dictionary(column.type):
+            # Unobserved categories are kept too, in their order
+            candidates = column.dictionary.cast(value_type)
+        else:
+            candidates = pc.drop_null(pc.unique(values))
+        known = self.dictionaries.get(field.name, pa.array([], value_type))
+        new = candidates.filter(pc.invert(pc.is_in(candidates, value_set = known)))
+        if len(new):
+            known = self.dictionaries[field.name] = pa.concat_arrays([known, new])
+        return pa.DictionaryArray.from_arrays(
+            pc.index_in(values, value_set = known).cast(pa.int32()),
+            known,
+            ordered = field.type.ordered,
+        )
+
+
+class ExportParquet(Export[pd.DataFrame]):
+    type: Literal['parquet'] = 'parquet'
+    path: Path
+    compression: Literal['none', 'snappy', 'gzip', 'brotli', 'lz4', 'zstd'] = 'snappy'
+    row_group_size: int | None = Field(
+        None,
+        description = 'Maximum number of records per row group. If empty, let pyarrow decide.',
+        ge = 1,
+    )
+
+    def __call__(self, ds: pd.DataFrame) -> None:
+        self.stream([ds])
+
+    def stream(self, batches: Iterable[pd.DataFrame]) -> None:
+        import pyarrow.parquet
+        self.path.parent.mkdir(parents = True, exist_ok = True)
+        writer = TableWriter(
+            lambda schema: pa.parquet.ParquetWriter(
+                self.path,
+                schema,
+                compression = self.compression,
+            ),
+            row_group_size = self.row_group_size,
+        )
+        try:
+            for ds in batches:
+                writer.write(ds)
+        finally:
+            writer.close()
+
+
+class ExportArrow(Export[pd.DataFrame]):
+    """Export to Arrow IPC file, also known as Feather file"""
+    type: Literal['arrow'] = 'arrow'
+    path: Path
+    compression: Literal['lz4', 'zstd'] | None = Field(
+        None,
+        description = 'Compress record batches. Compressed file can not be memory-mapped without copying.',
+    )
+
+    def __call__(self, ds: pd.DataFrame) -> None:
+        self.stream([ds])
+
+    def stream(self, batches: Iterable[pd.DataFrame]) -> None:
+        self.path.parent.mkdir(parents = True, exist_ok = True)
+        options = pa.ipc.IpcWriteOptions(
+            compression = self.compression,
+            # File can only extend dictionary of field, not replace it
+            emit_dictionary_deltas = True,
+        )
+        writer = TableWriter(lambda schema: pa.ipc.new_file(self.path, schema, options = options))
+        try:
+            for ds in batches:
+                writer.write(ds)
+        finally:
+            writer.close()
@@ -1,17 +1,123 @@
-from typing import Literal
+from __future__ import annotations
+from typing import Any, ClassVar, Literal, Self
 from pathlib import Path
+from abc import abstractmethod
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import cache, partial
+import glob
+import multiprocessing
+import os
 
 from pydantic import (
     BaseModel,
     Field,
+    model_validator,
 )
 import pandas as pd
-import sqlalchemy as sa
+import pyarrow as pa
 
-from ..step import Load
+from ..step import Load, Transform
+from ..lazy_import import lazy_import
+from .bin_transform import BinTransform
+from .sample import AnySample
 
 
-class LoadCsv(Load[pd.DataFrame]):
+# Only needed by SQL loader
+sa = lazy_import('sqlalchemy')
+
+
+# Records read to infer datatypes of fields without loading whole dataset
+INFER_ROWS = 10_000
+
+
+class DataFrameLoad(Load[pd.DataFrame]):
+    """Loader of pandas DataFrame, with options shared by all sources"""
+
+    columns: list[str] | None = Field(
+        None,
+        description = 'Fields to read. If empty, read all fields.',
+    )
+    sample: AnySample | None = Field(
+        None,
+        description = (
+            'Draw a representative sample instead of the whole dataset'
+            ' while building pipeline on mcp-anon server.'
+            ' anon-runner ignores this and always processes the whole dataset.'
+        ),
+    )
+
+    def load_sample(self) -> pd.DataFrame:
+        if self.sample is None:
+            return self()
+        return self.sample(self)
+
+    def project(self, fields: list[str]) -> Self:
+        return self.model_copy(update = {'columns': fields})
+
+
+def parse_dtype(name: str) -> Any:
+    """Datatype named as by pandas, e.g. `int64[pyarrow]`"""
+    # pandas otherwise takes it as StringDtype rather than ArrowDtype
+    if name == 'string[pyarrow]':
+        return pd.ArrowDtype(pa.string())
+    if name.endswith('[pyarrow]'):
+        return pd.ArrowDtype.construct_from_string(name)
+    return pd.api.types.pandas_dtype(name)
+
+
+class IntervalCategories(BaseModel):
+    """Ordered categories of intervals between consecutive edges, as binning labels them"""
+    edges: list[int | float]
+    closed: Literal['right', 'left'] = 'right'
+
+    @property
+    def dtype(self) -> pd.CategoricalDtype:
+        return pd.CategoricalDtype(
+            pd.IntervalIndex.from_breaks(self.edges, closed = self.closed),
+            ordered = True,
+        )
+
+    def categorize(self, labels: pd.Series) -> pd.Series:
+        """Convert text labels of intervals into categories"""
+        dtype = self.dtype
+        codes = pd.Index(map(str, dtype.categories)).get_indexer(labels.astype(object))
+        return pd.Series(
+            pd.Categorical.from_codes(codes, dtype = dtype),
+            index = labels.index,
+            name = labels.name,
+        )
+
+
+class InferringLoad(DataFrameLoad):
+    """Loader of source without datatypes, which pandas infers from values"""
+
+    dtypes: dict[str, str] | None = Field(
+        None,
+        description = (
+            'Datatype of each field as named by pandas, e.g. `int64[pyarrow]`.'
+            ' Datatypes of fields not listed are inferred from the whole dataset on load.'
+        ),
+    )
+
+    @property
+    def parsed_dtypes(self) -> dict[str, Any] | None:
+        if self.dtypes is None:
+            return None
+        return {field: parse_dtype(name) for field, name in self.dtypes.items()}
+
+    @abstractmethod
+    def head(self, n: int) -> pd.DataFrame:
+        """Read first `n` records"""
+        ...
+
+    def schema(self) -> pd.DataFrame:
+        # Inferred from first records only, so later records may widen datatypes on load
+        return self.head(INFER_ROWS).iloc[:0]
+
+
+class LoadCsv(InferringLoad):
     """Load data from CSV file"""
     type: Literal['csv'] = 'csv'
     path: Path
@@ -19,11 +125,270 @@ class LoadCsv(Load[pd.DataFrame]):
     def __call__(self) -> pd.DataFrame:
         return pd.read_csv(
             self.path,
+            usecols = self.columns,
+            dtype = self.parsed_dtypes,
+            dtype_backend = 'pyarrow',
+        )
+
+    def stream(self, chunksize: int) -> Iterator[pd.DataFrame]:
+        with pd.read_csv(
+            self.path,
+            usecols = self.columns,
+            dtype = self.parsed_dtypes,
+            dtype_backend = 'pyarrow',
+            chunksize = chunksize,
+        ) as reader:
+            yield from reader
+
+    def head(self, n: int) -> pd.DataFrame:
+        return pd.read_csv(
+            self.path,
+            usecols = self.columns,
+            dtype = self.parsed_dtypes,
             dtype_backend = 'pyarrow',
+            nrows = n,
+        )
+
+    def fingerprint(self) -> str:
+        return file_fingerprint(self.path)
+
+    def field_names(self) -> list[str]:
+        header = pd.read_csv(self.path, usecols = self.columns, nrows = 0)
+        return header.columns.tolist()
+
+
+class LoadCsvFiles(InferringLoad):
+    """Load data from multiple CSV files as a single dataset.
+
+    Files are parsed in parallel by a pool of processes and concatenated in
+    order of their paths.
+    """
+    type: Literal['csv-files'] = 'csv-files'
+    path: Path = Field(
+        description = (
+            'Glob pattern matching CSV files.'
+            ' If it is a directory, match all CSV files under it.'
+        ),
+        examples = [
+            'daily/*.csv',
+            'daily/**/*.csv',
+            'daily',
+        ],
+    )
+    partition_fields: bool = Field(
+        False,
+        description = (
+            'Add fields from directory names in the form of `key=value`.'
+            ' For example, `year` field with value `2025` for file `year=2025/data.csv`.'
+        ),
+    )
+    workers: int | None = Field(
+        None,
+        description = 'Number of parsing processes. If empty, use one per CPU.',
+        ge = 1,
+    )
+
+    def files(self) -> list[Path]:
+        pattern = self.path / '**/*.csv' if self.path.is_dir() else self.path
+        files = sorted(glob.glob(str(pattern), recursive = True))
+        if not files:
+            raise FileNotFoundError(f'No CSV file matches: {pattern}')
+        return list(map(Path, files))
+
+    def read_files(self) -> Iterator[pd.DataFrame]:
+        """Parse files in parallel while yielding them in order"""
+        files = self.files()
+        read = partial(
+            read_csv_file,
+            columns = self.columns,
+            partition_fields = self.partition_fields,
+            dtypes = self.parsed_dtypes,
+        )
+        workers = min(self.workers or os.process_cpu_count(), len(files))
+        if workers == 1:
+            yield from map(read, files)
+            return
+        # Do not fork a server which may be running other threads
+        with ProcessPoolExecutor(
+            max_workers = workers,
+            mp_context = multiprocessing.get_context('spawn'),
+        ) as executor:
+            yield from map_ordered(executor, read, files, workers)
+
+    def __call__(self) -> pd.DataFrame:
+        return pd.concat(self.read_files(), ignore_index = True)
+
+    def stream(self, chunksize: int) -> Iterator[pd.DataFrame]:
+        for ds in self.read_files():
+            for start in range(0, len(ds), chunksize):
+                yield ds.iloc[start:start + chunksize]
+
+    def fingerprint(self) -> str:
+        return file_fingerprint(*self.files())
+
+    def head(self, n: int) -> pd.DataFrame:
+        return read_csv_file(
+            self.files()[0],
+            columns = self.columns,
+            partition_fields = self.partition_fields,
+            dtypes = self.parsed_dtypes,
+            nrows = n,
         )
 
+    def field_names(self) -> list[str]:
+        path = self.files()[0]
+        partition = partition_values(path) if self.partition_fields else {}
+        header = pd.read_csv(path, nrows = 0).columns.tolist()
+        fields = header + [x for x in partition if x not in header]
+        if self.columns is None:
+            return fields
+        return [x for x in fields if x in self.columns]
+
+
+def file_fingerprint(*paths: Path) -> str:
+    """Identify version of files by their path, size, and modification time"""
+    versions = []
+    for path in paths:
+        stat = path.stat()
+        versions.append(f'{path.absolute()}:{stat.st_size}:{stat.st_mtime_ns}')
+    return '\n'.join(versions)
+
+
+def partition_values(path: Path) -> dict[str, str]:
+    """Parse `key=value` directory names in path"""
+    return dict(
+        part.split('=', 1)
+        for part in path.parent.parts
+        if '=' in part
+    )
+
 
-class LoadSql(Load[pd.DataFrame]):
+def read_csv_file(
+    path: Path,
+    columns: list[str] | None,
+    partition_fields: bool,
+    dtypes: dict[str, Any] | None = None,
+    nrows: int | None = None,
+) -> pd.DataFrame:
+    partition = partition_values(path) if partition_fields else {}
+    if columns is not None:
+        partition = {k: v for k, v in partition.items() if k in columns}
+        columns = [x for x in columns if x not in partition]
+    ds = pd.read_csv(
+        path,
+        usecols = columns,
+        dtype = dtypes,
+        dtype_backend = 'pyarrow',
+        nrows = nrows,
+    )
+    for field, value in partition.items():
+        dtype = (dtypes or {}).get(field, 'string[pyarrow]')
+        ds[field] = pd.Series(value, index = ds.index, dtype = 'string[pyarrow]').astype(dtype)
+    return ds
+
+
+def map_ordered[T, R](
+    executor: Executor,
+    function: Callable[[T], R],
+    items: Iterable[T],
+    window: int,
+) -> Iterator[R]:
+    """Like `executor.map`, but with at most `window` results pending at a time"""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(function, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class LoadColumnar(DataFrameLoad):
+    """Load data from columnar file through memory mapping.
+
+    Only requested fields are read. Parts of file which can not match
+    `filters` are skipped using statistics stored in the file.
+    """
+    path: Path
+    filters: list[tuple[str, str, Any]] | None = Field(
+        None,
+        description = (
+            'Only read records matching all of (field, operator, value) conditions.'
+            ' Operator is one of: =, ==, !=, <, >, <=, >=, in, not in.'
+        ),
+        examples = [
+            [('year', '>=', 2020)],
+            [('country', 'in', ['TH', 'JP'])],
+        ],
+    )
+
+    # File format as named by pyarrow.dataset
+    format: ClassVar[str]
+
+    def dataset(self) -> pa.dataset.Dataset:
+        import pyarrow.dataset
+        import pyarrow.fs
+        return pa.dataset.dataset(
+            str(self.path.absolute()),
+            format = self.format,
+            filesystem = pa.fs.LocalFileSystem(use_mmap = True),
+        )
+
+    @property
+    def filter_expression(self) -> pa.dataset.Expression | None:
+        if not self.filters:
+            return None
+        import pyarrow.parquet
+        return pa.parquet.filters_to_expression(self.filters)
+
+    def fingerprint(self) -> str:
+        return file_fingerprint(*map(Path, self.dataset().files))
+
+    def field_names(self) -> list[str]:
+        if self.columns is not None:
+            return self.columns
+        return self.dataset().schema.names
+
+    def schema(self) -> pd.DataFrame:
+        # Read from file metadata alone
+        table = self.dataset().schema.empty_table()
+        if self.columns is not None:
+            table = table.select(self.columns)
+        return table.to_pandas(types_mapper = pd.ArrowDtype)
+
+    def __call__(self) -> pd.DataFrame:
+        table = self.dataset().to_table(
+            columns = self.columns,
+            filter = self.filter_expression,
+        )
+        return table.to_pandas(types_mapper = pd.ArrowDtype)
+
+    def stream(self, chunksize: int) -> Iterator[pd.DataFrame]:
+        batches = self.dataset().to_batches(
+            columns = self.columns,
+            filter = self.filter_expression,
+            batch_size = chunksize,
+        )
+        for batch in rebatch(batches, chunksize):
+            yield batch.to_pandas(types_mapper = pd.ArrowDtype)
+
+
+class LoadParquet(LoadColumnar):
+    """Load data from Parquet file"""
+    type: Literal['parquet'] = 'parquet'
+    format = 'parquet'
+
+
+class LoadArrow(LoadColumnar):
+    """Load data from Arrow IPC file, also known as Feather file"""
+    type: Literal['arrow'] = 'arrow'
+    format = 'ipc'
+
+
+ADBC_BACKENDS = ('postgresql', 'sqlite')
+
+
+class LoadSql(InferringLoad):
     """Load data by executing SQL against a database connection.
 
     Connection parameters as defined by sqlalchemy.engine.URL.create()
@@ -53,14 +418,251 @@ class LoadSql(Load[pd.DataFrame]):
     database: str | None = None
     username: str | None = None
     password: str | None = None
+    version_sql: str | None = Field(
+        None,
+        description = (
+            'Query returning a single value which changes whenever result of `sql` changes.'
+            ' Loaded dataset is only cached when this is set.'
+        ),
+        examples = ['SELECT max(updated_at) FROM table'],
+    )
+    intervals: dict[str, IntervalCategories] | None = Field(
+        None,
+        description = (
+            'Fields holding text labels of intervals, converted to categories after loading.'
+            ' Set when binning is pushed down into `sql`.'
+        ),
+    )
+    adbc: bool = Field(
+        False,
+        description = (
+            'Fetch rows as Arrow record batches through ADBC driver,'
+            ' skipping conversion through Python objects.'
+            f' Only supported for drivername: {', '.join(ADBC_BACKENDS)}.'
+        ),
+    )
+
+    @model_validator(mode = 'after')
+    def validate_adbc_backend(self) -> Self:
+        if self.adbc and self.url.get_backend_name() not in ADBC_BACKENDS:
+            raise ValueError(f'ADBC is not supported for {self.drivername}')
+        return self
+
+    @property
+    def url(self) -> sa.URL:
+        return sa.URL.create(
+            drivername = self.drivername,
+            username = self.username,
+            password = self.password,
+            host = self.host,
+            port = self.port,
+            database = self.database,
+        )
+
+    @property
+    def source(self) -> sa.TextClause:
+        # Escape colons so they are not taken as bind parameters
+        return sa.text(self.sql.replace(':', r'\:'))
+
+    @property
+    def query(self) -> str | sa.Executable:
+        """Statement to execute, selecting only requested columns"""
+        if self.columns is None:
+            return self.sql
+        source = self.source.columns(*map(sa.column, self.columns)).subquery('source')
+        return sa.select(*source.c)
+
+    def compile(self, query: str | sa.Executable) -> str:
+        """Render statement as SQL text in dialect of database"""
+        if isinstance(query, str):
+            return query
+        return str(query.compile(
+            dialect = self.url.get_dialect()(),
+            compile_kwargs = {'literal_binds': True},
+        ))
+
+    def fingerprint(self) -> str | None:
+        if self.version_sql is None:
+            return None
+        if self.adbc:
+            with self.adbc_connect() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(self.version_sql)
+                    version = cursor.fetchone()[0]
+        else:
+            with get_engine(self.url).connect() as connection:
+                version = connection.exec_driver_sql(self.version_sql).scalar()
+        return repr(version)
+
+    def head(self, n: int) -> pd.DataFrame:
+        query = self.query
+        if isinstance(query, str):
+            query = sa.select(sa.literal_column('*')).select_from(
+                self.source.columns().subquery('source')
+            )
+        query = query.limit(n)
+        if self.adbc:
+            with self.adbc_connect() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(self.compile(query))
+                    table = cursor.fetch_arrow_table()
+            return self.cast(table.to_pandas(types_mapper = pd.ArrowDtype))
+        with get_engine(self.url).connect() as connection:
+            return self.cast(pd.read_sql(query, connection, dtype_backend = 'pyarrow'))
+
+    def cast(self, ds: pd.DataFrame) -> pd.DataFrame:
+        """Convert fields to their specified datatypes.
+
+        Database drivers already report datatypes of most fields, so they are
+        converted after reading rather than by parser.
+        """
+        dtypes = self.parsed_dtypes or {}
+        ds = ds.astype({k: v for k, v in dtypes.items() if k in ds})
+        # Database only has text labels of bins
+        for field, intervals in (self.intervals or {}).items():
+            if field in ds:
+                ds[field] = intervals.categorize(ds[field])
+        return ds
+
+    def field_names(self) -> list[str]:
+        if self.columns is not None:
+            return self.columns
+        source = self.source.columns().subquery('source')
+        query = sa.select(sa.literal_column('*')).select_from(source).limit(0)
+        if self.adbc:
+            with self.adbc_connect() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(self.compile(query))
+                    return [column[0] for column in cursor.description]
+        with get_engine(self.url).connect() as connection:
+            return list(connection.execute(query).keys())
+
+    def push_down(
+        self,
+        transforms: list[Transform[pd.DataFrame]],
+    ) -> tuple[Self, list[Transform[pd.DataFrame]]]:
+        """Compile leading transforms into SQL query run inside database"""
+        fields = self.field_names()
+        source = self.source.columns(*map(sa.column, fields)).subquery('source')
+        columns = {field: source.c[field] for field in fields}
+        intervals = dict(self.intervals or {})
+        compiled = 0
+        for transform in transforms:
+            output = transform.compile_sql(columns)
+            if output is None:
+                break
+            intervals = {
+                field: x
+                for field, x in intervals.items()
+                if field in output and output[field] is columns[field]
+            }
+            if isinstance(transform, BinTransform):
+                intervals[transform.output_field or transform.input_field] = IntervalCategories(
+                    edges = transform.bins,
+                    closed = 'right' if transform.include_highest else 'left',
+                )
+            columns = output
+            compiled += 1
+        if compiled == 0:
+            return self, transforms
+        query = sa.select(*(
+            expression.label(field)
+            for field, expression in columns.items()
+        ))
+        load = self.model_copy(update = {
+            'sql': self.compile(query),
+            'columns': None,
+            # Compiled transforms change datatypes
+            'dtypes': None,
+            'intervals': intervals or None,
+        })
+        return load, transforms[compiled:]
 
     def __call__(self) -> pd.DataFrame:
-        connection_url = sa.engine.URL.create(**config)
-        engine = sa.create_engine(connection_url)
-        with engine.connect() as connection:
-            df = pd.read_sql(
-                sql,
+        if self.adbc:
+            with self.adbc_connect() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(self.compile(self.query))
+                    table = cursor.fetch_arrow_table()
+            return self.cast(table.to_pandas(types_mapper = pd.ArrowDtype))
+        with get_engine(self.url).connect() as connection:
+            return self.cast(pd.read_sql(
+                self.query,
+                connection,
+                dtype_backend = 'pyarrow',
+            ))
+
+    def stream(self, chunksize: int) -> Iterator[pd.DataFrame]:
+        if self.adbc:
+            for batch in rebatch(self.record_batches(), chunksize):
+                yield self.cast(batch.to_pandas(types_mapper = pd.ArrowDtype))
+            return
+        with get_engine(self.url).connect() as connection:
+            # Server-side cursor so that the database driver also holds no
+            # more than a chunk of rows at a time.
+            connection = connection.execution_options(
+                stream_results = True,
+                max_row_buffer = chunksize,
+            )
+            chunks = pd.read_sql(
+                self.query,
                 connection,
+                chunksize = chunksize,
                 dtype_backend = 'pyarrow',
             )
+            yield from map(self.cast, chunks)
+
+    def record_batches(self) -> Iterator[pa.RecordBatch]:
+        """Fetch query result through ADBC without converting to pandas.
+
+        Size of each batch is decided by the driver.
+        """
+        with self.adbc_connect() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(self.compile(self.query))
+                yield from cursor.fetch_record_batch()
+
+    def adbc_connect(self):
+        """Open ADBC DB-API connection"""
+        match self.url.get_backend_name():
+            case 'postgresql':
+                import adbc_driver_postgresql.dbapi as adbc
+                uri = self.url.set(drivername = 'postgresql')
+                return adbc.connect(uri.render_as_string(hide_password = False))
+            case 'sqlite':
+                import adbc_driver_sqlite.dbapi as adbc
+                return adbc.connect(self.database)
+
+
+@cache
+def get_engine(url: sa.URL) -> sa.Engine:
+    """Get engine for connection URL.
+
+    Engines are kept for the lifetime of the process, so connections in
+    their pool can be reused by subsequent loads from the same database.
+    """
+    return sa.create_engine(url)
+
+
+def rebatch(
+    batches: Iterable[pa.RecordBatch],
+    size: int,
+) -> Iterator[pa.RecordBatch]:
+    """Regroup record batches into batches of given number of rows"""
+    pending = []
+    pending_rows = 0
+    for batch in batches:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        if pending_rows < size:
+            continue
+        combined = pa.Table.from_batches(pending).combine_chunks()
+        offset = 0
+        while pending_rows - offset >= size:
+            yield combined.slice(offset, size).to_batches()[0]
+            offset += size
+        pending = combined.slice(offset).to_batches()
+        pending_rows -= offset
+    if pending_rows:
+        yield pa.Table.from_batches(pending).combine_chunks().to_batches()[0]
 
@@ -42,11 +42,19 @@ class MaskTransform(Transform[pd.DataFrame]):
         }
         original = ds[self.field]
         try:
-            ds[self.field] = original.str.replace(**args)
+            masked = original.str.replace(**args)
         except NotImplementedError as e:
             # FIXME: pyarrow string series currently does not support .str.replace()
             # https://github.com/pandas-dev/pandas/blob/7f670c17cd815a14167734abe5f3ad6e2b15d94d/pandas/core/arrays/_arrow_string_mixins.py#L179
-            if 'replace is not supported' in str(e):
-                ds[self.field] = original.astype('str').str.replace(**args).astype('string[pyarrow]')
-        return ds
+            if 'replace is not supported' not in str(e):
+                raise
+            # Missing values must stay missing, not be masked as text
+            masked = original.astype(object).str.replace(**args).astype(original.dtype)
+        return ds.assign(**{self.field: masked})
 
+
+    def output_fields(self, fields: list[str]) -> list[str]:
+        return fields
+
+    def input_fields(self, fields: set[str]) -> set[str]:
+        return fields | {self.field}
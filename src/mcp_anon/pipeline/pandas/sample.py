@@ -0,0 +1,207 @@
+from typing import Annotated, Literal, Union
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+
+from pydantic import (
+    BaseModel,
+    Field,
+)
+import numpy as np
+import pandas as pd
+
+from mcp_anon.worker import checkpoint
+from ..step import Load
+
+
+# Number of records read at a time while drawing a sample.
+CHUNKSIZE = 100_000
+
+
+def stream(load: Load[pd.DataFrame], chunksize: int) -> Iterator[pd.DataFrame]:
+    """Chunks of source, stopping between them once job drawing sample is cancelled"""
+    records = 0
+    for chunk in load.stream(chunksize):
+        records += len(chunk)
+        checkpoint(records, None, f'Read {records} records')
+        yield chunk
+
+
+def concat(chunks: list[pd.DataFrame], load: Load[pd.DataFrame]) -> pd.DataFrame:
+    """Sampled chunks as one dataset, which is empty if source has no records"""
+    if not chunks:
+        schema = load.schema()
+        return pd.DataFrame() if schema is None else schema
+    return pd.concat(chunks, ignore_index = True)
+
+
+class Sample(BaseModel, ABC):
+    """Policy for drawing a representative sample from a loader"""
+
+    type: str
+
+    @abstractmethod
+    def __call__(self, load: Load[pd.DataFrame]) -> pd.DataFrame:
+        ...
+
+
+class RandomSample(Sample):
+    seed: int = Field(
+        0,
+        description = 'Seed of random generator, so the same sample is drawn every time',
+    )
+
+
+class LimitSample(Sample):
+    """Take first records of dataset"""
+
+    type: Literal['limit'] = 'limit'
+    n: int = Field(
+        description = 'Number of records to take',
+        ge = 1,
+    )
+
+    def __call__(self, load: Load[pd.DataFrame]) -> pd.DataFrame:
+        chunks = []
+        remaining = self.n
+        for chunk in stream(load, min(self.n, CHUNKSIZE)):
+            chunks.append(chunk.iloc[:remaining])
+            remaining -= len(chunks[-1])
+            if remaining == 0:
+                break
+        return concat(chunks, load)
+
+
+class FractionSample(RandomSample):
+    """Take each record with the same probability"""
+
+    type: Literal['fraction'] = 'fraction'
+    fraction: float = Field(
+        description = 'Fraction of records to take',
+        gt = 0,
+        le = 1,
+    )
+
+    def __call__(self, load: Load[pd.DataFrame]) -> pd.DataFrame:
+        rng = np.random.default_rng(self.seed)
+        return concat(
+            [
+                chunk.sample(frac = self.fraction, random_state = rng).sort_index()
+                for chunk in stream(load, CHUNKSIZE)
+            ],
+            load,
+        )
+
+
+class ReservoirSample(RandomSample):
+    """Take fixed number of records uniformly at random.
+
+    Memory use is bounded by the sample size, not the dataset size.
+    """
+
+    type: Literal['reservoir'] = 'reservoir'
+    n: int = Field(
+        description = 'Number of records to take',
+        ge = 1,
+    )
+
+    def __call__(self, load: Load[pd.DataFrame]) -> pd.DataFrame:
+        rng = np.random.default_rng(self.seed)
+        sample = None
+        keys = np.empty(0)
+        for chunk in stream(load, CHUNKSIZE):
+            # Keeping records with the n smallest random keys is equivalent to
+            # drawing n records uniformly without replacement.
+            sample = pd.concat([sample, chunk], ignore_index = True)
+            keys = np.concatenate([keys, rng.random(len(chunk))])
+            if len(sample) > self.n:
+                # Sort positions to keep records in source order
+                kept = np.sort(np.argpartition(keys, self.n)[:self.n])
+                sample = sample.iloc[kept]
+                keys = keys[kept]
+        if sample is None:
+            return concat([], load)
+        return sample.reset_index(drop = True)
+
+
+class StratifiedSample(RandomSample):
+    """Take the same fraction of records from every group"""
+
+    type: Literal['stratified'] = 'stratified'
+    by: str | list[str] = Field(
+        description = 'Fields whose combination of values define a group',
+        min_length = 1,
+    )
+    fraction: float = Field(
+        description = 'Fraction of records to take from each group',
+        gt = 0,
+        le = 1,
+    )
+
+    @property
+    def fields(self) -> list[str]:
+        return [self.by] if isinstance(self.by, str) else self.by
+
+    def strata(self, load: Load[pd.DataFrame]) -> pd.DataFrame:
+        """Number of records to take from each group, counted over whole dataset.
+
+        Groups are numbered by `stratum`, and their number of records to take
+        is in `target`. Only fields defining groups are read.
+        """
+        counts = None
+        for chunk in stream(load.project(self.fields), CHUNKSIZE):
+            size = chunk.groupby(self.fields, dropna = False).size()
+            counts = size if counts is None else counts.add(size, fill_value = 0)
+        if counts is None:
+            return pd.DataFrame(columns = [*self.fields, 'stratum', 'target'])
+        strata = counts.index.to_frame(index = False)
+        strata['stratum'] = np.arange(len(strata))
+        # Rounded like `DataFrameGroupBy.sample(frac = ...)`
+        strata['target'] = np.round(counts.to_numpy() * self.fraction).astype(np.int64)
+        return strata
+
+    def __call__(self, load: Load[pd.DataFrame]) -> pd.DataFrame:
+        # Group sizes must be known first, or a small group spread across
+        # chunks would be rounded down to nothing in each of them
+        strata = self.strata(load)
+        targets = strata['target'].to_numpy()
+        rng = np.random.default_rng(self.seed)
+        sample = None
+        keys = np.empty(0)
+        groups = np.empty(0, dtype = np.int64)
+        for chunk in stream(load, CHUNKSIZE):
+            stratum = chunk[self.fields].merge(strata, on = self.fields, how = 'left')['stratum']
+            sample = pd.concat([sample, chunk], ignore_index = True)
+            keys = np.concatenate([keys, rng.random(len(chunk))])
+            groups = np.concatenate([groups, stratum.to_numpy(dtype = np.int64)])
+            # Like reservoir sample, keep records with the smallest random
+            # keys, as many as targeted in each group
+            order = np.lexsort((keys, groups))
+            ordered = groups[order]
+            rank = np.arange(len(order)) - np.searchsorted(ordered, ordered)
+            kept = np.sort(order[rank < targets[ordered]])
+            sample = sample.iloc[kept]
+            keys = keys[kept]
+            groups = groups[kept]
+        if sample is None:
+            return concat([], load)
+        return sample.reset_index(drop = True)
+
+
+AnySample = Annotated[
+    Union[
+        LimitSample,
+        FractionSample,
+        ReservoirSample,
+        StratifiedSample,
+    ],
+    Field(
+        discriminator = 'type',
+        description = 'Policy for drawing a representative sample of dataset',
+        examples = [
+            {'type': 'limit', 'n': 10000},
+            {'type': 'fraction', 'fraction': 0.01, 'seed': 0},
+            {'type': 'reservoir', 'n': 10000, 'seed': 0},
+            {'type': 'stratified', 'by': 'gender', 'fraction': 0.01, 'seed': 0},
+        ],
+    ),
+]
@@ -1,10 +1,11 @@
-from typing import Self
+from typing import Literal, Self
 from contextlib import contextmanager
 import os
 import json
 
 from pydantic import (
     BaseModel,
+    Field,
     SerializeAsAny,
 )
 import yaml
@@ -35,6 +36,57 @@ class Pipeline(BaseModel):
     load: AnyLoad | None = None
     transform: TransformSequence = TransformSequence()
     export: AnyExport | None = None
+    backend: Literal['pandas', 'polars'] = Field(
+        'pandas',
+        description = (
+            'Library to run pipeline with in anon-runner.'
+            ' Polars plans the whole pipeline lazily and executes it in parallel'
+            ' with streaming, but only supports CSV and SQL loaders, CSV exporter,'
+            ' and bin, drop and mask transforms.'
+        ),
+    )
+
+    def optimize(self) -> Self:
+        """Return equivalent pipeline which loads less data"""
+        return self.push_down_transforms().prune_unused_fields()
+
+    def push_down_transforms(self) -> Self:
+        """Let loader perform leading transforms at the source of data"""
+        if self.load is None:
+            return self
+        load, remaining = self.load.push_down(self.transform.sequence)
+        if load is self.load:
+            return self
+        return self.model_copy(update = {
+            'load': load,
+            'transform': self.transform.model_copy(update = {'sequence': remaining}),
+        })
+
+    def prune_unused_fields(self) -> Self:
+        """Return equivalent pipeline that does not load unused fields.
+
+        Fields needed from the loader are worked out backward from the
+        fields each transform step reads and writes. Drop steps on fields
+        that are never loaded are removed.
+        """
+        if self.load is None:
+            return self
+        fields = self.load.field_names()
+        if fields is None:
+            return self
+        output_fields = self.transform.output_fields(fields)
+        if output_fields is None:
+            return self
+        needed = self.transform.input_fields(set(output_fields))
+        if needed is None:
+            return self
+        unused = set(fields) - needed
+        if not unused:
+            return self
+        return self.model_copy(update = {
+            'load': self.load.project([x for x in fields if x in needed]),
+            'transform': self.transform.prune_fields(unused),
+        })
 
     def to_file(self, path_or_file):
         """Save pipeline definition as a file"""
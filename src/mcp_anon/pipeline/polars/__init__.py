@@ -0,0 +1,34 @@
+"""Steps running on polars LazyFrame.
+
+Each step takes the same configuration as its pandas counterpart, so any
+pipeline built from supported steps can run on either backend.
+"""
+
+from ..step import Step
+from .. import pandas
+from .load import LoadCsv, LoadSql
+from .export import ExportCsv
+from .bin_transform import BinTransform
+from .drop_transform import DropTransform
+from .mask_transform import MaskTransform
+
+
+LAZY_STEPS: dict[type[Step], type[Step]] = {
+    pandas.LoadCsv: LoadCsv,
+    pandas.LoadSql: LoadSql,
+    pandas.BinTransform: BinTransform,
+    pandas.DropTransform: DropTransform,
+    pandas.MaskTransform: MaskTransform,
+    pandas.ExportCsv: ExportCsv,
+}
+
+
+def lazy(step: Step) -> Step:
+    """Convert pandas step to its polars counterpart"""
+    try:
+        cls = LAZY_STEPS[type(step)]
+    except KeyError:
+        raise ValueError(
+            f'Step type `{step.type}` is not supported by polars backend'
+        ) from None
+    return cls.model_validate(step.model_dump())
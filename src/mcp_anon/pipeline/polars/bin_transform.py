@@ -0,0 +1,38 @@
+import pandas as pd
+import polars as pl
+
+from ..pandas import bin_transform
+
+
+class BinTransform(bin_transform.BinTransform):
+    """Binning of numeric field into ordered categories labelled as pandas does"""
+
+    def __call__(self, lf: pl.LazyFrame) -> pl.LazyFrame:
+        transform = self
+        if self.needs_fit:
+            extremes = lf.select(
+                pl.col(self.input_field).min().alias('min'),
+                pl.col(self.input_field).max().alias('max'),
+            ).collect()
+            field = pd.Series(extremes.row(0), name = self.input_field)
+            transform = self.fit(lambda: [field.to_frame()])
+        edges = transform.bins
+        # Let pandas label the bins, so output is the same on either backend
+        categories = pd.cut(
+            pd.Series(edges),
+            bins = edges,
+            right = self.include_highest,
+            include_lowest = self.include_lowest,
+        ).cat.categories
+        labels = list(map(str, categories))
+        field = pl.col(self.input_field)
+        expression = pl
+        for i, (left, right) in enumerate(zip(edges, edges[1:])):
+            lowest = self.include_lowest and i == 0
+            if self.include_highest:
+                condition = (field >= left if lowest else field > left) & (field <= right)
+            else:
+                condition = (field >= left) & (field < right)
+            expression = expression.when(condition).then(pl.lit(labels[i]))
+        output = expression.otherwise(None).cast(pl.Enum(labels))
+        return lf.with_columns(output.alias(self.output_field or self.input_field))
@@ -0,0 +1,10 @@
+import polars as pl
+
+from ..pandas import drop_transform
+
+
+class DropTransform(drop_transform.DropTransform):
+    """Remove fields from dataset"""
+
+    def __call__(self, lf: pl.LazyFrame) -> pl.LazyFrame:
+        return lf.drop(self.field_list)
@@ -0,0 +1,16 @@
+from collections.abc import Iterable
+
+import polars as pl
+
+from ..pandas import export
+
+
+class ExportCsv(export.ExportCsv):
+    """Write CSV file with polars streaming engine"""
+
+    def __call__(self, lf: pl.LazyFrame) -> None:
+        self.path.parent.mkdir(parents = True, exist_ok = True)
+        lf.sink_csv(self.path)
+
+    def stream(self, batches: Iterable[pl.LazyFrame]) -> None:
+        self(pl.concat(list(batches)))
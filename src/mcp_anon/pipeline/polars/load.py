@@ -0,0 +1,95 @@
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+
+from ..pandas import load
+from ..pandas.load import get_engine
+
+
+def polars_dtype(name: str) -> pl.DataType:
+    """Polars datatype of datatype named as by pandas, e.g. `int64[pyarrow]`"""
+    dtype = load.parse_dtype(name)
+    if isinstance(dtype, pd.StringDtype):
+        return pl.String()
+    if isinstance(dtype, pd.CategoricalDtype):
+        return pl.Categorical()
+    try:
+        if isinstance(dtype, pd.ArrowDtype):
+            arrow = dtype.pyarrow_dtype
+        else:
+            # Nullable pandas datatypes, such as `Int64`, hold numpy values
+            arrow = pa.from_numpy_dtype(getattr(dtype, 'numpy_dtype', dtype))
+        return pl.from_arrow(pa.array([], type = arrow)).dtype
+    except (TypeError, pa.ArrowException, pl.exceptions.PolarsError):
+        raise ValueError(f'Datatype `{name}` is not supported by polars backend') from None
+
+
+def polars_dtypes(step: load.InferringLoad) -> dict[str, pl.DataType]:
+    return {field: polars_dtype(name) for field, name in (step.dtypes or {}).items()}
+
+
+class LoadCsv(load.LoadCsv):
+    """Scan CSV file lazily.
+
+    Polars reads blank lines as records of only empty values. Those are
+    skipped as pandas does, found by lines of file being blank outside of
+    quoted values, while records of only empty separated values are kept.
+    """
+
+    def __call__(self) -> pl.LazyFrame:
+        index = '__record__'
+        quotes = pl.col('line').str.count_matches('"', literal = True)
+        blank = (
+            pl.scan_lines(self.path)
+            # Line continues quoted value while quotes before it are unbalanced
+            .filter((quotes.cum_sum() - quotes) % 2 == 0)
+            .with_row_index(index)
+            .filter(pl.col('line').str.strip_chars_end('\r') == '')
+            # Record after header is of index 0
+            .select(pl.col(index) - 1)
+        )
+        lf = (
+            pl.scan_csv(
+                self.path,
+                row_index_name = index,
+                schema_overrides = polars_dtypes(self),
+            )
+            .join(blank, on = index, how = 'anti', maintain_order = 'left')
+            .drop(index)
+        )
+        if self.columns is not None:
+            lf = lf.select(self.columns)
+        return lf
+
+
+class LoadSql(load.LoadSql):
+    """Load data by executing SQL against a database connection.
+
+    Database query is not lazy, but the rest of pipeline is planned lazily
+    on its result.
+    """
+
+    def __call__(self) -> pl.LazyFrame:
+        query = self.compile(self.query)
+        if self.adbc:
+            with self.adbc_connect() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(query)
+                    table = cursor.fetch_arrow_table()
+            return self.cast(pl.from_arrow(table).lazy())
+        with get_engine(self.url).connect() as connection:
+            return self.cast(pl.read_database(query, connection).lazy())
+
+    def cast(self, lf: pl.LazyFrame) -> pl.LazyFrame:
+        """Convert fields to their specified datatypes"""
+        fields = lf.collect_schema().names()
+        lf = lf.cast({k: v for k, v in polars_dtypes(self).items() if k in fields})
+        # Database only has text labels of bins, categorized as binning does
+        return lf.with_columns(
+            pl.col(field).cast(
+                pl.Enum(list(map(str, intervals.dtype.categories))),
+                strict = False,
+            )
+            for field, intervals in (self.intervals or {}).items()
+            if field in fields
+        )
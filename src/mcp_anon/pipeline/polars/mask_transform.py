@@ -0,0 +1,43 @@
+import polars as pl
+
+from ..pandas import mask_transform
+
+
+# Unicode noncharacter, reserved for internal use and not expected in data
+MARKER = '￿'
+
+
+class MaskTransform(mask_transform.MaskTransform):
+    """Replaced matched substring with masking characters.
+
+    Regular expression is run by polars, which does not support every
+    syntax of Python, such as look-around.
+    """
+
+    def __call__(self, lf: pl.LazyFrame) -> pl.LazyFrame:
+        if self.n == 0:
+            return lf
+        try:
+            pl.select(pl.lit('').str.contains(self.regex))
+        except pl.exceptions.ComputeError as e:
+            raise ValueError(
+                f'Regular expression `{self.regex}` is not supported by polars backend. {e}'
+            ) from None
+        # Masks vary in length with each match, which replacement can not
+        # express. Matches are delimited instead, so that after splitting,
+        # every other part is a match to be masked.
+        parts = (
+            pl.col(self.field)
+            .str.replace_all(self.regex, f'{MARKER}${{0}}{MARKER}')
+            .str.split(MARKER)
+        )
+        index = pl.int_range(pl.len())
+        matched = index % 2 == 1
+        if self.n > 0:
+            matched = matched & (index // 2 < self.n)
+        masked = parts.list.eval(
+            pl.when(matched)
+            .then(pl.lit('').str.pad_end(pl.element().str.len_chars(), self.mask_char))
+            .otherwise(pl.element())
+        ).list.join('')
+        return lf.with_columns(masked.alias(self.field))
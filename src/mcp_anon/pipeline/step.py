@@ -1,6 +1,6 @@
-from typing import Literal
+from typing import Any, Literal, Self
 from abc import ABC, abstractmethod
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
 import inspect
 
 from pydantic import (
@@ -33,14 +33,126 @@ class Load[Dataset](Step[Dataset]):
     def __call__(self) -> Dataset:
         ...
 
+    def stream(self, chunksize: int) -> Iterator[Dataset]:
+        """Import raw data as a sequence of smaller datasets.
+
+        Loaders that can not read incrementally yield the whole dataset as
+        a single chunk.
+        """
+        yield self()
+
+    def load_sample(self) -> Dataset:
+        """Import representative part of raw data for interactive use.
+
+        Loaders without sampling support import the whole dataset.
+        """
+        return self()
+
+    def fingerprint(self) -> str | None:
+        """Identify current version of source data.
+
+        Must change whenever the data this loader imports changes.
+        Return None if version can not be identified, so the loaded dataset
+        must never be reused.
+        """
+        return None
+
+    def field_names(self) -> list[str] | None:
+        """Names of fields this loader imports, or None if unknown without loading"""
+        return None
+
+    def schema(self) -> Dataset | None:
+        """Dataset without records, having fields and datatypes this loader imports.
+
+        Must be much cheaper than loading, for example by reading only
+        metadata or first few records. Return None if unknown without loading.
+        """
+        return None
+
+    def push_down(
+        self,
+        transforms: list['Transform[Dataset]'],
+    ) -> tuple[Self, list['Transform[Dataset]']]:
+        """Move leading transforms into the source of data.
+
+        Return loader which also performs as many of the leading transforms
+        as it can, along with the remaining transforms.
+        """
+        return self, transforms
+
+    def project(self, fields: list[str]) -> Self:
+        """Return loader that only imports given fields.
+
+        Loaders that can not select fields return themselves unchanged.
+        """
+        return self
+
 
 class Transform[Dataset](Step[Dataset]):
-    """Step in pipeline that transforms dataset."""
+    """Step in pipeline that transforms dataset.
+
+    Transform must not modify its input dataset, which may still be in use.
+    It returns a new dataset instead, which may share unchanged data with
+    the input.
+    """
 
     @abstractmethod
     def __call__(self, ds: Dataset) -> Dataset:
         ...
 
+    @property
+    def needs_fit(self) -> bool:
+        """Whether transform must see whole dataset before it can be streamed"""
+        return False
+
+    def fit(self, batches: Callable[[], Iterable[Dataset]]) -> Self:
+        """Return transform with parameters learned from the whole dataset.
+
+        `batches` must return a fresh iterable over the input dataset
+        every time it is called, so fitting may take multiple passes.
+        The returned transform must give the same result on each chunk as
+        this transform would on the whole dataset.
+        """
+        return self
+
+    def output_fields(self, fields: list[str]) -> list[str] | None:
+        """Names of fields after this step, given names of fields before it.
+
+        Return None if they can not be known without running the step.
+        """
+        return None
+
+    def input_fields(self, fields: set[str]) -> set[str] | None:
+        """Fields this step reads from its input to produce given output fields.
+
+        Return None if the step may read any field.
+        """
+        return None
+
+    def compile_sql(self, columns: dict[str, Any]) -> dict[str, Any] | None:
+        """Express this step as SQL to be run inside database.
+
+        `columns` maps each input field to SQLAlchemy expression producing it.
+        Return the same mapping for output fields, or None if this step can
+        not be expressed in SQL.
+        """
+        return None
+
+    def prune_fields(self, fields: set[str]) -> Self | None:
+        """Adapt step to input from which given unused fields are never loaded.
+
+        Return None if the step has nothing left to do.
+        """
+        return self
+
+    def stream(self, batches: Iterable[Dataset]) -> Iterator[Dataset]:
+        """Transform dataset chunk by chunk.
+
+        Transform should already be fitted.
+        """
+        for ds in batches:
+            yield self(ds)
+
 
 class Export[Dataset](Step[Dataset]):
     """Step that export processed dataset"""
@@ -49,3 +161,12 @@ class Export[Dataset](Step[Dataset]):
     def __call__(self, ds: Dataset) -> None:
         ...
 
+    @abstractmethod
+    def stream(self, batches: Iterable[Dataset]) -> None:
+        """Export dataset chunk by chunk.
+
+        Exporters whose format can not be written incrementally may collect
+        all chunks into one dataset first.
+        """
+        ...
+
@@ -8,11 +8,16 @@ import pandas as pd
 
 from .pandas import (
     LoadCsv,
+    LoadCsvFiles,
     LoadSql,
+    LoadParquet,
+    LoadArrow,
     BinTransform,
     DropTransform,
     MaskTransform,
     ExportCsv,
+    ExportParquet,
+    ExportArrow,
 )
 from .custom_transform import CustomTransform
 
@@ -20,7 +25,10 @@ from .custom_transform import CustomTransform
 AnyLoad = Annotated[
     Union[
         LoadCsv,
+        LoadCsvFiles,
         LoadSql,
+        LoadParquet,
+        LoadArrow,
     ],
     Field(
         discriminator = 'type',
@@ -32,6 +40,12 @@ AnyLoad = Annotated[
              'sql': 'SELECT * FROM table',
              'drivername': 'mysql',
              'host': 'localhost'},
+            {'type': 'csv-files',
+             'path': 'daily/**/*.csv',
+             'partition_fields': True},
+            {'type': 'parquet',
+             'path': 'input.parquet',
+             'columns': ['age', 'salary']},
         ],
     ),
 ]
@@ -57,7 +71,11 @@ AnyTransform = Annotated[
 
 
 AnyExport = Annotated[
-    Union[ExportCsv],
+    Union[
+        ExportCsv,
+        ExportParquet,
+        ExportArrow,
+    ],
     Field(
         discriminator = 'type',
         description = 'Configuration for a dataset exporter',
@@ -1,4 +1,5 @@
-from typing import Literal
+from typing import Literal, Self
+from collections.abc import Callable, Iterable
 
 import pandas as pd
 
@@ -17,3 +18,40 @@ class TransformSequence(Transform[pd.DataFrame]):
             ds = transform(ds)
         return ds
 
+
+    @property
+    def needs_fit(self) -> bool:
+        return any(transform.needs_fit for transform in self.sequence)
+
+    def fit(self, batches: Callable[[], Iterable[pd.DataFrame]]) -> Self:
+        """Fit each step on the output of already fitted steps before it.
+
+        Takes one pass over dataset for every step that needs fitting.
+        """
+        fitted = []
+        for transform in self.sequence:
+            if transform.needs_fit:
+                prefix = TransformSequence(sequence = fitted)
+                transform = transform.fit(lambda: prefix.stream(batches()))
+            fitted.append(transform)
+        return self.model_copy(update = {'sequence': fitted})
+
+    def output_fields(self, fields: list[str]) -> list[str] | None:
+        for transform in self.sequence:
+            if fields is None:
+                break
+            fields = transform.output_fields(fields)
+        return fields
+
+    def input_fields(self, fields: set[str]) -> set[str] | None:
+        for transform in reversed(self.sequence):
+            if fields is None:
+                break
+            fields = transform.input_fields(fields)
+        return fields
+
+    def prune_fields(self, fields: set[str]) -> Self:
+        pruned = (transform.prune_fields(fields) for transform in self.sequence)
+        return self.model_copy(update = {
+            'sequence': [x for x in pruned if x is not None],
+        })
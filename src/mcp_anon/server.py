@@ -1,6 +1,10 @@
+import logging
+_logger = logging.getLogger(__name__)
 from pathlib import Path
 from typing import Annotated, Union
+from collections.abc import Callable
 from contextlib import asynccontextmanager
+from weakref import WeakKeyDictionary
 from inspect import cleandoc
 
 from fastmcp import (
@@ -12,19 +16,50 @@ from pydantic import (
 )
 import pandas as pd
 
-from mcp_anon.state import State, PipelineView
+from mcp_anon.state import State, PipelineView, Prewarm
+from mcp_anon.worker import run_job
 from mcp_anon.pipeline import AnyLoad, AnyTransform, AnyExport
+from mcp_anon.pipeline.pandas import enable_copy_on_write
 from mcp_anon.dataset.view.schema import get_dataset_schema, DatasetSchema
-from mcp_anon.dataset.view.stats import get_dataset_stats, DatasetStats
+from mcp_anon.dataset.view.stats import DatasetStats
+from mcp_anon.dataset.view.profile import DatasetProfile
+from mcp_anon.dataset.evaluate import (
+    KAnonymityReport,
+    LDiversityReport,
+    TClosenessReport,
+    get_k_anonymity,
+    get_l_diversity,
+    get_t_closeness,
+)
+from mcp_anon.dataset.discover import QuasiIdentifierDiscovery, discover_quasi_identifiers
+from mcp_anon.dataset.generalize import MAX_QUASI_IDENTIFIERS, Generalization, generalize
 from mcp_anon.patch.fastmcp import PatchedFastMCP as FastMCP
+from mcp_anon.settings import get_settings
 
 
 @asynccontextmanager
 async def lifespan(app: FastMCP):
-    app.state = State.init()
+    enable_copy_on_write()
+    # State of each client session, dropped once session ends
+    app.sessions = WeakKeyDictionary()
+    settings = get_settings()
+    app.prewarm = Prewarm() if settings.prewarm and settings.restore else None
+    _logger.info(f'Tool schemas take {await app.schema_size()} bytes')
     yield
 
 
+def get_state(ctx: Context) -> State:
+    """Get state of client session, initializing it on first request"""
+    sessions = ctx.fastmcp.sessions
+    if ctx.session not in sessions:
+        prewarm = ctx.fastmcp.prewarm
+        state = prewarm and prewarm.take_state()
+        state = state or State.init()
+        state.session = ctx.session_id
+        sessions[ctx.session] = state
+    return sessions[ctx.session]
+
+
 app = FastMCP(
     name = 'Data Anonymization Toolbox',
     instructions = """
@@ -67,6 +102,24 @@ app = FastMCP(
 )
 
 
+async def run_with_state[T](ctx: Context, function: Callable[[State], T]) -> T:
+    """Run function on app state in a worker thread, one at a time"""
+    state = get_state(ctx)
+    prewarm = ctx.fastmcp.prewarm
+
+    def locked() -> T:
+        if prewarm is not None:
+            prewarm.wait()
+        with state.lock:
+            state.sync()
+            try:
+                return function(state)
+            finally:
+                state.take_snapshot()
+
+    return await run_job(ctx, locked)
+
+
 class LoaderSetResponse(BaseModel):
     content: DatasetSchema
     warnings: list[str] = []
@@ -77,8 +130,11 @@ async def pipeline_reset(
     ctx: Context,
 ) -> PipelineView:
     """Clear all persisted pipeline from previous session and start with empty pipeline"""
-    ctx.fastmcp.state.reset_pipeline()
-    return ctx.fastmcp.state.view_pipeline()
+    def reset(state: State) -> PipelineView:
+        state.reset_pipeline()
+        return state.view_pipeline()
+
+    return await run_with_state(ctx, reset)
 
 
 @app.tool
@@ -91,24 +147,34 @@ async def loader_set(
     - The server will remember the selected source for further operations.
     - Since the goal is to build pipeline,
       you can use representative example of the dataset instead of raw dataset.
+      For large datasets, set `sample` to work on a sample of the source.
+      Pipeline ran by anon-runner will still process the whole source.
     - Paths and URIs are resolved from server perspective, not the client's.
+    - Datatypes of fields not given in `dtypes` are inferred from the whole
+      dataset on every load. They are not added to loader configuration.
 
-    On success, return schema of loaded dataset before tranformers are applied.
+    On success, return schema of dataset before tranformers are applied.
+    Until the whole dataset is loaded, it is inferred from the first records
+    of source, so datatypes may still widen once loading finishes.
     """
-    previous = ctx.fastmcp.state.pipeline.load
-    warnings = []
+    def set_load(state: State) -> LoaderSetResponse:
+        previous = state.pipeline.load
+        load = loader_config
+        warnings = []
+
+        if previous == load:
+            warnings.append('No change to existing loader')
+        else:
+            if previous is not None:
+                warnings.append('Previous loader configuration is replaced')
+            state.set_load(load)
 
-    if previous == loader_config:
-        warnings.append('No change to existing loader')
-    else:
-        if previous is not None:
-            warnings.append('Previous loader configuration is replaced')
-        ctx.fastmcp.state.set_load(loader_config)
+        return {
+            'content': state.original_schema,
+            'warnings': warnings,
+        }
 
-    return {
-        'content': get_dataset_schema(ctx.fastmcp.state.original_dataset),
-        'warnings': warnings,
-    }
+    return await run_with_state(ctx, set_load)
 
 
 @app.tool
@@ -116,7 +182,7 @@ async def loader_describe(
     ctx: Context,
 ) ->  AnyLoad | None:
     """Describe current configuration of loader."""
-    load = ctx.fastmcp.state.pipeline.load
+    load = get_state(ctx).pipeline.load
     if load is None:
         return None
     return load
@@ -127,7 +193,10 @@ async def original_view_schema(
     ctx: Context,
 ) -> DatasetSchema:
     """Get name and datatype of each field in original dataset."""
-    return get_dataset_schema(ctx.fastmcp.state.original_dataset)
+    return await run_with_state(
+        ctx,
+        lambda state: state.original_schema,
+    )
 
 
 @app.tool
@@ -135,7 +204,10 @@ async def result_view_schema(
     ctx: Context,
 ) -> DatasetSchema:
     """Get name and datatype of each field in result dataset."""
-    return get_dataset_schema(ctx.fastmcp.state.result_dataset)
+    return await run_with_state(
+        ctx,
+        lambda state: get_dataset_schema(state.result_dataset),
+    )
 
 
 @app.tool
@@ -144,7 +216,10 @@ async def original_view_stats(
 ) -> DatasetStats:
     """Get summary statistics on original dataset."""
     # TODO: worry about leaking sensitive data through statistics
-    return get_dataset_stats(ctx.fastmcp.state.original_dataset)
+    return await run_with_state(
+        ctx,
+        lambda state: state.original_stats,
+    )
 
 
 @app.tool
@@ -152,14 +227,216 @@ async def result_view_stats(
     ctx: Context,
 ) -> DatasetStats:
     """Get summary statistics on result dataset."""
-    return get_dataset_stats(ctx.fastmcp.state.result_dataset)
+    return await run_with_state(
+        ctx,
+        lambda state: state.result_stats,
+    )
+
+
+@app.tool
+async def original_view_profile(
+    ctx: Context,
+) -> DatasetProfile:
+    """Estimate how well each field of original dataset tells records apart.
+
+    Reports distinct count, uniqueness and frequencies of the most common
+    values, but never values themselves. Fields with uniqueness close to 1
+    are likely direct identifiers. Estimates come with their error bounds,
+    so profiling stays fast on large datasets.
+    """
+    return await run_with_state(
+        ctx,
+        lambda state: state.original_profile,
+    )
+
+
+@app.tool
+async def result_view_profile(
+    ctx: Context,
+) -> DatasetProfile:
+    """Estimate how well each field of result dataset tells records apart.
+
+    Same as `original_view_profile`, but after all transformations.
+    """
+    return await run_with_state(
+        ctx,
+        lambda state: state.result_profile,
+    )
+
+
+QuasiIdentifiers = Annotated[
+    list[str],
+    Field(
+        description = (
+            'Fields which adversary may know from other sources and link to records,'
+            ' such as age, sex, or postal code.'
+            ' Records sharing values of all of them form an equivalence class.'
+        ),
+        min_length = 1,
+        max_length = MAX_QUASI_IDENTIFIERS,
+    ),
+]
+
+SensitiveField = Annotated[
+    str,
+    Field(description = 'Field whose value must not be inferred from quasi-identifiers, such as diagnosis.'),
+]
+
+
+@app.tool
+async def result_evaluate_k_anonymity(
+    quasi_identifiers: QuasiIdentifiers,
+    ctx: Context,
+    k: Annotated[
+        int | None,
+        Field(description = 'Target k. If given, also count classes and records falling short of it.', ge = 1),
+    ] = None,
+) -> KAnonymityReport:
+    """Assess k-anonymity of result dataset.
+
+    Dataset is k-anonymous if each record shares its quasi-identifiers with
+    at least k - 1 other records. Only sizes of equivalence classes are
+    reported, never their values.
+    """
+    return await run_with_state(
+        ctx,
+        lambda state: state.evaluate_result(
+            get_k_anonymity,
+            quasi_identifiers = quasi_identifiers,
+            k = k,
+        ),
+    )
+
+
+@app.tool
+async def result_evaluate_l_diversity(
+    quasi_identifiers: QuasiIdentifiers,
+    sensitive_field: SensitiveField,
+    ctx: Context,
+    l: Annotated[
+        int | None,
+        Field(description = 'Target l. If given, also count classes falling short of it.', ge = 1),
+    ] = None,
+) -> LDiversityReport:
+    """Assess l-diversity of result dataset.
+
+    Dataset is l-diverse if each equivalence class has at least l distinct
+    values of sensitive field, so knowing quasi-identifiers of someone does
+    not reveal their sensitive value.
+    """
+    return await run_with_state(
+        ctx,
+        lambda state: state.evaluate_result(
+            get_l_diversity,
+            quasi_identifiers = quasi_identifiers,
+            sensitive = sensitive_field,
+            l = l,
+        ),
+    )
+
+
+@app.tool
+async def result_evaluate_t_closeness(
+    quasi_identifiers: QuasiIdentifiers,
+    sensitive_field: SensitiveField,
+    ctx: Context,
+    t: Annotated[
+        float | None,
+        Field(description = 'Target t. If given, also count classes exceeding it.', ge = 0, le = 1),
+    ] = None,
+) -> TClosenessReport:
+    """Assess t-closeness of result dataset.
+
+    Dataset is t-close if distribution of sensitive field within each
+    equivalence class is within distance t of its distribution in the whole
+    dataset, measured by earth mover's distance.
+    """
+    return await run_with_state(
+        ctx,
+        lambda state: state.evaluate_result(
+            get_t_closeness,
+            quasi_identifiers = quasi_identifiers,
+            sensitive = sensitive_field,
+            t = t,
+        ),
+    )
+
+
+CandidateFields = Annotated[
+    list[str] | None,
+    Field(description = 'Fields to combine. If empty, all fields of dataset.'),
+]
+
+RiskK = Annotated[
+    int,
+    Field(description = 'Records in classes smaller than k are singled out, 2 meaning unique records.', ge = 2),
+]
+
+RiskThreshold = Annotated[
+    float,
+    Field(description = 'Combination is risky once it singles out more than this ratio of records.', ge = 0, lt = 1),
+]
+
+MaxCombinationSize = Annotated[
+    int,
+    Field(description = 'Largest number of fields in a combination.', ge = 1, le = 8),
+]
+
+
+@app.tool
+async def original_discover_quasi_identifiers(
+    ctx: Context,
+    fields: CandidateFields = None,
+    k: RiskK = 2,
+    threshold: RiskThreshold = 0.01,
+    max_size: MaxCombinationSize = 3,
+) -> QuasiIdentifierDiscovery:
+    """Find combinations of fields of original dataset which single out records.
+
+    Combinations are searched from the smallest, skipping those containing
+    a risky one, so only minimal risky combinations are reported with share
+    of records they single out. They are candidates for quasi-identifiers
+    to generalize. Values of records are never reported.
+    """
+    return await run_with_state(
+        ctx,
+        lambda state: state.evaluate_original(
+            discover_quasi_identifiers,
+            fields = fields,
+            k = k,
+            threshold = threshold,
+            max_size = max_size,
+        ),
+    )
+
+
+@app.tool
+async def result_discover_quasi_identifiers(
+    ctx: Context,
+    fields: CandidateFields = None,
+    k: RiskK = 2,
+    threshold: RiskThreshold = 0.01,
+    max_size: MaxCombinationSize = 3,
+) -> QuasiIdentifierDiscovery:
+    """Find combinations of fields of result dataset which single out records.
+
+    Same as `original_discover_quasi_identifiers`, but after all transformations.
+    """
+    return await run_with_state(
+        ctx,
+        lambda state: state.evaluate_result(
+            discover_quasi_identifiers,
+            fields = fields,
+            k = k,
+            threshold = threshold,
+            max_size = max_size,
+        ),
+    )
 
 
 # TODO: return tranformation ID
 # - so it can be referenced when deleting
 # - ID format should be semantic.
-# TODO: maybe allow adding tranform at different places in transformer
-# but defaulting to at the end?
 @app.tool
 async def transformer_append(
     transform: AnyTransform,
@@ -172,8 +449,113 @@ async def transformer_append(
 
     Returns definition of current pipeline on success.
     """
-    ctx.fastmcp.state.append_transform(transform)
-    return ctx.fastmcp.state.view_pipeline()
+    def append_transform(state: State) -> PipelineView:
+        state.append_transform(transform)
+        return state.view_pipeline()
+
+    return await run_with_state(ctx, append_transform)
+
+
+@app.tool
+async def transformer_append_generalization(
+    quasi_identifiers: QuasiIdentifiers,
+    k: Annotated[int, Field(description = 'Target k, the smallest allowed size of equivalence class.', ge = 1)],
+    ctx: Context,
+    levels: Annotated[
+        int,
+        Field(description = 'Most levels of generalization of each field above original values.', ge = 1, le = 16),
+    ] = 8,
+) -> Generalization:
+    """Generalize quasi-identifiers of result dataset until it is k-anonymous.
+
+    Searches the least generalization of each quasi-identifier making each
+    record share them with at least k - 1 other records, and appends it as
+    ordinary steps at the end of transformer sequence:
+
+    - Numeric fields are binned, in bins twice as wide at each level.
+    - Text fields are masked from the end, more characters at each level.
+    - Other fields are either kept or dropped.
+
+    Returns appended steps, along with how much was generalized.
+    """
+    def append_generalization(state: State) -> Generalization:
+        generalization = generalize(state.result_dataset, quasi_identifiers, k, levels)
+        state.set_transforms([*state.pipeline.transform.sequence, *generalization.steps])
+        return generalization
+
+    return await run_with_state(ctx, append_generalization)
+
+
+TransformIndex = Annotated[
+    int,
+    Field(
+        description = 'Zero-based position of step in transformer sequence',
+        ge = 0,
+    ),
+]
+
+
+@app.tool
+async def transformer_insert(
+    index: TransformIndex,
+    transform: AnyTransform,
+    ctx: Context,
+) -> PipelineView:
+    """Insert a new step into transformer sequence before the step at given index.
+
+    - Steps before the new one are not rerun.
+    - The transform will be immediately tested against dataset, together
+      with all steps after it.
+    - If any step causes error, the sequence will not be changed.
+
+    Returns definition of current pipeline on success.
+    """
+    def insert_transform(state: State) -> PipelineView:
+        state.insert_transform(index, transform)
+        return state.view_pipeline()
+
+    return await run_with_state(ctx, insert_transform)
+
+
+@app.tool
+async def transformer_replace(
+    index: TransformIndex,
+    transform: AnyTransform,
+    ctx: Context,
+) -> PipelineView:
+    """Replace the step at given index of transformer sequence.
+
+    - Steps before the replaced one are not rerun.
+    - The transform will be immediately tested against dataset, together
+      with all steps after it.
+    - If any step causes error, the sequence will not be changed.
+
+    Returns definition of current pipeline on success.
+    """
+    def replace_transform(state: State) -> PipelineView:
+        state.replace_transform(index, transform)
+        return state.view_pipeline()
+
+    return await run_with_state(ctx, replace_transform)
+
+
+@app.tool
+async def transformer_delete(
+    index: TransformIndex,
+    ctx: Context,
+) -> PipelineView:
+    """Remove the step at given index of transformer sequence.
+
+    - Steps after the removed one will be immediately rerun.
+    - If any of them causes error, the sequence will not be changed.
+
+    Returns definition of current pipeline on success.
+    """
+    def delete_transform(state: State) -> PipelineView:
+        state.delete_transform(index)
+        return state.view_pipeline()
+
+    return await run_with_state(ctx, delete_transform)
 
 
 # TODO: Optionally let client focus on specific part.
@@ -184,7 +566,17 @@ async def pipeline_view(
     ctx: Context,
 ) -> PipelineView:
     """Get status of current pipeline"""
-    return ctx.fastmcp.state.view_pipeline()
+    prewarm = ctx.fastmcp.prewarm
+    if prewarm is not None and not prewarm.ready:
+        # Report without waiting for datasets
+        return PipelineView(pipeline = get_state(ctx).pipeline, ready = False)
+    state = get_state(ctx)
+    if state.lock.locked() and state.snapshot is not None:
+        # Do not wait behind a job, which may run for long
+        return state.snapshot.model_copy(update = {
+            'warnings': ['Another job is running, so pipeline may change once it finishes.'],
+        })
+    return await run_with_state(ctx, State.view_pipeline)
 
 
 class ExporterSetResponse(BaseModel):
@@ -197,20 +589,23 @@ async def exporter_set(
     exporter_config: AnyExport,
     ctx: Context,
 ) -> ExporterSetResponse:
-    previous = ctx.fastmcp.state.pipeline.export
-    warnings = []
-
-    if previous == exporter_config:
-        warnings.append('No change to existing exporter')
-    else:
-        if previous is not None:
-            warnings.append('Previous exporter configuration is replaced')
-        ctx.fastmcp.state.set_export(exporter_config)
-
-    return {
-        'success': True,
-        'warnings': warnings,
-    }
+    def set_export(state: State) -> ExporterSetResponse:
+        previous = state.pipeline.export
+        warnings = []
+
+        if previous == exporter_config:
+            warnings.append('No change to existing exporter')
+        else:
+            if previous is not None:
+                warnings.append('Previous exporter configuration is replaced')
+            state.set_export(exporter_config)
+
+        return {
+            'success': True,
+            'warnings': warnings,
+        }
+
+    return await run_with_state(ctx, set_export)
 
 
 # NOTE: Can not use
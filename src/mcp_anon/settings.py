@@ -1,8 +1,12 @@
+from typing import Literal
 from pathlib import Path
 from functools import cache
+import os
 
 from pydantic import (
+    ByteSize,
     Field,
+    field_validator,
 )
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -29,11 +33,103 @@ class Settings(BaseSettings):
         description = 'Save application state to file on every update',
     )
     
+    state_backend: Literal['file', 'sqlite'] = Field(
+        'file',
+        description = (
+            'Where pipeline is persisted. `file` writes pipeline file itself.'
+            ' `sqlite` stores it in SQLite database next to pipeline file, with `.sqlite` suffix.'
+            ' Server replicas sharing the storage see edits of the same client session,'
+            ' and its conflicting edits are refused.'
+        ),
+    )
+
+    persist_delay: float = Field(
+        1.0,
+        description = (
+            'Seconds without edits before journal of edits is compacted into pipeline file.'
+            ' Meanwhile, edits are kept in the journal, which survives crash of server,'
+            ' and are synced to disk once compacted.'
+            ' Only applies to `file` state backend.'
+        ),
+        ge = 0,
+    )
+
     restore: bool = Field(
         True,
         description = 'Attempt to restore application state on initialization',
     )
 
+    prewarm: bool = Field(
+        False,
+        description = (
+            'Load and transform dataset of restored pipeline in background as soon as server starts,'
+            ' so the first request does not wait for it.'
+        ),
+    )
+
+    dataset_cache: bool = Field(
+        False,
+        description = (
+            'Cache loaded datasets as Arrow files under `.cache` next to pipeline file,'
+            ' so they are not read from source again until source changes.'
+            ' Cached files contain raw data from source.'
+        ),
+    )
+
+    memory_limit: ByteSize = Field(
+        '1GiB',
+        description = (
+            'Memory budget for datasets kept by server.'
+            ' Loaded datasets and the latest result of each session stay in memory, and count towards it.'
+            ' The rest keeps dataset after each transformation step,'
+            ' so editing a step only reruns the steps after it.'
+            ' Beyond this size, least recently used of those are spilled'
+            ' to Arrow files under `.spill` next to pipeline file,'
+            ' and read back when needed again.'
+            ' Spilled files contain raw data from source.'
+        ),
+        validate_default = True,
+    )
+
+    workers: int = Field(
+        4,
+        description = 'Number of threads for dataset work, so server stays responsive meanwhile',
+        ge = 1,
+    )
+
+    tool_timeout: float | None = Field(
+        None,
+        description = (
+            'Seconds a tool may spend on dataset work before it is stopped.'
+            ' If empty, tools may run indefinitely.'
+        ),
+        gt = 0,
+    )
+
+    schema_cache: Path | None = Field(
+        Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'mcp-anon' / 'schema',
+        description = (
+            'Directory to cache JSON schemas of tools, so they are not rebuilt on every start.'
+            ' If empty, schemas are not cached.'
+        ),
+    )
+
+    @field_validator('schema_cache', mode = 'before')
+    @classmethod
+    def empty_schema_cache(cls, value):
+        # Otherwise empty value is taken as current directory
+        if isinstance(value, str) and not value.strip():
+            return None
+        return value
+
+    schema_refs: bool = Field(
+        False,
+        description = (
+            'Send tool schemas with definitions shared through `$ref`, rather than inlined wherever used.'
+            ' Much smaller, but some clients refuse schemas with `$ref`.'
+        ),
+    )
+
 
 @cache
 def get_settings() -> Settings:
@@ -1,18 +1,32 @@
+import logging
+_logger = logging.getLogger(__name__)
 from typing import Self
 from pathlib import Path
+from collections.abc import Callable
+import json
 import shutil
-from functools import cached_property
+import threading
+import uuid
+import weakref
 
 import pandas as pd
 from pydantic import (
     BaseModel,
     ConfigDict,
     Field,
+    PrivateAttr,
 )
 
 from mcp_anon.pipeline import Pipeline, Load, Transform, Export
 from mcp_anon.settings import get_settings
+from mcp_anon.state_backend import StateBackend, VersionConflictException, get_state_backend
 from mcp_anon.dataset.view.schema import get_dataset_schema, DatasetSchema
+from mcp_anon.dataset.view.stats import get_dataset_stats, get_stats_cache, DatasetStats
+from mcp_anon.dataset.view.profile import get_dataset_profile, DatasetProfile
+from mcp_anon.dataset.cache import DiskCache
+from mcp_anon.dataset.step_cache import StepCache, get_step_cache, prefix_keys
+from mcp_anon.dataset.store import DatasetStore, StoredDataset, get_dataset_store
+from mcp_anon.worker import checkpoint, get_executor
 
 
 class PipelineView(BaseModel):
@@ -26,6 +40,13 @@ class PipelineView(BaseModel):
         ),
     )
     warnings: list[str] | None = None
+    ready: bool = Field(
+        True,
+        description = (
+            'Whether server has finished running restored pipeline after it started.'
+            ' Until then, result schema is not available and other tools wait for it.'
+        ),
+    )
 
 
 class LoaderNotSetException(Exception):
@@ -34,13 +55,17 @@ class LoaderNotSetException(Exception):
 
 
 class State(BaseModel):
-    """Application state of mcp-anon server.
+    """Application state of a client session of mcp-anon server.
 
-    - Keep cache of resulting dataset so pipeline does not need to be rerun on
-      every request.
+    - Share loaded datasets with other sessions with identical loader.
+    - Keep cache of dataset after each transformation step so pipeline does
+      not need to be rerun on every request, and editing a step only reruns
+      steps after it.
     """
 
     model_config = ConfigDict(arbitrary_types_allowed = True)
+    # Serialize access from worker threads
+    _lock: threading.Lock = PrivateAttr(default_factory = threading.Lock)
 
     # TODO: use xarray dataset to support multi-table dataset?
     pipeline: Pipeline = Pipeline()
@@ -51,24 +76,232 @@ class State(BaseModel):
     is_autopersist: bool = Field(
         default_factory = lambda: get_settings().autopersist,
     )
+    is_dataset_cache: bool = Field(
+        default_factory = lambda: get_settings().dataset_cache,
+    )
+    backend: StateBackend = Field(
+        default_factory = lambda data: get_state_backend(
+            data['pipeline_file'],
+            get_settings().state_backend,
+            get_settings().persist_delay,
+        ),
+        description = 'Storage of persisted pipeline.',
+    )
+    session: str = Field(
+        default_factory = lambda: uuid.uuid4().hex,
+        description = 'Client session recorded with persisted pipeline, same on every server replica.',
+    )
+    version: int = Field(
+        default_factory = lambda data: data['backend'].version(),
+        description = 'Version of persisted pipeline this state is in sync with.',
+    )
+    dataset_store: DatasetStore = Field(
+        default_factory = get_dataset_store,
+        description = 'Loaded datasets, shared with other sessions.',
+    )
+    step_cache: StepCache = Field(
+        default_factory = get_step_cache,
+        description = 'Datasets after each prefix of transformer sequence, shared with other sessions.',
+    )
+    _original: StoredDataset | None = PrivateAttr(None)
+    _release_original: weakref.finalize | None = PrivateAttr(None)
+    # Latest result dataset with its key, held even when step cache can not
+    # keep it within memory budget, though charged to it
+    _result: tuple[str, pd.DataFrame] | None = PrivateAttr(None)
+    _release_result: weakref.finalize | None = PrivateAttr(None)
+    # View of pipeline as left by the latest job, served while another job runs
+    _snapshot: PipelineView | None = PrivateAttr(None)
 
-    @cached_property
-    def original_dataset(self) -> pd.DataFrame:
-        """Dataset after it is read from source"""
+    @property
+    def lock(self) -> threading.Lock:
+        return self._lock
+
+    @property
+    def snapshot(self) -> PipelineView | None:
+        return self._snapshot
+
+    def take_snapshot(self) -> None:
+        """Copy pipeline, with schema of result if it is held, to be viewed without lock"""
+        result_schema = None
+        if (
+            self._result is not None
+            and self._original is not None
+            and self.pipeline.load is not None
+            and self._original.key == self.dataset_store.key(self.pipeline.load)
+        ):
+            *_, key = prefix_keys(self._original.token, self.pipeline.transform.sequence)
+            if key == self._result[0]:
+                result_schema = get_dataset_schema(self._result[1])
+        self._snapshot = PipelineView(
+            pipeline = self.pipeline.model_copy(deep = True),
+            result_schema = result_schema,
+        )
+
+    @property
+    def dataset_cache(self) -> DiskCache | None:
+        if not self.is_dataset_cache:
+            return None
+        return DiskCache(self.pipeline_file.parent / '.cache')
+
+    def load_original_dataset(self) -> pd.DataFrame:
+        """Read dataset from source.
+
+        Only a sample is read if loader specifies one.
+        """
         if self.pipeline.load is None:
             raise LoaderNotSetException()
-        return self.pipeline.load()
+        if self.dataset_cache is None:
+            return self.pipeline.load.load_sample()
+        return self.dataset_cache.get(self.pipeline.load, sample = True)
 
-    @cached_property
+    def hold_original_dataset(self) -> StoredDataset:
+        """Hold dataset of current loader, loading it unless another session has"""
+        if self.pipeline.load is None:
+            raise LoaderNotSetException()
+        key = self.dataset_store.key(self.pipeline.load)
+        if self._original is None or self._original.key != key:
+            self.release_original_dataset()
+            checkpoint(0, None, 'Loading dataset')
+            self._original = self.dataset_store.acquire(
+                self.pipeline.load,
+                self.load_original_dataset,
+            )
+            # Release dataset even if session ends without releasing it
+            self._release_original = weakref.finalize(
+                self,
+                self.dataset_store.release,
+                self._original,
+            )
+        return self._original
+
+    def release_original_dataset(self) -> None:
+        if self._release_original is not None:
+            self._release_original()
+        self._original = None
+        self._release_original = None
+
+    @property
+    def original_schema(self) -> DatasetSchema:
+        """Schema of dataset after it is read from source, without reading all of it"""
+        if self.pipeline.load is None:
+            raise LoaderNotSetException()
+        if self._original is not None and self._original.key == self.dataset_store.key(self.pipeline.load):
+            # Datatypes of loaded dataset are exact, unlike those inferred from first records
+            return get_dataset_schema(self._original.ds)
+        schema = self.pipeline.load.schema()
+        if schema is None:
+            schema = self.original_dataset
+        return get_dataset_schema(schema)
+
+    @property
+    def original_dataset(self) -> pd.DataFrame:
+        """Dataset after it is read from source"""
+        return self.hold_original_dataset().ds
+
+    def dataset_after(self, n: int) -> pd.DataFrame:
+        """Dataset after the first `n` transforms.
+
+        Only steps after the longest prefix with cached result are rerun.
+        """
+        original = self.hold_original_dataset()
+        sequence = self.pipeline.transform.sequence[:n]
+        keys = list(prefix_keys(original.token, sequence))
+        if self._result is not None and self._result[0] == keys[-1]:
+            return self._result[1]
+        start, ds = 0, original.ds
+        for i in range(len(sequence), 0, -1):
+            cached = self.step_cache.get(keys[i])
+            if cached is not None:
+                start, ds = i, cached
+                break
+        total = len(sequence) + 1
+        for i in range(start, len(sequence)):
+            checkpoint(i + 1, total, f'Running transformation step {i}')
+            ds = sequence[i](ds)
+            self.step_cache.put(keys[i + 1], ds)
+        if n == len(self.pipeline.transform.sequence):
+            self.hold_result(keys[-1], ds, original)
+        return ds
+
+    def hold_result(self, key: str, ds: pd.DataFrame, original: StoredDataset) -> None:
+        self.release_result()
+        self._result = (key, ds)
+        # Original dataset is already charged by dataset store
+        if ds is not original.ds:
+            self.step_cache.hold(key, ds)
+            self._release_result = weakref.finalize(self, self.step_cache.release, key)
+
+    def release_result(self) -> None:
+        if self._release_result is not None:
+            self._release_result()
+        self._result = None
+        self._release_result = None
+
+    @property
     def result_dataset(self) -> pd.DataFrame:
         """Dataset after it is transformed"""
-        return self.pipeline.transform(self.original_dataset.copy())
+        return self.dataset_after(len(self.pipeline.transform.sequence))
+
+    def dataset_key(self, n: int) -> str:
+        """Identify dataset after the first `n` transforms, like step cache"""
+        original = self.hold_original_dataset()
+        *_, key = prefix_keys(original.token, self.pipeline.transform.sequence[:n])
+        return key
+
+    def dataset_stats_after(self, n: int) -> DatasetStats:
+        """Statistics of dataset after the first `n` transforms.
+
+        Statistics are kept for each version of dataset, so viewing them
+        again does not rerun computation.
+        """
+        return get_stats_cache().get(
+            f'{self.dataset_key(n)}-stats',
+            lambda: get_dataset_stats(self.dataset_after(n)),
+        )
+
+    def dataset_profile_after(self, n: int) -> DatasetProfile:
+        """Profile of dataset after the first `n` transforms, kept like statistics"""
+        return get_stats_cache().get(
+            f'{self.dataset_key(n)}-profile',
+            lambda: get_dataset_profile(self.dataset_after(n)),
+        )
+
+    def evaluate_after[T: BaseModel](self, n: int, evaluate: Callable[..., T], **params) -> T:
+        """Evaluate dataset after the first `n` transforms, keeping report like statistics"""
+        key = '-'.join([
+            self.dataset_key(n),
+            evaluate.__name__,
+            json.dumps(params, sort_keys = True),
+        ])
+        return get_stats_cache().get(key, lambda: evaluate(self.dataset_after(n), **params))
+
+    def evaluate_original[T: BaseModel](self, evaluate: Callable[..., T], **params) -> T:
+        return self.evaluate_after(0, evaluate, **params)
+
+    def evaluate_result[T: BaseModel](self, evaluate: Callable[..., T], **params) -> T:
+        return self.evaluate_after(len(self.pipeline.transform.sequence), evaluate, **params)
+
+    @property
+    def original_stats(self) -> DatasetStats:
+        return self.dataset_stats_after(0)
+
+    @property
+    def result_stats(self) -> DatasetStats:
+        return self.dataset_stats_after(len(self.pipeline.transform.sequence))
+
+    @property
+    def original_profile(self) -> DatasetProfile:
+        return self.dataset_profile_after(0)
+
+    @property
+    def result_profile(self) -> DatasetProfile:
+        return self.dataset_profile_after(len(self.pipeline.transform.sequence))
 
     def clear_all_cache(self):
-        if 'result_dataset' in self.__dict__:
-            del self.result_dataset
-        if 'original_dataset' in self.__dict__:
-            del self.original_dataset
+        # Steps cached from the released dataset are never used again,
+        # and are left for the cache to evict.
+        self.release_result()
+        self.release_original_dataset()
 
     def set_load(self, load: Load) -> None:
         self.clear_all_cache()
@@ -91,68 +324,170 @@ class State(BaseModel):
             warnings = warnings or None,
         )
 
-    def append_transform(self, transform: Transform) -> None:
-        """Append new transformation step and update app state.
+    def set_transforms(self, sequence: list[Transform]) -> None:
+        """Replace transformation steps and update app state.
 
         - Result_dataset will be updated immediately to ensure feedback on
-          appending faulty transform.
-        - New transform is only appended if it does not cause error.
+          faulty transform.
+        - New steps are only kept if they do not cause error.
         - All previous transforms must have already been tested.
           Otherwise, we will not know if error in the pipeline is caused by new
           transform or previously untested steps.
         """
-        transform_sequence = self.pipeline.transform.sequence
-
-        if 'result_dataset' in self.__dict__:
-            self.result_dataset = transform(self.result_dataset)
-            transform_sequence.append(transform)
+        previous = self.pipeline.transform.sequence
+        self.pipeline.transform.sequence = sequence
+        self.release_result()
+        try:
+            _ = self.result_dataset
+        except Exception as e:
+            self.pipeline.transform.sequence = previous
+            raise e
         else:
-            transform_sequence.append(transform)
-            try:
-                _ = self.result_dataset
-            except Exception as e:
-                transform_sequence.pop()
-                raise e
-            else:
-                self.autopersist()
+            self.autopersist()
+
+    def check_transform_index(self, index: int, inserting: bool = False) -> None:
+        size = len(self.pipeline.transform.sequence)
+        if not (0 <= index < size + inserting):
+            raise IndexError(
+                f'Transform index {index} is out of range.'
+                f' Transformer sequence has {size} steps.'
+            )
+
+    def append_transform(self, transform: Transform) -> None:
+        """Append new transformation step and update app state."""
+        self.insert_transform(len(self.pipeline.transform.sequence), transform)
+
+    def insert_transform(self, index: int, transform: Transform) -> None:
+        """Insert new transformation step before step at index."""
+        self.check_transform_index(index, inserting = True)
+        sequence = list(self.pipeline.transform.sequence)
+        sequence.insert(index, transform)
+        self.set_transforms(sequence)
+
+    def replace_transform(self, index: int, transform: Transform) -> None:
+        """Replace transformation step at index."""
+        self.check_transform_index(index)
+        sequence = list(self.pipeline.transform.sequence)
+        sequence[index] = transform
+        self.set_transforms(sequence)
+
+    def delete_transform(self, index: int) -> None:
+        """Remove transformation step at index."""
+        self.check_transform_index(index)
+        sequence = list(self.pipeline.transform.sequence)
+        del sequence[index]
+        self.set_transforms(sequence)
 
     def set_export(self, export: Export) -> None:
         self.pipeline.export = export
         self.autopersist()
     
     def persist(self) -> None:
-        """Persist application state to file"""
-        self.pipeline_file.parent.mkdir(parents = True, exist_ok = True)
-        self.pipeline.to_file(self.pipeline_file)
+        """Persist application state to backend"""
+        self.version = self.backend.save(self.pipeline, self.version, self.session)
+
+    def pull(self) -> None:
+        """Replace pipeline with persisted one"""
+        stored = self.backend.load()
+        if stored is None:
+            self.pipeline, self.version = Pipeline(), self.backend.version()
+        else:
+            self.pipeline, self.version = stored
+
+    def sync(self) -> None:
+        """Catch up with pipeline persisted by the same session on other server replicas.
+
+        Pipelines persisted by other sessions are left alone. Cached datasets
+        stay valid, since they are identified by the steps producing them.
+        """
+        if not self.is_autopersist:
+            return
+        version, session = self.backend.head()
+        if session == self.session and version != self.version:
+            self.pull()
 
     @classmethod
     def restore(cls) -> Self:
-        """Restore application state from file"""
-        return cls(
-            pipeline = Pipeline.from_file(
-                get_settings().pipeline_file
-            ),
-        )
+        """Restore application state from backend"""
+        state = cls()
+        stored = state.backend.load()
+        if stored is None:
+            raise FileNotFoundError('No persisted pipeline')
+        state.pipeline, state.version = stored
+        return state
 
     @classmethod
     def init(cls, restore = None) -> Self:
         if restore is None:
             restore = get_settings().restore
+        state = None
         if restore:
             try:
-                return cls.restore()
+                state = cls.restore()
             except Exception:
                 pass
-        return cls()
+        state = state or cls()
+        state.take_snapshot()
+        return state
 
     def autopersist(self) -> None:
         if self.is_autopersist:
-            self.persist()
+            try:
+                self.persist()
+            except VersionConflictException:
+                # Drop this edit in favor of the one persisted first
+                self.pull()
+                raise
 
     def clear_persisted(self) -> None:
-        self.pipeline_file.unlink(missing_ok = True)
+        self.version = self.backend.clear(self.session)
         
     def reset_pipeline(self) -> None:
         self.clear_all_cache()
         self.pipeline = Pipeline()
         self.clear_persisted()
+
+
+class Prewarm:
+    """Restored pipeline run in background once server starts.
+
+    State of the first client session is taken over from here, so its
+    datasets are ready by the time client asks for them. Datasets are also
+    shared with later sessions through dataset store and step cache.
+    """
+
+    def __init__(self):
+        self.state: State | None = State.init(restore = True)
+        self.done = threading.Event()
+        if self.state.pipeline.load is None:
+            self.done.set()
+        else:
+            get_executor().submit(self.run, self.state)
+
+    def run(self, state: State) -> None:
+        try:
+            with state.lock:
+                try:
+                    _ = state.result_dataset
+                finally:
+                    state.take_snapshot()
+            _logger.info('Restored pipeline is ready')
+        except Exception as e:
+            # Session will see the error once it uses the dataset
+            _logger.warning(f'Can not run restored pipeline. {e}')
+        finally:
+            self.done.set()
+
+    @property
+    def ready(self) -> bool:
+        return self.done.is_set()
+
+    def wait(self) -> None:
+        """Wait for restored pipeline rather than running it again"""
+        while not self.done.wait(0.1):
+            checkpoint(0, None, 'Waiting for restored pipeline')
+
+    def take_state(self) -> State | None:
+        """Hand over prewarmed state to the first session asking for it"""
+        state, self.state = self.state, None
+        return state
@@ -0,0 +1,354 @@
+"""Storage of persisted pipeline shared by sessions and server replicas.
+
+Every save increments version of stored pipeline and records the client
+session which saved it. Stored pipeline is the one last edited by any
+session, but sessions keep their own pipelines and only catch up with
+their own saves, such as ones made through another server replica.
+Saving is refused if pipeline has been saved by the same session since
+the version the saver started from, so its edits are never silently lost.
+"""
+
+from typing import Any, Literal
+from pathlib import Path
+from abc import ABC, abstractmethod
+from contextlib import closing, contextmanager
+import atexit
+import fcntl
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import weakref
+
+from mcp_anon.pipeline import Pipeline
+
+
+class VersionConflictException(Exception):
+    def __init__(self, message = (
+        'Pipeline has been changed by another request of this session since it was last viewed.'
+        ' Review current pipeline and try again.'
+    )):
+        super().__init__(message)
+
+
+class StateBackend(ABC):
+    """Storage of persisted pipeline with version numbers"""
+
+    @abstractmethod
+    def head(self) -> tuple[int, str | None]:
+        """Version of stored pipeline and session which saved it, cheap
+        enough to poll on every request.
+
+        Return (0, None) if pipeline has never been stored.
+        """
+        ...
+
+    def version(self) -> int:
+        return self.head()[0]
+
+    @abstractmethod
+    def load(self) -> tuple[Pipeline, int] | None:
+        """Stored pipeline along with its version, or None if not stored"""
+        ...
+
+    @abstractmethod
+    def save(self, pipeline: Pipeline, version: int, session: str | None = None) -> int:
+        """Store pipeline edited from given version and return its new version.
+
+        Raise VersionConflictException if the same session has stored
+        another version since. Pipeline of other sessions is replaced.
+        """
+        ...
+
+    @abstractmethod
+    def clear(self, session: str | None = None) -> int:
+        """Remove stored pipeline and return new version"""
+        ...
+
+
+def is_conflict(head: tuple[int, str | None], version: int, session: str | None) -> bool:
+    stored_version, stored_session = head
+    return stored_session == session and stored_version != version
+
+
+def write_atomic(path: Path, text: str) -> None:
+    """Write file so readers see either old or new content, never partial.
+
+    Content is on disk before it replaces the old one, so it also survives
+    loss of power.
+    """
+    with tempfile.NamedTemporaryFile(
+        'w',
+        dir = path.parent,
+        prefix = f'.{path.name}.',
+        delete = False,
+    ) as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f.name, path)
+
+
+class FileBackend(StateBackend):
+    """Pipeline stored as YAML file readable by anon-runner.
+
+    Saves are appended to a journal of JSON records, which is compacted
+    into the YAML file after no save happens for `compact_delay` seconds.
+    Only compaction syncs files to disk, so journal survives crash of
+    server, but edits since last compaction may be lost with power.
+    Until then, the latest complete journal record takes precedence over
+    YAML file. Version of YAML file and session which saved it are kept in
+    a hidden file next to it.
+
+    Writers take an exclusive lock on another hidden file, so this only
+    works across hosts on a filesystem with working `flock`.
+    """
+
+    def __init__(self, path: Path, compact_delay: float = 0):
+        self.path = Path(path)
+        self.compact_delay = compact_delay
+        self._timer: threading.Timer | None = None
+        self._timer_lock = threading.Lock()
+
+    @property
+    def version_path(self) -> Path:
+        return self.path.with_name(f'.{self.path.name}.version')
+
+    @property
+    def lock_path(self) -> Path:
+        return self.path.with_name(f'.{self.path.name}.lock')
+
+    @property
+    def journal_path(self) -> Path:
+        return self.path.with_name(f'.{self.path.name}.journal')
+
+    @contextmanager
+    def locked(self):
+        self.path.parent.mkdir(parents = True, exist_ok = True)
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def read_journal(self) -> dict[str, Any] | None:
+        """Latest complete record of journal, or None if journal is empty"""
+        try:
+            lines = self.journal_path.read_text().splitlines()
+        except FileNotFoundError:
+            return None
+        for line in reversed(lines):
+            try:
+                return json.loads(line)
+            except ValueError:
+                # Record torn by crash while appending
+                continue
+        return None
+
+    def compacted_head(self) -> tuple[int, str | None]:
+        try:
+            record = json.loads(self.version_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return 0, None
+        return record['version'], record.get('session')
+
+    def head(self) -> tuple[int, str | None]:
+        # Compaction removes journal only after writing version file
+        record = self.read_journal()
+        if record is not None:
+            return record['version'], record.get('session')
+        return self.compacted_head()
+
+    def load(self) -> tuple[Pipeline, int] | None:
+        record = self.read_journal()
+        if record is not None:
+            if record['pipeline'] is None:
+                return None
+            return Pipeline.model_validate(record['pipeline']), record['version']
+        # Read without lock, retrying if compaction replaced files meanwhile
+        while True:
+            head = self.compacted_head()
+            if not self.path.is_file():
+                return None
+            pipeline = Pipeline.from_file(self.path)
+            if self.compacted_head() == head:
+                return pipeline, head[0]
+
+    def append(self, pipeline: Pipeline | None, version: int, session: str | None) -> None:
+        record = {
+            'version': version,
+            'session': session,
+            'pipeline': None if pipeline is None else pipeline.model_dump(
+                mode = 'json',
+                exclude_none = True,
+            ),
+        }
+        with open(self.journal_path, 'a+b') as f:
+            # Drop record torn by crash while appending,
+            # otherwise new record would continue its line and be lost too
+            f.seek(0)
+            complete = f.read().rfind(b'\n') + 1
+            f.truncate(complete)
+            # Record reaches operating system once file is closed, so it
+            # survives crash of server. Only compaction, off request path,
+            # waits for it to reach disk.
+            f.write((json.dumps(record) + '\n').encode())
+
+    def save(self, pipeline: Pipeline, version: int, session: str | None = None) -> int:
+        with self.locked():
+            head = self.head()
+            if is_conflict(head, version, session):
+                raise VersionConflictException()
+            version = head[0] + 1
+            self.append(pipeline, version, session)
+        self.schedule_compaction()
+        return version
+
+    def clear(self, session: str | None = None) -> int:
+        with self.locked():
+            version = self.version() + 1
+            self.append(None, version, session)
+        self.schedule_compaction()
+        return version
+
+    def schedule_compaction(self) -> None:
+        """Compact journal once saves stop coming for `compact_delay` seconds"""
+        if self.compact_delay <= 0:
+            self.compact()
+            return
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.compact_delay, self.compact)
+            self._timer.daemon = True
+            self._timer.start()
+        _pending_compaction.add(self)
+
+    def compact(self) -> None:
+        """Write latest journal record into YAML file and empty journal"""
+        if not self.journal_path.exists():
+            return
+        with self.locked():
+            record = self.read_journal()
+            if record is None:
+                return
+            if record['pipeline'] is None:
+                self.path.unlink(missing_ok = True)
+            else:
+                text = io.StringIO()
+                Pipeline.model_validate(record['pipeline']).to_file(text)
+                write_atomic(self.path, text.getvalue())
+            write_atomic(self.version_path, json.dumps({
+                'version': record['version'],
+                'session': record.get('session'),
+            }))
+            self.journal_path.unlink()
+
+
+# File backends with journal not yet compacted
+_pending_compaction: weakref.WeakSet[FileBackend] = weakref.WeakSet()
+
+
+@atexit.register
+def compact_pending() -> None:
+    for backend in list(_pending_compaction):
+        backend.compact()
+
+
+class SqliteBackend(StateBackend):
+    """Pipeline stored in SQLite database.
+
+    Suits replicas sharing a database file on the same host. SQLite does
+    not notify other processes of changes, so they poll `version()`.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents = True, exist_ok = True)
+        # Manage transactions explicitly
+        connection = sqlite3.connect(self.path, timeout = 30, isolation_level = None)
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS pipeline (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL,
+                session TEXT,
+                definition TEXT
+            )
+        """)
+        return connection
+
+    @staticmethod
+    def stored_head(connection: sqlite3.Connection) -> tuple[int, str | None]:
+        row = connection.execute('SELECT version, session FROM pipeline WHERE id = 1').fetchone()
+        return (0, None) if row is None else row
+
+    @contextmanager
+    def writing(self):
+        with closing(self.connect()) as connection:
+            # Take write lock before reading version to compare
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            else:
+                connection.execute('COMMIT')
+
+    def head(self) -> tuple[int, str | None]:
+        with closing(self.connect()) as connection:
+            return self.stored_head(connection)
+
+    def load(self) -> tuple[Pipeline, int] | None:
+        with closing(self.connect()) as connection:
+            row = connection.execute(
+                'SELECT definition, version FROM pipeline WHERE id = 1'
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        definition, version = row
+        return Pipeline.from_file(io.StringIO(definition)), version
+
+    def save(self, pipeline: Pipeline, version: int, session: str | None = None) -> int:
+        text = io.StringIO()
+        pipeline.to_file(text)
+        with self.writing() as connection:
+            head = self.stored_head(connection)
+            if is_conflict(head, version, session):
+                raise VersionConflictException()
+            version = head[0] + 1
+            connection.execute(
+                'INSERT OR REPLACE INTO pipeline (id, version, session, definition)'
+                ' VALUES (1, ?, ?, ?)',
+                (version, session, text.getvalue()),
+            )
+        return version
+
+    def clear(self, session: str | None = None) -> int:
+        with self.writing() as connection:
+            version = self.stored_head(connection)[0] + 1
+            connection.execute(
+                'INSERT OR REPLACE INTO pipeline (id, version, session, definition)'
+                ' VALUES (1, ?, ?, NULL)',
+                (version, session),
+            )
+        return version
+
+
+def get_state_backend(
+    pipeline_file: Path,
+    kind: Literal['file', 'sqlite'] = 'file',
+    compact_delay: float = 0,
+) -> StateBackend:
+    pipeline_file = Path(pipeline_file)
+    match kind:
+        case 'file':
+            return FileBackend(pipeline_file, compact_delay)
+        case 'sqlite':
+            return SqliteBackend(pipeline_file.with_suffix('.sqlite'))
@@ -0,0 +1,100 @@
+"""Run blocking dataset work in worker threads.
+
+Work runs as a job, which reports its progress to the requesting client and
+stops at its next checkpoint once the request is cancelled or times out.
+"""
+
+import logging
+_logger = logging.getLogger(__name__)
+from typing import TYPE_CHECKING
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from functools import cache
+import asyncio
+import threading
+
+# Only needed by server, so steps of pipeline can checkpoint without it
+if TYPE_CHECKING:
+    from fastmcp import Context
+
+from mcp_anon.settings import get_settings
+
+
+class JobCancelled(Exception):
+    def __init__(self, message = 'Job is cancelled.'):
+        super().__init__(message)
+
+
+class Job:
+    """Work running in a worker thread on behalf of a request"""
+
+    def __init__(self, report: Callable[[float, float | None, str | None], None]):
+        self.report = report
+        self.cancelled = threading.Event()
+
+    def checkpoint(
+        self,
+        progress: float,
+        total: float | None = None,
+        message: str | None = None,
+    ) -> None:
+        if self.cancelled.is_set():
+            raise JobCancelled()
+        self.report(progress, total, message)
+
+
+current_job: ContextVar[Job | None] = ContextVar('current_job', default = None)
+
+
+def checkpoint(
+    progress: float,
+    total: float | None = None,
+    message: str | None = None,
+) -> None:
+    """Report progress of current job, stopping it here if it is cancelled.
+
+    Does nothing outside of a job.
+    """
+    job = current_job.get()
+    if job is not None:
+        job.checkpoint(progress, total, message)
+
+
+@cache
+def get_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers = get_settings().workers,
+        thread_name_prefix = 'mcp-anon-worker',
+    )
+
+
+async def run_job[T](ctx: 'Context', function: Callable[[], T]) -> T:
+    """Run function in a worker thread without blocking event loop.
+
+    The function is asked to stop at its next checkpoint when the request
+    is cancelled, for example by client disconnecting, or once it runs
+    longer than `tool_timeout` setting.
+    """
+    loop = asyncio.get_running_loop()
+
+    def report(progress, total, message):
+        asyncio.run_coroutine_threadsafe(
+            ctx.report_progress(progress, total, message),
+            loop,
+        )
+
+    job = Job(report)
+    context = copy_context()
+    context.run(current_job.set, job)
+    future = loop.run_in_executor(get_executor(), context.run, function)
+    timeout = get_settings().tool_timeout
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except TimeoutError:
+        job.cancelled.set()
+        raise TimeoutError(f'Tool did not finish within {timeout} seconds.') from None
+    except asyncio.CancelledError:
+        _logger.info('Request is cancelled. Stopping its job.')
+        job.cancelled.set()
+        raise
@@ -1,9 +1,25 @@
 from pathlib import Path
+import os
 import shutil
+import tempfile
 
 import pytest
 
 
+def pytest_configure(config):
+    # Server reads settings once imported, so set them before collecting tests.
+    # Tool schemas are cached outside home directory of user running tests.
+    config.schema_cache = tempfile.mkdtemp(prefix = 'mcp-anon-schema-')
+    os.environ['ANON_SCHEMA_CACHE'] = config.schema_cache
+    # As set by entry points of server and command line
+    from mcp_anon.pipeline.pandas import enable_copy_on_write
+    enable_copy_on_write()
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(config.schema_cache, ignore_errors = True)
+
+
 @pytest.fixture(scope = 'session')
 def session_monkeypatch():
     with pytest.MonkeyPatch.context() as mp:
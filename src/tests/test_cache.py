@@ -0,0 +1,64 @@
+import shutil
+
+import pytest
+import pandas as pd
+
+from mcp_anon.dataset.cache import DiskCache
+from mcp_anon.pipeline.pandas import LoadCsv
+
+
+@pytest.fixture
+def source(outdir):
+    outdir.mkdir(parents = True, exist_ok = True)
+    path = outdir / 'source.csv'
+    shutil.copy('datasets/small.csv', path)
+    yield path
+
+
+@pytest.fixture
+def cache(outdir):
+    return DiskCache(outdir / 'cache')
+
+
+def break_loading(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError('Dataset should be read from cache')
+    monkeypatch.setattr(LoadCsv, '__call__', fail)
+    monkeypatch.setattr(LoadCsv, 'stream', fail)
+
+
+def test_get_from_cache(source, cache, monkeypatch):
+    load = LoadCsv(path = source)
+    expected = load()
+    pd.testing.assert_frame_equal(cache.get(load), expected)
+    assert len(list(cache.directory.glob('*.arrow'))) == 1
+    break_loading(monkeypatch)
+    pd.testing.assert_frame_equal(cache.get(load), expected)
+    chunks = list(cache.stream(load, chunksize = 1))
+    assert [len(x) for x in chunks] == [1, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index = True), expected)
+
+
+def test_stream_into_cache(source, cache, monkeypatch):
+    load = LoadCsv(path = source)
+    expected = load()
+    chunks = list(cache.stream(load, chunksize = 1))
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index = True), expected)
+    break_loading(monkeypatch)
+    pd.testing.assert_frame_equal(cache.get(load), expected)
+
+
+def test_incomplete_stream_is_not_cached(source, cache):
+    load = LoadCsv(path = source)
+    next(cache.stream(load, chunksize = 1))
+    assert not list(cache.directory.glob('*'))
+
+
+def test_source_change_invalidates_cache(source, cache):
+    load = LoadCsv(path = source)
+    cache.get(load)
+    with open(source, 'a') as f:
+        f.write('103,carol,45000,1\n')
+    assert len(cache.get(load)) == 3
+    # Dataset cached from previous version of source is removed
+    assert len(list(cache.directory.glob('*.arrow'))) == 1
@@ -39,11 +39,19 @@ def test_inspect_json():
     from_json = Pipeline.model_validate(json.loads(result.stdout))
 
 
-def test_run(outdir):
+@pytest.mark.parametrize(
+    'extra_args',
+    [
+        tuple(),
+        ('--chunksize', '1'),
+    ],
+)
+def test_run(outdir, extra_args):
     runner = CliRunner()
     result = runner.invoke(cli, [
         'run',
         'pipelines/valid/simple.yaml',
+        *extra_args,
     ])
     assert not result.exception
     outfile = outdir / 'small.csv'
@@ -57,3 +65,82 @@ def test_run(outdir):
     ]
     assert outcontent == expected_outcontent
 
+
+
+def test_run_chunked_fits_bins_on_whole_dataset(outdir):
+    runner = CliRunner()
+    outfile = outdir / 'bin-count.csv'
+    outcontents = []
+    for extra_args in [tuple(), ('--chunksize', '1')]:
+        result = runner.invoke(cli, [
+            'run',
+            'pipelines/valid/bin-count.yaml',
+            *extra_args,
+        ])
+        assert not result.exception
+        with open(outfile, 'r') as f:
+            outcontents.append(f.readlines())
+    # Each chunk holds a single record, so bins fitted per chunk would differ
+    # from bins fitted on the whole dataset.
+    whole, chunked = outcontents
+    assert chunked == whole
+
+
+@pytest.mark.parametrize(
+    'pipeline_file',
+    [
+        'pipelines/valid/simple.yaml',
+        'pipelines/valid/bin-count.yaml',
+        'pipelines/valid/drop-unused.yaml',
+    ],
+)
+def test_run_polars_backend_matches_pandas(outdir, pipeline_file):
+    pytest.importorskip('polars')
+    runner = CliRunner()
+    pipeline = Pipeline.from_file(pipeline_file)
+    outcontents = []
+    for backend in ['pandas', 'polars']:
+        backend_file = outdir / f'{backend}.yaml'
+        outdir.mkdir(exist_ok = True)
+        pipeline.model_copy(update = {'backend': backend}).to_file(backend_file)
+        result = runner.invoke(cli, ['run', str(backend_file)])
+        assert not result.exception
+        with open(pipeline.export.path, 'r') as f:
+            outcontents.append(f.readlines())
+    pandas_output, polars_output = outcontents
+    assert polars_output == pandas_output
+
+
+@pytest.mark.parametrize(
+    'mask',
+    [
+        {'regex': '[^ab]+'},
+        {'regex': 'é|b', 'n': 2, 'mask_char': '#'},
+        {'regex': 'x*'},
+        {'regex': '^.{2}'},
+    ],
+)
+def test_run_polars_mask_matches_pandas(outdir, mask):
+    pytest.importorskip('polars')
+    outdir.mkdir(parents = True, exist_ok = True)
+    source = outdir / 'source.csv'
+    # Record of only empty values is kept by either backend
+    source.write_text('id,name\n1,alice\n2,ébbé x\n,\n3,bob\n4,\n')
+    runner = CliRunner()
+    outcontents = []
+    for backend in ['pandas', 'polars']:
+        backend_file = outdir / f'{backend}.yaml'
+        Pipeline.model_validate({
+            'backend': backend,
+            'load': {'type': 'csv', 'path': str(source)},
+            'transform': {
+                'type': 'sequence',
+                'sequence': [{'type': 'mask', 'field': 'name', **mask}],
+            },
+            'export': {'type': 'csv', 'path': str(outdir / 'result.csv')},
+        }).to_file(backend_file)
+        result = runner.invoke(cli, ['run', str(backend_file)])
+        assert not result.exception
+        outcontents.append((outdir / 'result.csv').read_text())
+    pandas_output, polars_output = outcontents
+    assert polars_output == pandas_output
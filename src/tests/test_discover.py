@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mcp_anon.dataset.discover import candidates, discover_quasi_identifiers
+
+
+@pytest.fixture
+def dataset():
+    return pd.DataFrame({
+        'id': [1, 2, 3, 4, 5, 6, 7, 8],
+        'age': pd.array([30, 30, 30, 30, 40, 40, 40, 40], dtype = 'int64[pyarrow]'),
+        'sex': pd.array(['f', 'f', 'm', 'm', 'f', 'f', 'm', None], dtype = 'string[pyarrow]'),
+        'zip': ['1', '2', '1', '2', '1', '2', '1', '2'],
+        'flag': [True] * 8,
+    })
+
+
+def fields(discovery):
+    return [x.fields for x in discovery.combinations]
+
+
+def test_candidates():
+    safe = [(0, 1), (0, 2), (0, 3), (1, 2)]
+    # (0, 2, 3) lacks safe (2, 3), (0, 1, 3) lacks safe (1, 3)
+    assert candidates(safe) == [(0, 1, 2)]
+
+
+def test_minimal_combinations(dataset):
+    discovery = discover_quasi_identifiers(dataset, workers = 1)
+    # Missing value is a value of its own, so it singles out its record
+    assert fields(discovery) == [['id'], ['sex']]
+    assert discovery.combinations[0].uniqueness == 1
+    assert discovery.combinations[1].records == 1
+    # Supersets of risky fields are never evaluated
+    assert discovery.evaluated == 5 + 3 + 1
+    assert discovery.complete
+
+
+def test_threshold(dataset):
+    discovery = discover_quasi_identifiers(dataset, ['age', 'sex'], threshold = 0.3, workers = 1)
+    assert fields(discovery) == []
+    discovery = discover_quasi_identifiers(dataset, ['age', 'sex'], threshold = 0.2, workers = 1)
+    # Male of age 40 and record with missing sex
+    assert fields(discovery) == [['age', 'sex']]
+    assert discovery.combinations[0].records == 2
+
+
+def test_k(dataset):
+    discovery = discover_quasi_identifiers(dataset, ['age', 'zip'], k = 3, workers = 1)
+    assert fields(discovery) == [['age', 'zip']]
+    assert discovery.combinations[0].records == 8
+
+
+def test_max_evaluated(dataset):
+    discovery = discover_quasi_identifiers(dataset, max_evaluated = 6, workers = 1)
+    assert not discovery.complete
+    assert discovery.evaluated == 5
+
+
+def test_process_pool(dataset):
+    assert (
+        discover_quasi_identifiers(dataset, workers = 2)
+        == discover_quasi_identifiers(dataset, workers = 1)
+    )
+
+
+def test_unknown_field(dataset):
+    with pytest.raises(KeyError, match = 'unknown'):
+        discover_quasi_identifiers(dataset, ['unknown'])
+
+
+def test_concurrent_searches_in_process():
+    datasets = [
+        pd.DataFrame(np.random.default_rng(seed).integers(0, 2 + seed, size = (200, 4)))
+        .rename(columns = str)
+        for seed in range(8)
+    ]
+    expected = [discover_quasi_identifiers(x, workers = 1) for x in datasets]
+    # Searches of sessions run in threads of one process, switching often
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(8) as executor:
+            for _ in range(5):
+                found = list(executor.map(
+                    lambda x: discover_quasi_identifiers(x, workers = 1),
+                    datasets,
+                ))
+                assert found == expected
+    finally:
+        sys.setswitchinterval(interval)
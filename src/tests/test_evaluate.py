@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mcp_anon.dataset.evaluate import (
+    GroupCounts,
+    count_groups,
+    evaluate_k_anonymity,
+    evaluate_l_diversity,
+    evaluate_t_closeness,
+    get_k_anonymity,
+    get_l_diversity,
+    get_t_closeness,
+)
+
+
+@pytest.fixture
+def dataset():
+    return pd.DataFrame({
+        'age': pd.array([30, 30, 30, 40, 40, 50], dtype = 'int64[pyarrow]'),
+        'sex': pd.array(['f', 'f', 'f', 'm', 'm', None], dtype = 'string[pyarrow]'),
+        'disease': ['flu', 'flu', 'cold', 'flu', 'flu', 'cold'],
+        'income': [1, 2, 3, 1, 1, 3],
+    })
+
+
+def test_k_anonymity(dataset):
+    report = get_k_anonymity(dataset, ['age', 'sex'], k = 2)
+    assert report.records == 6
+    assert report.classes == 3
+    assert report.k == 1
+    assert report.smallest_classes == [1, 2, 3]
+    assert report.classes_below_target == 1
+    assert report.records_below_target == 1
+
+
+def test_missing_value_is_a_value(dataset):
+    report = get_k_anonymity(dataset, ['sex'])
+    assert report.smallest_classes == [1, 2, 3]
+
+
+def test_l_diversity(dataset):
+    report = get_l_diversity(dataset, ['age'], 'disease', l = 2)
+    assert report.l == 1
+    assert report.least_diverse_classes == [1, 1, 2]
+    assert report.classes_below_target == 2
+    assert report.entropy_l == pytest.approx(1)
+
+
+def test_t_closeness(dataset):
+    # Overall flu: 4/6. Class age=50 has only cold.
+    report = get_t_closeness(dataset, ['age'], 'disease', t = 0.5)
+    assert not report.ordered
+    assert report.t == pytest.approx(4 / 6)
+    assert report.classes_above_target == 1
+    # Overall income: 1 -> 3/6, 2 -> 1/6, 3 -> 2/6. Class age=40 has only 1.
+    # Cumulative differences (1/2, 1/3, 0) spread over 2 steps.
+    report = get_t_closeness(dataset, ['age'], 'income')
+    assert report.ordered
+    assert sorted(report.farthest_classes)[1] == pytest.approx((1 / 2 + 1 / 3) / 2)
+
+
+def dense_t_closeness(df, quasi_identifiers, sensitive, ordered):
+    """Distances by definition, over every value of every class"""
+    overall = df[sensitive].value_counts(normalize = True).sort_index()
+    distances = []
+    for _, group in df.groupby(quasi_identifiers):
+        share = group[sensitive].value_counts(normalize = True).reindex(overall.index, fill_value = 0)
+        difference = (share - overall).to_numpy()
+        if ordered:
+            distances.append(np.abs(np.cumsum(difference)).sum() / max(len(overall) - 1, 1))
+        else:
+            distances.append(np.abs(difference).sum() / 2)
+    return sorted(distances, reverse = True)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_t_closeness_by_definition(seed):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'a': rng.integers(0, 5, 200),
+        'b': rng.integers(0, 3, 200),
+        'value': rng.integers(0, 30, 200),
+    })
+    for ordered in [True, False]:
+        counts = count_groups([df], ['a', 'b'], 'value')
+        report = evaluate_t_closeness(counts, ordered)
+        expected = dense_t_closeness(df, ['a', 'b'], 'value', ordered)
+        assert report.farthest_classes == pytest.approx(expected[:len(report.farthest_classes)])
+
+
+def test_t_closeness_scales_with_records():
+    # Dense distributions would take classes times distinct values,
+    # here 10**5 by 10**6 cells
+    rng = np.random.default_rng(0)
+    n = 1_000_000
+    df = pd.DataFrame({
+        'group': np.arange(n) % (n // 10),
+        'salary': rng.normal(50_000, 10_000, n).round(2),
+    })
+    report = get_t_closeness(df, ['group'], 'salary')
+    assert report.classes == n // 10
+    assert 0 < report.t < 1
+
+
+def test_sensitive_field_not_quasi_identifier():
+    with pytest.raises(ValueError):
+        GroupCounts(['age', 'disease'], 'disease')
+
+
+def test_merge_chunks(dataset):
+    rng = np.random.default_rng(0)
+    large = dataset.sample(1000, replace = True, random_state = 0).reset_index(drop = True)
+    large['age'] += pd.array(rng.integers(0, 3, len(large)), dtype = 'int64[pyarrow]')
+    whole = GroupCounts(['age', 'sex'], 'income')
+    whole.update(large)
+    merged = GroupCounts(['age', 'sex'], 'income')
+    # Chunks counted separately have their own codes for values
+    for start in reversed(range(0, len(large), 300)):
+        part = GroupCounts(['age', 'sex'], 'income')
+        part.update(large.iloc[start:start + 300])
+        merged.merge(part)
+    assert evaluate_k_anonymity(merged) == evaluate_k_anonymity(whole)
+    assert evaluate_l_diversity(merged) == evaluate_l_diversity(whole)
+    for ordered in [False, True]:
+        assert (
+            evaluate_t_closeness(merged, ordered).t
+            == pytest.approx(evaluate_t_closeness(whole, ordered).t)
+        )
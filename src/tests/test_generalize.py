@@ -0,0 +1,127 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mcp_anon.dataset.evaluate import get_k_anonymity
+from mcp_anon.dataset.generalize import (
+    NoGeneralizationException,
+    generalize,
+    lattice_height,
+)
+from mcp_anon.pipeline.pandas import BinTransform, DropTransform, MaskTransform
+
+
+@pytest.fixture
+def dataset():
+    return pd.DataFrame({
+        'age': pd.array([21, 22, 23, 24, 35, 36, 37, 38], dtype = 'int64[pyarrow]'),
+        'zip': pd.array(
+            ['10001', '10002', '10013', '10014', '20001', '20002', '20013', '20014'],
+            dtype = 'string[pyarrow]',
+        ),
+        'sex': pd.Categorical(['f', 'm', 'f', 'm', 'f', 'm', 'f', 'm']),
+        'disease': ['flu'] * 8,
+    })
+
+
+def apply(steps, ds):
+    for step in steps:
+        ds = step(ds)
+    return ds
+
+
+def test_lattice_height():
+    assert lattice_height([1, 2], 2) == [(0, 2), (1, 1)]
+
+
+@pytest.mark.parametrize('heights', [[], [0], [3], [1, 2], [2, 0, 3], [4, 1, 2, 3]])
+def test_lattice_height_matches_full_lattice(heights):
+    nodes = list(product(*(range(h + 1) for h in heights)))
+    for height in range(sum(heights) + 2):
+        assert lattice_height(heights, height) == [x for x in nodes if sum(x) == height]
+
+
+@pytest.mark.parametrize('k', [1, 2, 4, 8])
+def test_reaches_k(dataset, k):
+    quasi_identifiers = ['age', 'zip', 'sex']
+    generalization = generalize(dataset, quasi_identifiers, k, workers = 1)
+    assert generalization.k >= k
+    result = apply(generalization.steps, dataset)
+    # Steps reproduce classes which search evaluated
+    report = get_k_anonymity(result, [x for x in quasi_identifiers if x in result])
+    assert report.k == generalization.k
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_reported_k_matches_result_of_float_fields(seed):
+    rng = np.random.default_rng(seed)
+    dataset = pd.DataFrame({
+        'x': rng.uniform(0, 10, 40).round(rng.integers(1, 4)),
+        'y': rng.normal(0, 1, 40),
+    })
+    generalization = generalize(dataset, ['x', 'y'], 5, workers = 1)
+    result = apply(generalization.steps, dataset)
+    assert get_k_anonymity(result, ['x', 'y']).k == generalization.k
+
+
+def test_already_anonymous_needs_no_steps(dataset):
+    generalization = generalize(dataset, ['disease'], 8, workers = 1)
+    assert generalization.steps == []
+    assert generalization.information_loss == 0
+
+
+def test_steps_by_field_type(dataset):
+    generalization = generalize(dataset, ['age', 'zip', 'sex'], 8, workers = 1)
+    assert generalization.levels == generalization.heights
+    assert generalization.information_loss == 1
+    assert [type(x) for x in generalization.steps] == [BinTransform, MaskTransform, DropTransform]
+    result = apply(generalization.steps, dataset)
+    assert set(result['zip']) == {'*****'}
+    assert 'sex' not in result
+
+
+def test_least_generalization(dataset):
+    generalization = generalize(dataset, ['age', 'zip'], 4, workers = 1)
+    # Either first digit of zip or decade of age tells halves apart
+    assert generalization.k == 4
+    assert generalization.information_loss < 1
+
+
+def test_process_pool(dataset):
+    assert (
+        generalize(dataset, ['age', 'zip', 'sex'], 2, workers = 2)
+        == generalize(dataset, ['age', 'zip', 'sex'], 2, workers = 1)
+    )
+
+
+def test_unreachable_k(dataset):
+    with pytest.raises(NoGeneralizationException):
+        generalize(dataset, ['age'], 9, workers = 1)
+
+
+def test_unknown_field(dataset):
+    with pytest.raises(KeyError, match = 'unknown'):
+        generalize(dataset, ['unknown'], 2, workers = 1)
+
+
+def test_concurrent_searches_in_process():
+    datasets = [
+        pd.DataFrame(np.random.default_rng(seed).integers(0, 20 + seed, size = (200, 3)))
+        .rename(columns = str)
+        for seed in range(8)
+    ]
+    search = lambda x: generalize(x, list(x.columns), 3, workers = 1)
+    expected = [search(x) for x in datasets]
+    # Searches of sessions run in threads of one process, switching often
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(8) as executor:
+            for _ in range(5):
+                assert list(executor.map(search, datasets)) == expected
+    finally:
+        sys.setswitchinterval(interval)
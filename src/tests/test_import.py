@@ -0,0 +1,72 @@
+"""Heavy libraries must only be imported once they are needed.
+
+Measured by which modules are imported in a fresh interpreter, rather than
+by timing, so results do not depend on machine load.
+"""
+
+import subprocess
+import sys
+
+
+def imported_modules(code: str, modules: list[str]) -> list[str]:
+    check = (
+        'import sys, types\n'
+        f'{code}\n'
+        f'for name in {modules!r}:\n'
+        '    module = sys.modules.get(name)\n'
+        # Lazily imported modules are registered before being executed
+        '    if type(module) is types.ModuleType:\n'
+        '        print(name)\n'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', check],
+        capture_output = True,
+        text = True,
+        check = True,
+    )
+    return result.stdout.split()
+
+
+def test_cli_import_is_light():
+    assert imported_modules(
+        'import mcp_anon.pipeline.cli',
+        ['pandas', 'pyarrow', 'sqlalchemy', 'devtools'],
+    ) == []
+
+
+def test_csv_pipeline_skips_unused_backends():
+    assert imported_modules(
+        'from mcp_anon.pipeline import Pipeline\n'
+        "Pipeline.from_file('pipelines/valid/simple.yaml').load()",
+        ['sqlalchemy', 'pyarrow.dataset', 'pyarrow.parquet', 'devtools'],
+    ) == []
+
+
+def test_cli_inspect_is_light():
+    for args in [
+        ['inspect', '--help'],
+        ['inspect', 'pipelines/valid/simple.yaml'],
+        ['inspect', 'pipelines/valid/simple.yaml', '--format', 'json'],
+    ]:
+        assert imported_modules(
+            'from click.testing import CliRunner\n'
+            'from mcp_anon.pipeline.cli import cli\n'
+            f'result = CliRunner().invoke(cli, {args!r})\n'
+            'assert result.exit_code == 0, result.output\n',
+            ['pandas', 'pyarrow'],
+        ) == []
+
+
+def test_import_keeps_pandas_options():
+    result = subprocess.run(
+        [
+            sys.executable, '-c',
+            'import pandas as pd\n'
+            'import mcp_anon.server\n'
+            'print(pd.options.mode.copy_on_write)',
+        ],
+        capture_output = True,
+        text = True,
+        check = True,
+    )
+    assert result.stdout.split() == ['False']
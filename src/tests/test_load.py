@@ -0,0 +1,358 @@
+import sqlite3
+
+import pytest
+import pandas as pd
+
+from mcp_anon.pipeline.pandas import (
+    LoadCsv,
+    LoadCsvFiles,
+    LoadSql,
+    LoadParquet,
+    LoadArrow,
+    ExportParquet,
+    ExportArrow,
+    BinTransform,
+)
+from mcp_anon.pipeline import Pipeline
+from mcp_anon.pipeline.pandas.load import get_engine
+from mcp_anon.pipeline.pandas import sample
+from mcp_anon.pipeline.pandas import load as load_module
+
+
+@pytest.fixture
+def sqlite_path(outdir):
+    outdir.mkdir(parents = True, exist_ok = True)
+    path = outdir / 'small.sqlite'
+    df = pd.read_csv('datasets/small.csv')
+    with sqlite3.connect(path) as connection:
+        df.to_sql('small', connection, index = False)
+    yield path
+
+
+@pytest.fixture(params = [False, True], ids = ['sqlalchemy', 'adbc'])
+def load_sql(request, sqlite_path):
+    return LoadSql(
+        sql = 'SELECT * FROM small',
+        drivername = 'sqlite',
+        database = str(sqlite_path),
+        adbc = request.param,
+    )
+
+
+def test_load_sql(load_sql):
+    expected = LoadCsv(path = 'datasets/small.csv')()
+    pd.testing.assert_frame_equal(load_sql(), expected)
+
+
+def test_stream_sql(load_sql):
+    chunks = list(load_sql.stream(chunksize = 1))
+    assert [len(chunk) for chunk in chunks] == [1, 1]
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index = True),
+        load_sql(),
+    )
+
+
+def test_load_sql_columns(load_sql):
+    assert load_sql.field_names() == ['id', 'name', 'salary', 'married']
+    projected = load_sql.project(['id', 'salary'])
+    assert projected.field_names() == ['id', 'salary']
+    pd.testing.assert_frame_equal(projected(), load_sql()[['id', 'salary']])
+
+
+def test_sql_schema(load_sql):
+    expected = LoadCsv(path = 'datasets/small.csv')()
+    pd.testing.assert_frame_equal(load_sql.schema(), expected.iloc[:0])
+
+
+def test_push_down_to_sql(load_sql):
+    pipeline = Pipeline(
+        load = load_sql,
+        transform = {'sequence': [
+            {'type': 'bin', 'input_field': 'salary', 'bins': [0, 10000, 20000, 30000]},
+            {'type': 'drop', 'fields': 'married'},
+            {'type': 'mask', 'field': 'name', 'regex': '[^ab]+'},
+            {'type': 'drop', 'fields': 'id'},
+        ]},
+    )
+    optimized = pipeline.optimize()
+    assert 'CASE' in optimized.load.sql
+    # Masking can not be expressed in SQL, so it runs in pandas.
+    # The last drop is not needed, as its field is no longer loaded.
+    assert [x.type for x in optimized.transform.sequence] == ['mask']
+    assert optimized.load.columns == ['name', 'salary']
+    expected = pipeline.transform(pipeline.load())
+    pd.testing.assert_frame_equal(optimized.transform(optimized.load()), expected)
+    pd.testing.assert_frame_equal(
+        pd.concat(optimized.load.stream(chunksize = 1), ignore_index = True),
+        optimized.load(),
+    )
+
+
+def test_sql_engine_is_reused(sqlite_path):
+    config = {
+        'sql': 'SELECT * FROM small',
+        'drivername': 'sqlite',
+        'database': str(sqlite_path),
+    }
+    assert get_engine(LoadSql(**config).url) is get_engine(LoadSql(**config).url)
+
+
+def test_adbc_unsupported_driver():
+    with pytest.raises(ValueError, match = 'ADBC'):
+        LoadSql(
+            sql = 'SELECT 1',
+            drivername = 'mysql',
+            adbc = True,
+        )
+
+
+def test_csv_schema():
+    load = LoadCsv(path = 'datasets/small.csv')
+    expected = load()
+    pd.testing.assert_frame_equal(load.schema(), expected.iloc[:0])
+
+
+def test_csv_dtypes():
+    load = LoadCsv(path = 'datasets/small.csv', dtypes = {'id': 'string[pyarrow]'})
+    assert load()['id'].tolist() == ['101', '102']
+    assert str(load.schema()['id'].dtype) == 'string[pyarrow]'
+
+
+def test_unrepresentative_first_records_do_not_fix_datatypes(outdir, monkeypatch):
+    monkeypatch.setattr(load_module, 'INFER_ROWS', 10)
+    outdir.mkdir(parents = True, exist_ok = True)
+    path = outdir / 'late.csv'
+    pd.DataFrame({
+        'number': [str(x) for x in range(20)] + ['abc'],
+        'empty': [None] * 20 + ['x'],
+    }).to_csv(path, index = False)
+    load = LoadCsv(path = path)
+    # First records suggest narrower datatypes, but loading sees all records
+    assert str(load.schema()['number'].dtype) == 'int64[pyarrow]'
+    ds = load()
+    assert ds['number'].iloc[-1] == 'abc'
+    assert ds['empty'].iloc[-1] == 'x'
+
+
+@pytest.fixture
+def large_csv(outdir, monkeypatch):
+    # Make sure samples are drawn across multiple chunks
+    monkeypatch.setattr(sample, 'CHUNKSIZE', 100)
+    outdir.mkdir(parents = True, exist_ok = True)
+    path = outdir / 'large.csv'
+    pd.DataFrame({
+        'id': range(1000),
+        'group': ['a'] * 900 + ['b'] * 100,
+    }).to_csv(path, index = False)
+    yield path
+
+
+@pytest.mark.parametrize(
+    'sample_config, expected_counts',
+    [
+        ({'type': 'limit', 'n': 150}, {'a': 150}),
+        ({'type': 'reservoir', 'n': 150}, None),
+        ({'type': 'fraction', 'fraction': 0.1}, None),
+        ({'type': 'stratified', 'by': 'group', 'fraction': 0.1}, {'a': 90, 'b': 10}),
+    ],
+)
+def test_load_sample(large_csv, sample_config, expected_counts):
+    load = LoadCsv(path = large_csv, sample = sample_config)
+    sampled = load.load_sample()
+    if expected_counts is not None:
+        assert sampled.value_counts('group').to_dict() == expected_counts
+    # Sampled records stay in source order
+    assert sampled['id'].is_monotonic_increasing
+    # The same sample is drawn every time
+    pd.testing.assert_frame_equal(sampled, load.load_sample())
+    # Full load is not affected by sampling
+    assert len(load()) == 1000
+
+
+def test_stratified_sample_keeps_group_spread_across_chunks(outdir, monkeypatch):
+    monkeypatch.setattr(sample, 'CHUNKSIZE', 100)
+    outdir.mkdir(parents = True, exist_ok = True)
+    path = outdir / 'rare.csv'
+    # One record of group b in each chunk, too few to take from any chunk alone
+    pd.DataFrame({
+        'id': range(1000),
+        'group': ['b' if i % 100 == 0 else 'a' for i in range(1000)],
+    }).to_csv(path, index = False)
+    load = LoadCsv(path = path, sample = {'type': 'stratified', 'by': ['group'], 'fraction': 0.1})
+    sampled = load.load_sample()
+    assert sampled.value_counts('group').to_dict() == {'a': 99, 'b': 1}
+    assert sampled['id'].is_monotonic_increasing
+
+
+@pytest.mark.parametrize('sample_config', [
+    {'type': 'limit', 'n': 150},
+    {'type': 'reservoir', 'n': 150},
+    {'type': 'fraction', 'fraction': 0.1},
+    {'type': 'stratified', 'by': 'group', 'fraction': 0.1},
+])
+def test_sample_empty_source(outdir, sample_config):
+    outdir.mkdir(parents = True, exist_ok = True)
+    path = outdir / 'empty.parquet'
+    pd.DataFrame({'id': [], 'group': []}).astype({'id': int, 'group': str}).to_parquet(path)
+    load = LoadParquet(path = path, sample = sample_config)
+    sampled = load.load_sample()
+    assert len(sampled) == 0
+    assert sampled.columns.tolist() == ['id', 'group']
+
+
+def test_reservoir_sample_size(large_csv):
+    load = LoadCsv(path = large_csv, sample = {'type': 'reservoir', 'n': 150})
+    sampled = load.load_sample()
+    assert len(sampled) == 150
+    assert sampled['id'].is_unique
+
+
+@pytest.mark.parametrize(
+    'export_class, load_class',
+    [
+        (ExportParquet, LoadParquet),
+        (ExportArrow, LoadArrow),
+    ],
+)
+def test_columnar_roundtrip(outdir, export_class, load_class):
+    path = outdir / 'small'
+    original = LoadCsv(path = 'datasets/small.csv')()
+    export_class(path = path)(original)
+    pd.testing.assert_frame_equal(load_class(path = path)(), original)
+    pd.testing.assert_frame_equal(load_class(path = path).schema(), original.iloc[:0])
+
+    projected = load_class(
+        path = path,
+        columns = ['id', 'salary'],
+        filters = [('salary', '>', 20000)],
+    )
+    expected = original.loc[original['salary'] > 20000, ['id', 'salary']]
+    pd.testing.assert_frame_equal(projected(), expected.reset_index(drop = True))
+    assert [len(chunk) for chunk in projected.stream(chunksize = 1)] == [1]
+
+
+@pytest.mark.parametrize(
+    'export_class, load_class, options',
+    [
+        (ExportParquet, LoadParquet, {'compression': 'zstd', 'row_group_size': 1}),
+        (ExportArrow, LoadArrow, {'compression': 'lz4'}),
+    ],
+)
+def test_columnar_stream_binned(outdir, export_class, load_class, options):
+    path = outdir / 'small'
+    load = LoadCsv(path = 'datasets/small.csv')
+    transform = BinTransform(input_field = 'salary', bins = [0, 10000, 20000, 30000])
+    export_class(path = path, **options).stream(
+        transform.stream(load.stream(chunksize = 1))
+    )
+    assert load_class(path = path)()['salary'].astype(str).tolist() == [
+        '(20000, 30000]',
+        '(10000, 20000]',
+    ]
+
+
+@pytest.mark.parametrize('export_class, load_class', [
+    (ExportParquet, LoadParquet),
+    (ExportArrow, LoadArrow),
+])
+def test_columnar_stream_chunks_of_different_datatypes(outdir, export_class, load_class):
+    path = outdir / 'mixed'
+    chunks = [
+        # Fields of only missing values have no datatype of their own
+        pd.DataFrame({
+            'n': pd.array([None, None], dtype = 'null[pyarrow]'),
+            'c': pd.Categorical(['a', 'b'], categories = ['b', 'a']),
+        }),
+        pd.DataFrame({
+            'n': pd.array([1.5], dtype = 'double[pyarrow]'),
+            'c': pd.Categorical(['c'], categories = [f'{i}' for i in range(200)] + ['c']),
+        }),
+        pd.DataFrame({
+            'n': pd.array([2], dtype = 'int64[pyarrow]'),
+            'c': pd.Categorical([None]),
+        }),
+    ]
+    outdir.mkdir(parents = True, exist_ok = True)
+    export_class(path = path).stream(chunks)
+    loaded = load_class(path = path)()
+    assert loaded['n'].tolist()[2:] == [1.5, 2.0]
+    assert loaded['n'].isna().tolist() == [True, True, False, False]
+    assert loaded['c'].astype(object).where(loaded['c'].notna(), None).tolist() == ['a', 'b', 'c', None]
+
+
+@pytest.fixture
+def csv_shards(outdir):
+    """Same records as small.csv split into one file per record"""
+    small = pd.read_csv('datasets/small.csv')
+    for i, record in small.iterrows():
+        path = outdir / f'shards/married={record['married']}/part-{i}.csv'
+        path.parent.mkdir(parents = True)
+        record.to_frame().T.drop(columns = 'married').to_csv(path, index = False)
+    yield outdir / 'shards'
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_load_csv_files(csv_shards, workers):
+    expected = LoadCsv(path = 'datasets/small.csv')()
+    expected['married'] = expected['married'].astype('string[pyarrow]')
+    load = LoadCsvFiles(path = csv_shards, partition_fields = True, workers = workers)
+    pd.testing.assert_frame_equal(load(), expected)
+    assert load.field_names() == expected.columns.tolist()
+    assert load.schema().columns.tolist() == expected.columns.tolist()
+    chunks = list(load.stream(chunksize = 1))
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index = True), expected)
+
+
+def test_load_csv_files_glob(csv_shards):
+    load = LoadCsvFiles(
+        path = csv_shards / '*/part-1.csv',
+        partition_fields = True,
+        columns = ['name', 'married'],
+    )
+    assert load().to_dict('records') == [{'name': 'bob', 'married': '1'}]
+
+
+def test_polars_export_stream(outdir):
+    pl = pytest.importorskip('polars')
+    from mcp_anon.pipeline.polars.export import ExportCsv
+    path = outdir / 'result.csv'
+    ExportCsv(path = path).stream([pl.LazyFrame({'a': [1, 2]}), pl.LazyFrame({'a': [3]})])
+    assert path.read_text() == 'a\n1\n2\n3\n'
+
+
+def test_polars_load_csv_skips_blank_lines(outdir):
+    pytest.importorskip('polars')
+    from mcp_anon.pipeline.polars.load import LoadCsv as PolarsLoadCsv
+    outdir.mkdir(parents = True, exist_ok = True)
+    path = outdir / 'source.csv'
+    # Blank lines inside quoted value are part of it
+    path.write_text('id,name\n1,a\n\n2,"b\n\nc"\n,\n3,d\r\n\r\n')
+    expected = LoadCsv(path = path)()
+    lf = PolarsLoadCsv(path = path)()
+    assert lf.collect().rows() == [
+        tuple(None if pd.isna(x) else x for x in row)
+        for row in expected.itertuples(index = False)
+    ]
+    lf = PolarsLoadCsv(path = path, dtypes = {'id': 'string[pyarrow]'})()
+    assert lf.collect()['id'].to_list() == ['1', '2', None, '3']
+    with pytest.raises(ValueError, match = 'not supported'):
+        PolarsLoadCsv(path = path, dtypes = {'id': 'object'})()
+
+
+def test_polars_push_down_to_sql(load_sql):
+    pytest.importorskip('polars')
+    from mcp_anon.pipeline.polars import lazy
+    pipeline = Pipeline(
+        load = load_sql,
+        transform = {'sequence': [
+            {'type': 'bin', 'input_field': 'salary', 'bins': [0, 10000, 20000, 30000]},
+        ]},
+    )
+    optimized = pipeline.optimize()
+    assert optimized.load.intervals
+    assert not optimized.transform.sequence
+    expected = lazy(pipeline.transform.sequence[0])(lazy(load_sql)()).collect()
+    result = lazy(optimized.load)().collect()
+    assert result.schema == expected.schema
+    assert result.equals(expected)
@@ -2,6 +2,7 @@ import pytest
 from fastmcp import Client
 
 from mcp_anon.server import app
+from mcp_anon.state import State
 from mcp_anon.settings import get_settings
 from tests.test_server import input_load_config
 
@@ -9,6 +10,7 @@ from tests.test_server import input_load_config
 async def test_autopersist_and_restore(input_load_config):
     expected_empty_schema = {
         'pipeline': {
+            'backend': 'pandas',
             'export': None,
             'load': None,
             'transform': {
@@ -21,12 +23,17 @@ async def test_autopersist_and_restore(input_load_config):
             'Can not display schema of resulting dataset.'
             ' Dataset not available because loader is not set.'
         )],
+        'ready': True,
     }
     expected_filled_schema = {
         'pipeline': {
+            'backend': 'pandas',
             'export': None,
             'load': {
+                'columns': None,
                 'path': 'datasets/small.csv',
+                'sample': None,
+                'dtypes': None,
                 'type': 'csv',
                 },
             'transform': {
@@ -42,10 +49,11 @@ async def test_autopersist_and_restore(input_load_config):
             ],
         },
         'warnings': None,
+        'ready': True,
     }
     results = {}
     async with Client(app) as client:
-        app.state.clear_persisted()
+        State().clear_persisted()
         results['view_before_edit'] = await client.call_tool('pipeline_view')
         assert results['view_before_edit'].structured_content == expected_empty_schema
 
@@ -69,5 +77,26 @@ async def test_autopersist_and_restore(input_load_config):
     async with Client(app) as client:
         results['view_after_clear'] = await client.call_tool('pipeline_reset')
         assert results['view_after_clear'].structured_content == expected_empty_schema
-        app.state.clear_persisted()
+        State().clear_persisted()
 
+
+
+async def test_sessions_persist_own_pipeline(input_load_config):
+    assert get_settings().autopersist
+    async with Client(app) as first, Client(app) as second:
+        await first.call_tool('pipeline_reset')
+        await second.call_tool('pipeline_reset')
+        await first.call_tool('loader_set', input_load_config)
+        await first.call_tool('transformer_append', {
+            'transform': {'type': 'drop', 'fields': 'name'},
+        })
+        view = (await second.call_tool('pipeline_view')).structured_content
+        assert view['pipeline']['load'] is None
+        assert view['pipeline']['transform']['sequence'] == []
+        await second.call_tool('loader_set', input_load_config)
+        await second.call_tool('transformer_append', {
+            'transform': {'type': 'drop', 'fields': 'id'},
+        })
+        view = (await first.call_tool('pipeline_view')).structured_content
+        assert view['pipeline']['transform']['sequence'] == [{'type': 'drop', 'fields': 'name'}]
+    State().clear_persisted()
@@ -3,6 +3,8 @@ from tempfile import TemporaryFile
 
 import pytest
 import yaml
+import pandas as pd
+import pyarrow as pa
 from pydantic import ValidationError
 
 from mcp_anon.pipeline import Pipeline
@@ -34,3 +36,96 @@ def test_invalid_pipeline_file(path):
     with pytest.raises(ValidationError):
         loaded = Pipeline.from_file(path)
 
+
+
+def test_optimize_skips_loading_dropped_fields():
+    pipeline = Pipeline.from_file(pipelines_directory / 'valid/drop-unused.yaml')
+    optimized = pipeline.optimize()
+    # Salary is dropped, but only after binning reads it.
+    assert optimized.load.columns == ['id', 'salary', 'married']
+    assert [x.type for x in optimized.transform.sequence] == ['bin', 'drop']
+    assert optimized.transform.sequence[1].fields == ['salary']
+    original_result = pipeline.transform(pipeline.load())
+    optimized_result = optimized.transform(optimized.load())
+    pd.testing.assert_frame_equal(optimized_result, original_result)
+
+
+def test_optimize_keeps_position_of_overwritten_field():
+    pipeline = Pipeline.model_validate({
+        'load': {'type': 'csv', 'path': 'datasets/small.csv'},
+        'transform': {'sequence': [
+            {'type': 'bin', 'input_field': 'salary', 'output_field': 'name', 'bins': [0, 20000, 40000]},
+        ]},
+    })
+    original_result = pipeline.transform(pipeline.load())
+    optimized = pipeline.optimize()
+    optimized_result = optimized.transform(optimized.load())
+    pd.testing.assert_frame_equal(optimized_result, original_result)
+
+
+def test_optimize_stops_at_custom_transform():
+    pipeline = Pipeline.model_validate({
+        'load': {'type': 'csv', 'path': 'datasets/small.csv'},
+        'transform': {'sequence': [
+            {'type': 'custom', 'function_definition': 'def f(df):\n    return df'},
+            {'type': 'drop', 'fields': 'name'},
+        ]},
+    })
+    assert pipeline.optimize() == pipeline
+
+
+def shares_memory(a: pd.Series, b: pd.Series) -> bool:
+    """Whether arrow-backed series have data buffers in common"""
+    def addresses(series):
+        return {
+            buffer.address
+            for buffer in pa.array(series.array).buffers()
+            if buffer is not None and buffer.size
+        }
+    return bool(addresses(a) & addresses(b))
+
+
+@pytest.mark.parametrize(
+    'transform',
+    [
+        {'type': 'bin', 'input_field': 'salary', 'bins': 2},
+        {'type': 'mask', 'field': 'name', 'regex': 'b'},
+        {'type': 'drop', 'fields': 'married'},
+        {'type': 'custom', 'function_definition': (
+            "def f(df):\n"
+            "    df['id'] -= 101\n"
+            "    return df\n"
+        )},
+    ],
+)
+def test_transform_does_not_modify_input(transform):
+    pipeline = Pipeline.model_validate({
+        'load': {'type': 'csv', 'path': pipelines_directory.parent / 'datasets/small.csv'},
+        'transform': {'sequence': [transform]},
+    })
+    original = pipeline.load()
+    expected = original.copy()
+    result = pipeline.transform(original)
+    pd.testing.assert_frame_equal(original, expected)
+    # Unchanged fields share memory instead of being copied
+    unchanged = 'married' if 'married' in result else 'salary'
+    assert shares_memory(result[unchanged], original[unchanged])
+
+
+def test_custom_transform_without_copy_on_write_does_not_modify_input():
+    pipeline = Pipeline.model_validate({
+        'load': {'type': 'csv', 'path': pipelines_directory.parent / 'datasets/small.csv'},
+        'transform': {'sequence': [
+            {'type': 'custom', 'function_definition': (
+                "def f(df):\n"
+                "    df.loc[0, 'id'] = 0\n"
+                "    return df\n"
+            )},
+        ]},
+    })
+    original = pipeline.load()
+    expected = original.copy()
+    with pd.option_context('mode.copy_on_write', False):
+        result = pipeline.transform(original)
+    assert result.loc[0, 'id'] == 0
+    pd.testing.assert_frame_equal(original, expected)
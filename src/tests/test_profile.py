@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mcp_anon.dataset.sketch import HyperLogLog, MisraGries
+from mcp_anon.dataset.view.profile import DatasetProfileAccumulator, get_dataset_profile
+
+
+def hashes(values) -> np.ndarray:
+    return pd.util.hash_pandas_object(pd.Series(values), index = False).to_numpy()
+
+
+@pytest.mark.parametrize('n', [10, 1_000, 200_000])
+def test_hyperloglog_estimate(n):
+    sketch = HyperLogLog()
+    sketch.update(hashes(np.arange(n)))
+    assert sketch.estimate() == pytest.approx(n, rel = 4 * sketch.relative_error)
+
+
+def test_hyperloglog_merge():
+    values = np.arange(100_000)
+    whole = HyperLogLog()
+    whole.update(hashes(values))
+    merged = HyperLogLog()
+    for chunk in np.array_split(values, 7):
+        part = HyperLogLog()
+        part.update(hashes(chunk))
+        merged.merge(part)
+    assert merged.estimate() == whole.estimate()
+
+
+def test_misra_gries_error_bound():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([
+        np.repeat([1, 2, 3], [5000, 3000, 1000]),
+        rng.integers(100, 100_000, size = 50_000),
+    ])
+    rng.shuffle(values)
+    sketch = MisraGries(k = 50)
+    for chunk in np.array_split(values, 10):
+        sketch.update(hashes(chunk))
+    true_counts = [5000, 3000, 1000]
+    for estimate, true in zip(sketch.top(3), true_counts):
+        assert true - sketch.error <= estimate <= true
+
+
+def test_profile_merge_across_chunks():
+    df = pd.DataFrame({
+        'id': np.arange(1000),
+        'group': np.arange(1000) % 4,
+        'name': pd.Series(['x', None] * 500, dtype = 'string[pyarrow]'),
+    })
+    whole = get_dataset_profile(df)
+    merged = DatasetProfileAccumulator()
+    for start in range(0, 1000, 300):
+        part = DatasetProfileAccumulator()
+        part.update(df.iloc[start:start + 300])
+        merged.merge(part)
+    assert merged.result() == whole
+    profile = whole.root
+    assert profile['id'].uniqueness == pytest.approx(1, rel = 0.05)
+    assert profile['group'].top_frequencies == [250] * 4
+    assert profile['name'].count == 500
@@ -0,0 +1,73 @@
+import json
+
+from pydantic import BaseModel, Field, TypeAdapter
+import pytest
+
+import mcp_anon.patch.fastmcp
+from mcp_anon.patch.fastmcp import PatchedFastMCP, SchemaCache, schema_size
+from mcp_anon.settings import Settings
+
+
+class Item(BaseModel):
+    x: int = Field(description = 'First coordinate of item')
+    y: int = Field(description = 'Second coordinate of item')
+
+
+class Pair(BaseModel):
+    a: Item
+    b: Item
+    c: Item
+
+
+async def pair_tool(pair: Pair) -> Pair:
+    """Return the same pair"""
+    return pair
+
+
+def make_app(directory, refs = False):
+    app = PatchedFastMCP('test')
+    app.schema_cache = SchemaCache(directory, refs = refs)
+    app.tool(pair_tool)
+    return app
+
+
+async def listed(app):
+    tools = await app.get_tools()
+    return tools['pair_tool'].model_dump(exclude = {'fn'})
+
+
+async def test_cached_schema_skips_generation(tmp_path, monkeypatch):
+    generated = await listed(make_app(tmp_path))
+    assert '$ref' not in json.dumps(generated['parameters'])
+    assert len(list(tmp_path.glob('*.json'))) == 1
+
+    def refuse(*args, **kwargs):
+        raise AssertionError('Schema generated despite cache')
+
+    monkeypatch.setattr(TypeAdapter, 'json_schema', refuse)
+    assert await listed(make_app(tmp_path)) == generated
+    with pytest.raises(AssertionError):
+        make_app(None)
+
+
+async def test_refs_make_schema_smaller(tmp_path):
+    inlined = await listed(make_app(None))
+    referenced = await listed(make_app(tmp_path, refs = True))
+    assert '$ref' in json.dumps(referenced['parameters'])
+    assert schema_size(referenced['parameters']) < schema_size(inlined['parameters'])
+    # Cached separately from inlined schemas
+    assert await listed(make_app(tmp_path)) == inlined
+
+
+@pytest.mark.parametrize('value', ['', '  '])
+async def test_empty_setting_disables_cache(tmp_path, monkeypatch, value):
+    monkeypatch.setenv('ANON_SCHEMA_CACHE', value)
+    settings = Settings()
+    assert settings.schema_cache is None
+    monkeypatch.setattr(mcp_anon.patch.fastmcp, 'get_settings', lambda: settings)
+    monkeypatch.chdir(tmp_path)
+    app = PatchedFastMCP('test')
+    app.tool(pair_tool)
+    await listed(app)
+    assert app.schema_cache.directory is None
+    assert list(tmp_path.iterdir()) == []
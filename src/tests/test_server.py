@@ -1,4 +1,6 @@
 from inspect import cleandoc
+import asyncio
+import time
 
 import pytest
 from fastmcp import Client
@@ -40,7 +42,12 @@ async def test_load_and_describe(input_load_config):
         results['set'] = await client.call_tool('loader_set', input_load_config)
         results['describe'] = await client.call_tool('loader_describe')
         reflected_load_config = results['describe'].data
-        assert input_load_config['loader_config'] == reflected_load_config
+        assert reflected_load_config == {
+            **input_load_config['loader_config'],
+            'columns': None,
+            'sample': None,
+            'dtypes': None,
+        }
 
 
 async def test_missing_load_type(input_load_config):
@@ -115,6 +122,9 @@ async def test_original_view_stats(input_load_config):
                'mean': 101.5,
                'min': 101.0,
                'std': 0.7071067811865476},
+        'name': {'count': 2.0,
+                 'freq': 1.0,
+                 'unique': 2.0},
         'married': {'25%': 0.25,
                     '50%': 0.5,
                     '75%': 0.75,
@@ -138,6 +148,42 @@ async def test_original_view_stats(input_load_config):
         assert results['original_stats'].structured_content == expected_stats
 
 
+async def test_original_view_profile(input_load_config):
+    async with Client(app) as client:
+        await client.call_tool('loader_set', input_load_config)
+        result = await client.call_tool('original_view_profile')
+        profile = result.structured_content
+        assert list(profile) == ['id', 'name', 'salary', 'married']
+        assert profile['id']['count'] == 2
+        assert profile['id']['distinct'] == pytest.approx(2, rel = 0.01)
+        assert profile['id']['top_frequencies'] == [1, 1]
+        assert profile['married']['frequency_error'] == 0
+        # Values are never revealed
+        assert 'alice' not in result.content[0].text
+
+
+async def test_result_evaluate(input_load_config):
+    async with Client(app) as client:
+        await client.call_tool('loader_set', input_load_config)
+        result = await client.call_tool('result_evaluate_k_anonymity', {
+            'quasi_identifiers': ['married'],
+            'k': 2,
+        })
+        assert result.structured_content['k'] == 1
+        assert result.structured_content['records_below_target'] == 2
+        result = await client.call_tool('result_evaluate_l_diversity', {
+            'quasi_identifiers': ['married'],
+            'sensitive_field': 'name',
+        })
+        assert result.structured_content['l'] == 1
+        assert 'alice' not in result.content[0].text
+        with pytest.raises(Exception, match = 'unknown'):
+            await client.call_tool('result_evaluate_t_closeness', {
+                'quasi_identifiers': ['unknown'],
+                'sensitive_field': 'name',
+            })
+
+
 async def test_custom_transform(input_load_config):
     code = cleandoc("""
         def remove_salary_and_reset_id(df):
@@ -156,6 +202,11 @@ async def test_custom_transform(input_load_config):
             'min': 0.0,
             'std': 0.7071067811865476
         },
+        'name': {
+            'count': 2.0,
+            'freq': 1.0,
+            'unique': 2.0,
+        },
         'married': {
             '25%': 0.25,
             '50%': 0.5,
@@ -185,7 +236,12 @@ async def test_custom_transform(input_load_config):
                 ],
             },
             'pipeline': {
-                'load': input_load_config['loader_config'],
+                'load': {
+                    **input_load_config['loader_config'],
+                    'columns': None,
+                    'sample': None,
+                    'dtypes': None,
+                },
                 'transform': {
                     'type': 'sequence',
                     'sequence': [
@@ -196,8 +252,10 @@ async def test_custom_transform(input_load_config):
                     ],
                 },
                 'export': None,
+                'backend': 'pandas',
             },
             'warnings': None,
+            'ready': True,
         }
         results['stats'] = await client.call_tool('result_view_stats')
         assert results['stats'].structured_content == expected_stats
@@ -223,8 +281,10 @@ async def test_bin_transform(input_load_config):
         results['result_schema'] = await client.call_tool('result_view_schema')
         assert results['result_schema'].structured_content == expected_schema
         # TODO: This test is dictating implementation too much.
-        # However, we are missing a way to confirm change without direct app.state access.
-        interval = app.state.result_dataset.salary[0]
+        # However, we are missing a way to confirm change without direct access to session state.
+        # Newest session is the one of this client
+        state = list(app.sessions.values())[-1]
+        interval = state.result_dataset.salary[0]
         assert (interval.left, interval.right) == (20000, 30000)
 
 
@@ -259,6 +319,36 @@ async def test_drop_non_existent_field(input_load_config):
             })
 
 
+async def test_insert_replace_delete_transform(input_load_config):
+    drop_name = {'type': 'drop', 'fields': 'name'}
+    drop_id = {'type': 'drop', 'fields': 'id'}
+    results = {}
+    async with Client(app) as client:
+        await client.call_tool('pipeline_reset')
+        results['set'] = await client.call_tool('loader_set', input_load_config)
+        results['append'] = await client.call_tool('transformer_append', {
+            'transform': drop_name,
+        })
+        results['insert'] = await client.call_tool('transformer_insert', {
+            'index': 0,
+            'transform': drop_id,
+        })
+        assert results['insert'].data.pipeline.transform.sequence == [drop_id, drop_name]
+        results['replace'] = await client.call_tool('transformer_replace', {
+            'index': 1,
+            'transform': {'type': 'drop', 'fields': 'married'},
+        })
+        assert [
+            x['name'] for x in results['replace'].structured_content['result_schema']['fields']
+        ] == ['name', 'salary']
+        results['delete'] = await client.call_tool('transformer_delete', {'index': 0})
+        assert [
+            x['name'] for x in results['delete'].structured_content['result_schema']['fields']
+        ] == ['id', 'name', 'salary']
+        with pytest.raises(Exception, match = 'out of range'):
+            await client.call_tool('transformer_delete', {'index': 1})
+
+
 async def test_generate_prompt():
     args = {
         'datasource': 'target/example.csv on MCP-anon server',
@@ -278,3 +368,68 @@ async def test_generate_prompt():
             excluded from resulting prompt.
         """)
 
+
+
+async def test_transformer_append_generalization(input_load_config):
+    async with Client(app) as client:
+        await client.call_tool('loader_set', input_load_config)
+        result = await client.call_tool('transformer_append_generalization', {
+            'quasi_identifiers': ['salary', 'married'],
+            'k': 2,
+        })
+        assert result.structured_content['k'] == 2
+        view = await client.call_tool('pipeline_view', {})
+        steps = view.structured_content['pipeline']['transform']['sequence']
+        assert [x['type'] for x in steps] == ['bin', 'bin']
+        with pytest.raises(Exception, match = 'No generalization'):
+            await client.call_tool('transformer_append_generalization', {
+                'quasi_identifiers': ['salary'],
+                'k': 3,
+            })
+
+
+async def test_discover_quasi_identifiers(input_load_config):
+    async with Client(app) as client:
+        await client.call_tool('loader_set', input_load_config)
+        result = await client.call_tool('original_discover_quasi_identifiers', {})
+        combinations = result.structured_content['combinations']
+        assert [x['fields'] for x in combinations] == [['id'], ['name'], ['salary'], ['married']]
+        assert 'alice' not in result.content[0].text
+        await client.call_tool('transformer_append', {
+            'transform': {'type': 'drop', 'fields': ['id', 'name']},
+        })
+        result = await client.call_tool('result_discover_quasi_identifiers', {
+            'fields': ['married'],
+        })
+        assert [x['fields'] for x in result.structured_content['combinations']] == [['married']]
+
+
+async def test_pipeline_view_does_not_wait_for_job(input_load_config):
+    code = cleandoc("""
+        def slow(df):
+            import time
+            time.sleep(2)
+            return df
+    """)
+    async with Client(app) as client:
+        await client.call_tool('loader_set', input_load_config)
+        await client.call_tool('pipeline_view')
+        append = asyncio.create_task(client.call_tool('transformer_append', {
+            'transform': {
+                'type': 'custom',
+                'function_definition': code,
+            }
+        }))
+        await asyncio.sleep(0.5)
+        started = time.monotonic()
+        view = await client.call_tool('pipeline_view')
+        assert time.monotonic() - started < 1
+        assert not append.done()
+        # Pipeline as left by the latest finished job
+        assert view.structured_content['pipeline']['transform']['sequence'] == []
+        assert view.structured_content['result_schema'] is not None
+        assert view.structured_content['warnings']
+        await append
+        view = await client.call_tool('pipeline_view')
+        assert len(view.structured_content['pipeline']['transform']['sequence']) == 1
+        assert view.structured_content['warnings'] is None
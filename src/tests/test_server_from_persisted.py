@@ -51,5 +51,26 @@ async def test_mask_transform():
     with use_pipeline_file('pipelines/valid/mask-transform.yaml'):
         async with Client(app) as client:
             result = await client.call_tool('pipeline_view')
-            assert list(app.state.result_dataset['name']) == ['a****', 'b*b']
+            state = list(app.sessions.values())[-1]
+            assert list(state.result_dataset['name']) == ['a****', 'b*b']
 
+
+
+async def test_prewarm_restored_pipeline():
+    settings = get_settings()
+    settings.prewarm = True
+    try:
+        with use_pipeline_file('pipelines/valid/mask-transform.yaml'):
+            async with Client(app) as client:
+                result = await client.call_tool('pipeline_view')
+                assert result.structured_content['pipeline']['load'] is not None
+                # Other tools wait for prewarming, rather than running pipeline again
+                await client.call_tool('result_view_schema')
+                assert app.prewarm.ready
+                state = list(app.sessions.values())[-1]
+                assert app.prewarm.state is None
+                assert list(state.result_dataset['name']) == ['a****', 'b*b']
+                result = await client.call_tool('pipeline_view')
+                assert result.structured_content['ready']
+    finally:
+        settings.prewarm = False
@@ -0,0 +1,105 @@
+import pytest
+
+from mcp_anon.pipeline import Pipeline
+from mcp_anon.pipeline.pandas import LoadCsv, DropTransform
+from mcp_anon.state import State
+from mcp_anon import state_backend
+from mcp_anon.state_backend import FileBackend, VersionConflictException, get_state_backend
+
+
+@pytest.fixture(params = ['file', 'sqlite'])
+def backend(request, outdir):
+    return get_state_backend(outdir / 'pipeline.yaml', request.param)
+
+
+def test_save_and_load(backend):
+    assert backend.version() == 0
+    assert backend.load() is None
+    pipeline = Pipeline(load = LoadCsv(path = 'datasets/small.csv'))
+    assert backend.save(pipeline, 0) == 1
+    assert backend.load() == (pipeline, 1)
+    assert backend.clear() == 2
+    assert backend.load() is None
+
+
+def test_refuse_save_from_outdated_version(backend):
+    backend.save(Pipeline(), 0)
+    with pytest.raises(VersionConflictException):
+        backend.save(Pipeline(load = LoadCsv(path = 'datasets/small.csv')), 0)
+    assert backend.load() == (Pipeline(), 1)
+
+
+def new_state(backend, session):
+    return State(
+        pipeline_file = backend.path,
+        backend = backend,
+        session = session,
+        is_autopersist = True,
+        is_dataset_cache = False,
+    )
+
+
+def test_replicas_of_session_sync_through_backend(backend):
+    # States of one session on two server replicas
+    first, second = [new_state(backend, 'a') for _ in range(2)]
+    first.set_load(LoadCsv(path = 'datasets/small.csv'))
+    second.sync()
+    assert second.pipeline == first.pipeline
+    first.append_transform(DropTransform(fields = 'name'))
+    # Second session edits without having seen the appended step
+    with pytest.raises(VersionConflictException):
+        second.append_transform(DropTransform(fields = 'id'))
+    assert second.pipeline == first.pipeline
+    assert 'name' not in second.result_dataset
+
+
+def test_other_sessions_do_not_sync(backend):
+    first, second = new_state(backend, 'a'), new_state(backend, 'b')
+    first.set_load(LoadCsv(path = 'datasets/small.csv'))
+    second.sync()
+    assert second.pipeline == Pipeline()
+    # Session saves its own pipeline over the one of other session
+    second.set_load(LoadCsv(path = 'datasets/datatypes.csv'))
+    first.sync()
+    assert first.pipeline == Pipeline(load = LoadCsv(path = 'datasets/small.csv'))
+    assert backend.load() == (second.pipeline, 2)
+
+
+def test_replay_journal_before_compaction(outdir):
+    backend = FileBackend(outdir / 'pipeline.yaml', compact_delay = 60)
+    pipeline = Pipeline(load = LoadCsv(path = 'datasets/small.csv'))
+    backend.save(Pipeline(), 0)
+    backend.save(pipeline, 1)
+    assert not backend.path.exists()
+    # Record torn by crash while appending is ignored
+    with open(backend.journal_path, 'a') as f:
+        f.write('{"version": 3, "pipel')
+    restarted = FileBackend(backend.path)
+    assert restarted.load() == (pipeline, 2)
+    backend.compact()
+    assert not backend.journal_path.exists()
+    assert Pipeline.from_file(backend.path) == pipeline
+    assert restarted.load() == (pipeline, 2)
+
+
+def test_save_after_torn_record(outdir):
+    backend = FileBackend(outdir / 'pipeline.yaml', compact_delay = 60)
+    backend.save(Pipeline(), 0)
+    with open(backend.journal_path, 'a') as f:
+        f.write('{"version": 2, "pipel')
+    pipeline = Pipeline(load = LoadCsv(path = 'datasets/small.csv'))
+    assert backend.save(pipeline, 1) == 2
+    assert backend.version() == 2
+    assert backend.load() == (pipeline, 2)
+
+
+def test_sync_to_disk_only_on_compaction(outdir, monkeypatch):
+    synced = []
+    monkeypatch.setattr(state_backend.os, 'fsync', synced.append)
+    backend = FileBackend(outdir / 'pipeline.yaml', compact_delay = 60)
+    for version in range(3):
+        backend.save(Pipeline(), version)
+    assert not synced
+    backend.compact()
+    # Pipeline file and its version file
+    assert len(synced) == 2
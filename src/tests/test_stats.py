@@ -0,0 +1,83 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mcp_anon.dataset.sketch import QuantileSketch
+from mcp_anon.dataset.view.stats import (
+    DatasetStatsAccumulator,
+    FrequencyAccumulator,
+    get_dataset_stats,
+)
+
+
+@pytest.fixture
+def dataset():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'x': rng.normal(size = 150),
+        'n': pd.array(rng.integers(0, 10, size = 150), dtype = 'int64[pyarrow]'),
+        'c': pd.Categorical(rng.choice(['a', 'b', 'c'], size = 150), categories = ['a', 'b', 'c', 'd']),
+    })
+
+
+def test_numeric_stats_match_describe(dataset):
+    stats = get_dataset_stats(dataset).model_dump()
+    expected = dataset[['x', 'n']].describe().to_dict()
+    for field in ['x', 'n']:
+        assert stats[field] == pytest.approx(expected[field])
+
+
+def test_frequency_stats(dataset):
+    stats = get_dataset_stats(dataset).model_dump()
+    counts = dataset['c'].value_counts()
+    assert stats['c'] == {
+        'count': 150.0,
+        'unique': 3.0,
+        'freq': float(counts.max()),
+    }
+
+
+def test_merge_accumulators(dataset):
+    whole = get_dataset_stats(dataset).model_dump()
+    merged = DatasetStatsAccumulator()
+    for start in range(0, len(dataset), 40):
+        part = DatasetStatsAccumulator()
+        part.update(dataset.iloc[start:start + 40])
+        # As if accumulated by another process
+        merged.merge(pickle.loads(pickle.dumps(part)))
+    merged = merged.result().model_dump()
+    for field in whole:
+        assert merged[field] == pytest.approx(whole[field])
+
+
+def test_frequency_stats_of_many_distinct_values_are_bounded(monkeypatch):
+    monkeypatch.setattr(FrequencyAccumulator, 'max_exact', 1_000)
+    rng = np.random.default_rng(0)
+    values = pd.Series(rng.integers(0, 50_000, size = 100_000).astype(str))
+    # Frequent value is found among many distinct values
+    values[::10] = 'frequent'
+    accumulator = DatasetStatsAccumulator()
+    for start in range(0, len(values), 10_000):
+        accumulator.update(values.iloc[start:start + 10_000].to_frame('s'))
+    field = accumulator.fields['s']
+    assert field.counts is None
+    assert len(field.frequent.counters) <= field.frequent.k
+    stats = accumulator.result().model_dump()['s']
+    assert stats['count'] == len(values)
+    assert stats['unique'] == pytest.approx(values.nunique(), rel = 0.05)
+    assert stats['freq'] <= values.value_counts().max()
+    assert stats['freq'] >= values.value_counts().max() - field.frequent.error
+
+
+def test_quantile_sketch_bounded_error():
+    values = np.random.default_rng(0).normal(size = 100_000)
+    sketch = QuantileSketch(seed = 0)
+    for chunk in np.array_split(values, 10):
+        sketch.update(chunk)
+    assert sketch.count == len(values)
+    assert sum(map(len, sketch.levels)) < 3 * sketch.k
+    qs = [0.1, 0.5, 0.9]
+    for q, estimate in zip(qs, sketch.quantiles(qs)):
+        assert abs((values < estimate).mean() - q) < 0.02
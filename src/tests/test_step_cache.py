@@ -0,0 +1,175 @@
+import gc
+
+import pandas as pd
+import pytest
+
+from mcp_anon.dataset import step_cache
+from mcp_anon.dataset.store import DatasetStore
+from mcp_anon.dataset.step_cache import StepCache, dataset_size
+from mcp_anon.pipeline.pandas import LoadCsv, BinTransform, DropTransform, MaskTransform
+from mcp_anon.state import State
+
+
+def test_evict_least_recently_used():
+    datasets = {key: pd.DataFrame({'x': range(100)}) for key in 'abc'}
+    cache = StepCache(budget = 2 * dataset_size(datasets['a']))
+    cache.put('a', datasets['a'])
+    cache.put('b', datasets['b'])
+    cache.get('a')
+    cache.put('c', datasets['c'])
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+    assert cache.size <= cache.budget
+
+
+def test_spill_and_read_back(outdir):
+    ds = LoadCsv(path = 'datasets/datatypes.csv')()
+    ds = BinTransform(input_field = 'int', bins = 2)(ds)
+    ds['numpy'] = ds['float'].astype('float64')
+    cache = StepCache(budget = 1, spill_directory = outdir)
+    cache.put('a', ds)
+    assert 'a' in cache
+    assert cache.size == 0
+    assert list(outdir.glob('*/a.arrow'))
+    pd.testing.assert_frame_equal(cache.get('a'), ds)
+    cache.clear()
+    assert not list(outdir.glob('*/*.arrow'))
+
+
+def test_read_back_without_spilling_again(outdir, monkeypatch):
+    ds = pd.DataFrame({'x': range(100)})
+    writes = []
+    monkeypatch.setattr(step_cache.SpilledDataset, '__init__', counted(
+        step_cache.SpilledDataset.__init__,
+        writes,
+    ))
+    # Over budget, dataset is read from file every time
+    cache = StepCache(budget = 1, spill_directory = outdir)
+    cache.put('a', ds)
+    for _ in range(3):
+        pd.testing.assert_frame_equal(cache.get('a'), ds)
+    assert len(writes) == 1
+    # Within budget, dataset evicted again keeps its file
+    cache = StepCache(budget = dataset_size(ds), spill_directory = outdir)
+    cache.put('a', ds)
+    cache.put('b', ds.copy())
+    cache.get('a')
+    cache.get('b')
+    cache.get('a')
+    assert len(writes) == 3
+    pd.testing.assert_frame_equal(cache.get('b'), ds)
+
+
+def counted(function, calls):
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        return function(*args, **kwargs)
+    return wrapper
+
+
+def test_held_datasets_leave_less_budget():
+    datasets = {key: pd.DataFrame({'x': range(100)}) for key in 'abc'}
+    size = dataset_size(datasets['a'])
+    cache = StepCache(budget = 2 * size)
+    cache.hold('held', datasets['c'])
+    cache.put('a', datasets['a'])
+    cache.put('b', datasets['b'])
+    assert 'a' not in cache
+    assert cache.charged == 2 * size
+    # Held dataset which is also cached is only counted once
+    cache.hold('b', datasets['b'])
+    assert cache.charged == 2 * size
+    cache.release('held')
+    cache.put('a', datasets['a'])
+    assert 'a' in cache and 'b' in cache
+    cache.release('b')
+    assert not cache.held
+
+
+def test_charge_loaded_dataset_and_result():
+    cache = StepCache(budget = 10 ** 9)
+    state = State(
+        is_autopersist = False,
+        is_dataset_cache = False,
+        dataset_store = DatasetStore(cache),
+        step_cache = cache,
+    )
+    state.set_load(LoadCsv(path = 'datasets/small.csv'))
+    original = dataset_size(state.original_dataset)
+    assert cache.charged == original
+    state.append_transform(DropTransform(fields = 'married'))
+    result = dataset_size(state.result_dataset)
+    # Result is both cached and held
+    assert cache.charged == original + result
+    cache.clear()
+    assert cache.charged == original + result
+    del state
+    gc.collect()
+    assert not cache.held
+
+
+def test_skip_dataset_over_budget():
+    cache = StepCache(budget = 1)
+    cache.put('a', pd.DataFrame({'x': range(100)}))
+    assert 'a' not in cache
+    assert cache.size == 0
+
+
+@pytest.fixture
+def state():
+    state = State(is_autopersist = False, is_dataset_cache = False)
+    state.set_load(LoadCsv(path = 'datasets/small.csv'))
+    state.append_transform(BinTransform(input_field = 'salary', bins = [0, 20000, 40000]))
+    state.append_transform(MaskTransform(field = 'name', regex = '[aeiou]'))
+    state.append_transform(DropTransform(fields = 'married'))
+    return state
+
+
+def count_calls(monkeypatch, cls):
+    calls = []
+    original = cls.__call__
+    def counted(self, ds):
+        calls.append(self)
+        return original(self, ds)
+    monkeypatch.setattr(cls, '__call__', counted)
+    return calls
+
+
+def test_replace_reruns_only_later_steps(state, monkeypatch):
+    calls = {
+        cls: count_calls(monkeypatch, cls)
+        for cls in [BinTransform, MaskTransform, DropTransform]
+    }
+    state.replace_transform(1, MaskTransform(field = 'name', regex = 'b'))
+    assert len(calls[BinTransform]) == 0
+    assert len(calls[MaskTransform]) == 1
+    assert len(calls[DropTransform]) == 1
+    assert state.result_dataset.name.tolist() == ['alice', '*o*']
+
+
+def test_failed_edit_keeps_sequence(state):
+    before = list(state.pipeline.transform.sequence)
+    with pytest.raises(Exception):
+        state.insert_transform(0, DropTransform(fields = 'name'))
+    assert state.pipeline.transform.sequence == before
+    with pytest.raises(IndexError):
+        state.delete_transform(3)
+    state.delete_transform(2)
+    assert 'married' in state.result_dataset
+
+
+def test_result_over_budget_is_held(monkeypatch):
+    state = State(
+        is_autopersist = False,
+        is_dataset_cache = False,
+        step_cache = StepCache(budget = 1),
+    )
+    state.set_load(LoadCsv(path = 'datasets/small.csv'))
+    calls = count_calls(monkeypatch, DropTransform)
+    state.append_transform(DropTransform(fields = 'married'))
+    for _ in range(3):
+        assert 'married' not in state.result_dataset
+    assert len(calls) == 1
+    state.append_transform(DropTransform(fields = 'name'))
+    assert 'name' not in state.result_dataset
@@ -0,0 +1,69 @@
+import gc
+
+import pytest
+from fastmcp import Client
+
+from mcp_anon.dataset.store import DatasetStore
+from mcp_anon.pipeline.pandas import LoadCsv
+from mcp_anon.server import app
+from mcp_anon.state import State
+from tests.test_server import input_load_config, start_empty_and_disable_autopersist
+
+
+@pytest.fixture
+def load_calls(monkeypatch):
+    calls = []
+    original = LoadCsv.__call__
+    def counted(self):
+        calls.append(self)
+        return original(self)
+    monkeypatch.setattr(LoadCsv, '__call__', counted)
+    return calls
+
+
+def new_state(store):
+    return State(is_autopersist = False, is_dataset_cache = False, dataset_store = store)
+
+
+def test_share_dataset_of_identical_loader(load_calls):
+    store = DatasetStore()
+    states = [new_state(store) for _ in range(2)]
+    for state in states:
+        state.set_load(LoadCsv(path = 'datasets/small.csv'))
+    first, second = [state.original_dataset for state in states]
+    assert first is second
+    assert len(load_calls) == 1
+    states[0].set_load(LoadCsv(path = 'datasets/datatypes.csv'))
+    assert states[0].original_dataset is not first
+    assert len(store.entries) == 2
+    states[1].reset_pipeline()
+    assert len(store.entries) == 1
+
+
+def test_release_dataset_of_ended_session():
+    store = DatasetStore()
+    state = new_state(store)
+    state.set_load(LoadCsv(path = 'datasets/small.csv'))
+    _ = state.original_dataset
+    del state
+    gc.collect()
+    assert not store.entries
+
+
+async def test_sessions_have_own_pipeline(input_load_config, load_calls):
+    # Let go of datasets held by sessions of previous tests
+    gc.collect()
+    async with Client(app) as first, Client(app) as second:
+        await first.call_tool('pipeline_reset')
+        await second.call_tool('pipeline_reset')
+        await first.call_tool('loader_set', input_load_config)
+        await second.call_tool('loader_set', input_load_config)
+        await first.call_tool('transformer_append', {
+            'transform': {'type': 'drop', 'fields': 'name'},
+        })
+        views = [
+            (await client.call_tool('pipeline_view')).data.pipeline.transform.sequence
+            for client in [first, second]
+        ]
+        assert views == [[{'type': 'drop', 'fields': 'name'}], []]
+        assert len(load_calls) == 1
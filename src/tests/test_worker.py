@@ -0,0 +1,64 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from mcp_anon.pipeline.pandas import LoadCsv
+from mcp_anon.pipeline.pandas import sample as sample_module
+from mcp_anon.settings import get_settings
+from mcp_anon.worker import JobCancelled, checkpoint, run_job
+
+
+class FakeContext:
+    def __init__(self):
+        self.progress = []
+
+    async def report_progress(self, progress, total = None, message = None):
+        self.progress.append((progress, total, message))
+
+
+def work_until_stopped(stopped: threading.Event, steps: int = 1000):
+    try:
+        for i in range(steps):
+            checkpoint(i, steps)
+            time.sleep(0.01)
+    except JobCancelled:
+        stopped.set()
+        raise
+    return steps
+
+
+async def test_report_progress():
+    ctx = FakeContext()
+    result = await run_job(ctx, lambda: work_until_stopped(threading.Event(), steps = 3))
+    await asyncio.sleep(0.01)
+    assert result == 3
+    assert ctx.progress == [(0, 3, None), (1, 3, None), (2, 3, None)]
+
+
+async def test_timeout_stops_job(monkeypatch):
+    monkeypatch.setattr(get_settings(), 'tool_timeout', 0.1)
+    stopped = threading.Event()
+    with pytest.raises(TimeoutError):
+        await run_job(FakeContext(), lambda: work_until_stopped(stopped))
+    assert await asyncio.to_thread(stopped.wait, 1)
+
+
+async def test_cancel_stops_job():
+    stopped = threading.Event()
+    task = asyncio.create_task(run_job(FakeContext(), lambda: work_until_stopped(stopped)))
+    await asyncio.sleep(0.1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert await asyncio.to_thread(stopped.wait, 1)
+
+
+async def test_sample_checkpoints_each_chunk(monkeypatch):
+    monkeypatch.setattr(sample_module, 'CHUNKSIZE', 1)
+    load = LoadCsv(path = 'datasets/small.csv', sample = {'type': 'fraction', 'fraction': 0.5})
+    ctx = FakeContext()
+    await run_job(ctx, load.load_sample)
+    await asyncio.sleep(0.01)
+    assert [progress for progress, _, _ in ctx.progress] == [1, 2]